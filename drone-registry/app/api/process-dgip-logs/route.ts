@@ -17,13 +17,14 @@ export async function POST(request: Request) {
   let stderr = ''; // Initialize stderr in a scope accessible by the catch block
 
   try {
-    // Receive the DGIP data array from the frontend [3]
+    // Receive the DGIP data from the frontend: a bare array of waypoints, or
+    // { waypoints, flightAreaCenter, flightAreaRadius } so the script can also check the geofence [3]
     const dgipData = await request.json(); //
 
     // Enhanced Basic validation for incoming DGIP data [3, 4]
-    // Ensure it's an array and check the structure of the first entry if available
-    if (!Array.isArray(dgipData)) { // [3]
-      return NextResponse.json({ error: 'Invalid DGIP data format provided. Expected an array.' }, { status: 400 }); // [3]
+    const waypoints = Array.isArray(dgipData) ? dgipData : dgipData?.waypoints;
+    if (!Array.isArray(waypoints)) { // [3]
+      return NextResponse.json({ error: 'Invalid DGIP data format provided. Expected an array or an object with a waypoints array.' }, { status: 400 }); // [3]
     }
 
     // Note: More detailed validation of array elements (matching DgipLogEntry)
@@ -53,7 +54,7 @@ export async function POST(request: Request) {
       // For a production system, a more explicit promise rejection here would be safer.
     });
 
-    // Write the DGIP data as JSON to the Python script's stdin [2]
+    // Write the DGIP data as JSON to the Python script's stdin, in the form it was received [2]
     pythonProcess.stdin.write(JSON.stringify(dgipData)); // [2]
     pythonProcess.stdin.end(); // Signal end of input to the Python script [2]
 
@@ -89,8 +90,14 @@ export async function POST(request: Request) {
       }
 
       // Attempt to parse the JSON output from stdout [7]
-      // Expected format: { dgipDataHash: string | null; ipfsCid: string | null; error: string | null } [7]
-      const parsed: { dgipDataHash?: string | null; ipfsCid?: string | null; error?: string | null } = JSON.parse(stdout); // [7]
+      // Expected format: { dgipDataHash, ipfsCid, telemetryCompliance, geofence, error } [7]
+      const parsed: {
+        dgipDataHash?: string | null;
+        ipfsCid?: string | null;
+        telemetryCompliance?: unknown;
+        geofence?: unknown;
+        error?: string | null;
+      } = JSON.parse(stdout); // [7]
       console.log("Successfully parsed Python output:", parsed); // [7]
 
       // Check for a specific error field in the parsed output from Python [7]
@@ -110,10 +117,12 @@ export async function POST(request: Request) {
          // Depending on requirements, you might error here or just return null CID
       }
 
-      // Return the hash and CID to the frontend [7]
+      // Return the hash, CID and telemetry/geofence analysis to the frontend [7]
       return NextResponse.json({ // [7]
         dgipDataHash: parsed.dgipDataHash, // [7]
-        ipfsCid: parsed.ipfsCid // [7]
+        ipfsCid: parsed.ipfsCid, // [7]
+        telemetryCompliance: parsed.telemetryCompliance ?? null,
+        geofence: parsed.geofence ?? null
       });
 
     } catch (parseError) {
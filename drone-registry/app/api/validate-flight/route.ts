@@ -3,6 +3,99 @@ import { spawn } from 'child_process';
 import path from 'path';
 import process from 'process'; // Import process for accessing current directory
 
+// Result object printed by backend/llama_validator.py
+interface ValidatorOutput {
+    compliance_messages?: string[];
+    dataHash?: string | null;
+    ipfsCid?: string | null;
+    is_critically_compliant?: boolean;
+    error?: string;
+    message?: string;
+}
+
+// Shape the backend result the same way for the buffered and streaming responses
+function transformResult(parsed: ValidatorOutput) {
+    return {
+        result: {
+            complianceMessages: parsed.compliance_messages,
+            dataHash: parsed.dataHash || null, // Handle null/undefined from script
+            ipfsCid: parsed.ipfsCid || null,   // Handle null/undefined from script
+            // Include the is_critically_compliant field from the parsed output
+            is_critically_compliant: parsed.is_critically_compliant ?? false, // Default to false if missing/undefined
+        }
+    };
+}
+
+// Streaming mode: the Python script writes NDJSON events (deterministic, nfz, ai_token, result)
+// and each line is forwarded to the client as soon as it arrives.
+function streamValidation(flightData: Record<string, unknown>): Response {
+    const pythonPath = path.resolve(process.cwd(), "backend/llama_validator.py");
+    console.log(`Spawning Python script in streaming mode at: ${pythonPath}`);
+    const python = spawn('python', [pythonPath]);
+    const encoder = new TextEncoder();
+
+    const stream = new ReadableStream({
+        start(controller) {
+            let buffered = '';
+            let errorOutput = '';
+
+            const forwardLine = (line: string) => {
+                if (!line.trim()) return;
+                try {
+                    const event = JSON.parse(line);
+                    // The final result is transformed to the same format as the buffered response
+                    if (event.event === 'result') {
+                        const data: ValidatorOutput = event.data || {};
+                        const payload = data.error || !data.compliance_messages
+                            ? { error: data.error || data.message || 'Validation failed.', is_critically_compliant: data.is_critically_compliant ?? false }
+                            : transformResult(data);
+                        controller.enqueue(encoder.encode(JSON.stringify({ event: 'result', data: payload }) + '\n'));
+                        return;
+                    }
+                    controller.enqueue(encoder.encode(line + '\n'));
+                } catch {
+                    console.error("Skipping unparsable line from Python stdout:", line);
+                }
+            };
+
+            python.stdout.on('data', (data) => {
+                buffered += data.toString();
+                const lines = buffered.split('\n');
+                buffered = lines.pop() ?? '';
+                lines.forEach(forwardLine);
+            });
+
+            python.stderr.on('data', (data) => {
+                errorOutput += data.toString();
+            });
+
+            python.on('close', (code) => {
+                forwardLine(buffered);
+                console.log(`Python process exited with code: ${code}`);
+                if (errorOutput) console.error("Raw Python stderr:", errorOutput);
+                controller.close();
+            });
+
+            python.on('error', (err) => {
+                console.error('Failed to start Python script process:', err);
+                controller.enqueue(encoder.encode(JSON.stringify({ event: 'result', data: { error: `Failed to start validation: ${err.message}` } }) + '\n'));
+                controller.close();
+            });
+        },
+        cancel() {
+            // Client disconnected; stop the validation
+            python.kill();
+        }
+    });
+
+    python.stdin.write(JSON.stringify({ ...flightData, stream: true }));
+    python.stdin.end();
+
+    return new Response(stream, {
+        headers: { 'Content-Type': 'application/x-ndjson', 'Cache-Control': 'no-cache' }
+    });
+}
+
 export async function POST(request: Request) {
     try {
         const flightData = await request.json();
@@ -12,6 +105,11 @@ export async function POST(request: Request) {
             return NextResponse.json({ error: 'Invalid flight data provided.' }, { status: 400 });
         }
 
+        // Opt-in streaming with ?stream=1
+        if (new URL(request.url).searchParams.get('stream') === '1') {
+            return streamValidation(flightData);
+        }
+
         return new Promise((resolve) => {
             const pythonPath = path.resolve(process.cwd(), "backend/llama_validator.py");
             console.log(`Spawning Python script at: ${pythonPath}`);
@@ -72,15 +170,7 @@ export async function POST(request: Request) {
 
 
                     // Transform the Python output to match the expected frontend format
-                    const transformedResponse = {
-                        result: {
-                            complianceMessages: parsed.compliance_messages,
-                            dataHash: parsed.dataHash || null, // Handle null/undefined from script
-                            ipfsCid: parsed.ipfsCid || null,   // Handle null/undefined from script
-                            // Include the is_critically_compliant field from the parsed output
-                            is_critically_compliant: parsed.is_critically_compliant ?? false, // Default to false if missing/undefined
-                        }
-                    };
+                    const transformedResponse = transformResult(parsed);
 
                     // Log the transformed response for debugging
                     console.log("Transformed response:", transformedResponse);
@@ -98,8 +188,9 @@ export async function POST(request: Request) {
                 }
             });
 
-            // Send flight data as JSON to Python script's stdin
-            python.stdin.write(JSON.stringify(flightData));
+            // Send flight data as JSON to Python script's stdin; this route parses a single JSON
+            // result, so streaming is turned off whatever VALIDATION_STREAM says
+            python.stdin.write(JSON.stringify({ ...flightData, stream: false }));
             python.stdin.end();
 
         });
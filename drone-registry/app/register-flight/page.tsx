@@ -696,10 +696,12 @@ export default function RegisterFlightPage() {
 
     try {
       // Call the new backend endpoint to process DGIP data (hashing, IPFS upload)
+      // The registered flight area lets the backend check the flown path against the geofence
+      const { flightAreaCenter, flightAreaRadius } = form.getValues();
       const processResponse = await fetch('/api/process-dgip-logs', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify(simulatedDgip), // Send the full simulated DGIP array to backend
+        body: JSON.stringify({ waypoints: simulatedDgip, flightAreaCenter, flightAreaRadius }), // Send the full simulated DGIP array to backend
       });
 
       // Expected format: { dgipDataHash?: string | null; ipfsCid?: string | null; error?: string | null } from backend
@@ -0,0 +1,209 @@
+import asyncio
+import contextvars
+import sqlite3
+import sys
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from config import CONFIG
+
+# Each validation runs in its own Python process (spawned by the Next.js routes), so the
+# limiter state lives in a small SQLite file shared by every process on the host rather than
+# in memory. All state changes happen inside BEGIN IMMEDIATE transactions, which run in a
+# worker thread: waiting on another process's lock must not stall the event loop.
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("admission_deadline", default=None)
+
+
+class AdmissionError(RuntimeError):
+    """An outbound call was not admitted."""
+
+
+class LoadShedError(AdmissionError):
+    """The destination's wait queue is full; the call is rejected immediately."""
+
+
+class DeadlineExceededError(AdmissionError):
+    """The request deadline passed while waiting for, or during, an outbound call."""
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]):
+    """Set the deadline (now + seconds) that every outbound call in this context must meet."""
+    token = _deadline.set(time.time() + seconds if seconds else None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    """Seconds left until the current deadline, or None when there is no deadline."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.time()
+
+
+def _connect() -> sqlite3.Connection:
+    # Used from worker threads, one transaction at a time (see DestinationLimiter._run)
+    conn = sqlite3.connect(CONFIG["limits"]["state_path"], timeout=5.0, isolation_level=None,
+                           check_same_thread=False)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS admission_buckets (
+            destination TEXT PRIMARY KEY,
+            request_tokens REAL,
+            llm_tokens REAL,
+            updated_at REAL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS admission_leases (
+            lease_id TEXT PRIMARY KEY,
+            destination TEXT,
+            state TEXT,
+            expires_at REAL
+        )
+    ''')
+    return conn
+
+
+class DestinationLimiter:
+    """
+    Admission control for one outbound destination (e.g. "openai", "mcp", "ipfs").
+
+    A call is admitted when fewer than max_concurrency calls are in flight and the token
+    buckets (requests per minute and, for LLMs, tokens per minute) can cover it. When
+    max_queue calls are already waiting, new calls are shed instead of queued.
+    A limit of 0 disables that limit.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, rpm: float, tpm: float, max_queue: int):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_queue = max_queue
+
+    def _refill(self, conn: sqlite3.Connection, now: float):
+        row = conn.execute('SELECT request_tokens, llm_tokens, updated_at FROM admission_buckets WHERE destination = ?',
+                           (self.name,)).fetchone()
+        if row is None:
+            # A new bucket starts full: one minute's worth of requests and tokens
+            return float(self.rpm), float(self.tpm)
+        request_tokens, llm_tokens, updated_at = row
+        elapsed = max(0.0, now - updated_at)
+        return (min(float(self.rpm), request_tokens + elapsed * self.rpm / 60.0),
+                min(float(self.tpm), llm_tokens + elapsed * self.tpm / 60.0))
+
+    def _enqueue(self, conn: sqlite3.Connection, lease_id: str, deadline: Optional[float]) -> None:
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute('DELETE FROM admission_leases WHERE expires_at < ?', (now,))
+            if self.max_queue:
+                waiting = conn.execute("SELECT COUNT(*) FROM admission_leases WHERE destination = ? AND state = 'waiting'",
+                                       (self.name,)).fetchone()[0]
+                if waiting >= self.max_queue:
+                    raise LoadShedError(f"{self.name}: {waiting} calls already waiting, request shed")
+            expires_at = deadline if deadline is not None else now + CONFIG["limits"]["lease_ttl_seconds"]
+            conn.execute("INSERT INTO admission_leases (lease_id, destination, state, expires_at) VALUES (?, ?, 'waiting', ?)",
+                         (lease_id, self.name, expires_at))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _try_admit(self, conn: sqlite3.Connection, lease_id: str, tokens: float) -> bool:
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute('DELETE FROM admission_leases WHERE expires_at < ?', (now,))
+            if self.max_concurrency:
+                in_flight = conn.execute("SELECT COUNT(*) FROM admission_leases WHERE destination = ? AND state = 'in_flight'",
+                                         (self.name,)).fetchone()[0]
+                if in_flight >= self.max_concurrency:
+                    conn.execute("COMMIT")
+                    return False
+            request_tokens, llm_tokens = self._refill(conn, now)
+            # A call larger than the whole bucket is admitted once the bucket is full
+            llm_cost = min(tokens, float(self.tpm))
+            if (self.rpm and request_tokens < 1) or (self.tpm and llm_tokens < llm_cost):
+                conn.execute("COMMIT")
+                return False
+            conn.execute('INSERT OR REPLACE INTO admission_buckets (destination, request_tokens, llm_tokens, updated_at) VALUES (?, ?, ?, ?)',
+                         (self.name, request_tokens - (1 if self.rpm else 0), llm_tokens - (llm_cost if self.tpm else 0), now))
+            conn.execute("UPDATE admission_leases SET state = 'in_flight', expires_at = ? WHERE lease_id = ?",
+                         (now + CONFIG["limits"]["lease_ttl_seconds"], lease_id))
+            conn.execute("COMMIT")
+            return True
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _release(self, conn: sqlite3.Connection, lease_id: str) -> None:
+        try:
+            conn.execute('DELETE FROM admission_leases WHERE lease_id = ?', (lease_id,))
+        except sqlite3.Error as e:
+            print(f"Warning: Failed to release {self.name} admission lease: {e}", file=sys.stderr)
+        finally:
+            conn.close()
+
+    @staticmethod
+    async def _run(func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run a blocking SQLite step in a worker thread. A cancelled caller still waits for the
+        step to finish, so the slot's connection is never used by two threads at once.
+        """
+        step = asyncio.ensure_future(asyncio.to_thread(func, *args))
+        try:
+            return await asyncio.shield(step)
+        except asyncio.CancelledError:
+            await asyncio.wait([step])
+            raise
+
+    @asynccontextmanager
+    async def slot(self, tokens: float = 0):
+        """Wait (within the current deadline) until the call is admitted, and hold the slot for the block."""
+        if not CONFIG["limits"]["enabled"]:
+            yield
+            return
+        deadline = _deadline.get()
+        lease_id = uuid.uuid4().hex
+        conn = await self._run(_connect)
+        try:
+            await self._run(self._enqueue, conn, lease_id, deadline)
+            poll_interval = CONFIG["limits"]["poll_interval_seconds"]
+            while not await self._run(self._try_admit, conn, lease_id, tokens):
+                if deadline is not None and time.time() + poll_interval > deadline:
+                    raise DeadlineExceededError(f"{self.name}: deadline passed while waiting for admission")
+                await asyncio.sleep(poll_interval)
+            yield
+        finally:
+            # Release the slot (or give up the queue position) whatever happened
+            await self._run(self._release, conn, lease_id)
+
+    async def call(self, func: Callable[[], Awaitable[Any]], tokens: float = 0) -> Any:
+        """Run func() once admitted, cancelling it if the current deadline passes."""
+        async with self.slot(tokens):
+            remaining = remaining_time()
+            if remaining is None:
+                return await func()
+            if remaining <= 0:
+                raise DeadlineExceededError(f"{self.name}: deadline passed before the call started")
+            try:
+                return await asyncio.wait_for(func(), timeout=remaining)
+            except asyncio.TimeoutError:
+                raise DeadlineExceededError(f"{self.name}: call did not finish before the deadline")
+
+
+_limiters: Dict[str, DestinationLimiter] = {}
+
+
+def limiter(destination: str) -> DestinationLimiter:
+    """The shared limiter for a destination configured in CONFIG["limits"]["destinations"]."""
+    if destination not in _limiters:
+        settings = CONFIG["limits"]["destinations"][destination]
+        _limiters[destination] = DestinationLimiter(destination, settings["max_concurrency"], settings["rpm"],
+                                                    settings["tpm"], settings["max_queue"])
+    return _limiters[destination]
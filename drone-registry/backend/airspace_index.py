@@ -0,0 +1,214 @@
+import math
+import sqlite3
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from config import CONFIG
+from geofence import EARTH_RADIUS_M
+from rules_engine import parse_center, parse_date, parse_time_minutes
+
+# Accepted flights live in the validator's SQLite database: exact values in flight_airspace and
+# a bounding box per flight in an R*Tree over (time, latitude, longitude). The R*Tree answers the
+# "same place at the same time" range query from disk in logarithmic time, so no per-process index
+# has to be rebuilt, and it is updated in the same transaction that records each accepted flight.
+# R*Tree coordinates are 32-bit floats rounded outwards, so candidates are re-checked exactly.
+#
+# Flights are indexed when they pass validation, before the user registers them on-chain. Such an
+# entry only holds its airspace for AIRSPACE_HOLD_MINUTES; after that it counts only once the
+# contract confirms the registration, and an abandoned validation is dropped from the index.
+
+_METERS_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180.0
+
+
+@dataclass(frozen=True)
+class Footprint:
+    """Where and when a flight uses airspace: a time interval and a circle."""
+    start_ms: int
+    end_ms: int
+    latitude: float
+    longitude: float
+    radius_m: float
+
+    def bounding_box(self, margin_m: float = 0.0, margin_ms: int = 0):
+        """(min_t, max_t, min_lat, max_lat, min_lng, max_lng), times in seconds."""
+        reach = self.radius_m + margin_m
+        dlat = reach / _METERS_PER_DEGREE
+        cos_lat = math.cos(math.radians(self.latitude))
+        dlng = 180.0 if cos_lat < 1e-6 else min(180.0, reach / (_METERS_PER_DEGREE * cos_lat))
+        return ((self.start_ms - margin_ms) / 1000.0, (self.end_ms + margin_ms) / 1000.0,
+                self.latitude - dlat, self.latitude + dlat, self.longitude - dlng, self.longitude + dlng)
+
+
+def flight_footprint(flight_data: Dict[str, Any]) -> Optional[Footprint]:
+    """Footprint of a flight plan, or None when its date, times or area cannot be parsed."""
+    flight_date = parse_date(str(flight_data.get("flightDate") or "").strip())
+    start = parse_time_minutes(str(flight_data.get("startTime") or "").strip())
+    end = parse_time_minutes(str(flight_data.get("endTime") or "").strip())
+    if flight_date is None or start is None or end is None:
+        return None
+    center = parse_center(flight_data.get("flightAreaCenter"))
+    if center is None:
+        return None
+    latitude, longitude = center
+    try:
+        radius_m = float(flight_data.get("flightAreaRadius"))
+    except (TypeError, ValueError):
+        return None
+    # Plan times are local wall-clock times; they are compared as if UTC, consistently for every flight
+    midnight_ms = int(datetime(flight_date.year, flight_date.month, flight_date.day, tzinfo=timezone.utc).timestamp()) * 1000
+    if end <= start:
+        end += 24 * 60  # Flight ends after midnight
+    return Footprint(midnight_ms + start * 60_000, midnight_ms + end * 60_000, latitude, longitude, radius_m)
+
+
+def drone_key(flight_data: Dict[str, Any]) -> Optional[str]:
+    """Stable identity of the drone flying a plan (its serial number), or None if missing."""
+    serial_number = str(flight_data.get("serialNumber") or "").strip().upper()
+    return serial_number or None
+
+
+def onchain_registration_checker() -> Optional[Callable[[str], Optional[bool]]]:
+    """
+    A function telling whether a dataHash is registered on the flight registry contract (None when
+    the chain cannot be reached), or None when no contract is configured.
+    """
+    contract_address = CONFIG["blockchain"]["contract_address"]
+    if not contract_address:
+        return None
+    try:
+        from web3 import Web3
+    except ImportError:
+        return None
+    w3 = Web3(Web3.HTTPProvider(CONFIG["blockchain"]["rpc_url"]))
+    contract = w3.eth.contract(address=Web3.to_checksum_address(contract_address), abi=[{
+        "name": "initialHashExists", "type": "function", "stateMutability": "view",
+        "inputs": [{"name": "", "type": "bytes32"}], "outputs": [{"name": "", "type": "bool"}],
+    }])
+
+    def is_registered(data_hash: str) -> Optional[bool]:
+        try:
+            return bool(contract.functions.initialHashExists(bytes.fromhex(data_hash[2:])).call())
+        except Exception as e:
+            print(f"Warning: Could not check on-chain registration of {data_hash}: {e}", file=sys.stderr)
+            return None
+    return is_registered
+
+
+def _distance_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    half_dlat = math.radians(lat2 - lat1) / 2.0
+    half_dlng = math.radians(lng2 - lng1) / 2.0
+    a = math.sin(half_dlat) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(half_dlng) ** 2
+    return 2.0 * EARTH_RADIUS_M * math.asin(math.sqrt(min(1.0, a)))
+
+
+def _iso(timestamp_ms: int) -> str:
+    return datetime.fromtimestamp(timestamp_ms / 1000.0, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M")
+
+
+class AirspaceIndex:
+    """Spatio-temporal index of accepted flights, stored next to the flight_mappings table."""
+
+    def __init__(self, conn: sqlite3.Connection, is_registered: Optional[Callable[[str], Optional[bool]]] = None):
+        self.conn = conn
+        self.is_registered = is_registered
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS flight_airspace (
+                id INTEGER PRIMARY KEY,
+                data_hash TEXT UNIQUE,
+                drone_key TEXT,
+                start_ms INTEGER,
+                end_ms INTEGER,
+                latitude REAL,
+                longitude REAL,
+                radius_m REAL,
+                indexed_at REAL,
+                registered INTEGER DEFAULT 0
+            )
+        ''')
+        # Tables created before airspace holds lack these columns (their entries are checked on-chain)
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(flight_airspace)')}
+        for column, definition in (("drone_key", "TEXT"), ("indexed_at", "REAL"), ("registered", "INTEGER DEFAULT 0")):
+            if column not in columns:
+                conn.execute(f'ALTER TABLE flight_airspace ADD COLUMN {column} {definition}')
+        conn.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS flight_airspace_rtree USING rtree(
+                id, min_t, max_t, min_lat, max_lat, min_lng, max_lng
+            )
+        ''')
+
+    def add(self, data_hash: str, drone: Optional[str], footprint: Footprint) -> None:
+        """Index an accepted flight. The caller commits (together with its flight_mappings row)."""
+        cursor = self.conn.execute(
+            'INSERT OR IGNORE INTO flight_airspace (data_hash, drone_key, start_ms, end_ms, latitude, longitude, radius_m, '
+            'indexed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (data_hash, drone, footprint.start_ms, footprint.end_ms,
+             footprint.latitude, footprint.longitude, footprint.radius_m, time.time()))
+        if cursor.rowcount:
+            self.conn.execute('INSERT INTO flight_airspace_rtree VALUES (?, ?, ?, ?, ?, ?, ?)',
+                              (cursor.lastrowid, *footprint.bounding_box()))
+
+    def _claim(self, row_id: int, data_hash: str, indexed_at: Optional[float], registered: int) -> Optional[str]:
+        """
+        "registered" or "pending" (validated, within its hold) while an indexed flight claims its
+        airspace; None once its hold has expired without an on-chain registration being confirmed.
+        """
+        if registered:
+            return "registered"
+        if indexed_at is not None and time.time() - indexed_at < CONFIG["airspace"]["hold_minutes"] * 60:
+            return "pending"
+        status = self.is_registered(data_hash) if self.is_registered else None
+        if status:
+            self.conn.execute('UPDATE flight_airspace SET registered = 1 WHERE id = ?', (row_id,))
+            return "registered"
+        if status is False:
+            # Validated but never registered: release the airspace for good
+            self.conn.execute('DELETE FROM flight_airspace WHERE id = ?', (row_id,))
+            self.conn.execute('DELETE FROM flight_airspace_rtree WHERE id = ?', (row_id,))
+        return None
+
+    def find_conflicts(self, footprint: Footprint, exclude_drone: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Indexed flights whose area comes within the configured separation of this flight's area
+        while their time intervals (widened by the time buffer) overlap, nearest first. Flights by
+        exclude_drone (earlier submissions of the same flight, possibly edited) are ignored, as are
+        flights past their hold that are not confirmed on-chain.
+        """
+        settings = CONFIG["airspace"]
+        separation_m = float(settings["separation_m"])
+        buffer_ms = int(float(settings["time_buffer_minutes"]) * 60_000)
+        min_t, max_t, min_lat, max_lat, min_lng, max_lng = footprint.bounding_box(separation_m, buffer_ms)
+        rows = self.conn.execute('''
+            SELECT a.id, a.data_hash, a.drone_key, a.start_ms, a.end_ms, a.latitude, a.longitude, a.radius_m,
+                   a.indexed_at, a.registered
+            FROM flight_airspace_rtree r JOIN flight_airspace a ON a.id = r.id
+            WHERE r.max_t >= ? AND r.min_t <= ?
+              AND r.max_lat >= ? AND r.min_lat <= ?
+              AND r.max_lng >= ? AND r.min_lng <= ?
+        ''', (min_t, max_t, min_lat, max_lat, min_lng, max_lng)).fetchall()
+
+        conflicts = []
+        for row_id, data_hash, drone, start_ms, end_ms, latitude, longitude, radius_m, indexed_at, registered in rows:
+            # A drone cannot fly two overlapping flights, so its own overlapping entry is this flight
+            if exclude_drone is not None and drone == exclude_drone:
+                continue
+            if start_ms >= footprint.end_ms + buffer_ms or footprint.start_ms >= end_ms + buffer_ms:
+                continue
+            distance = _distance_m(footprint.latitude, footprint.longitude, latitude, longitude)
+            if distance >= footprint.radius_m + radius_m + separation_m:
+                continue
+            claim = self._claim(row_id, data_hash, indexed_at, registered)
+            if claim is None:
+                continue
+            conflicts.append({
+                "dataHash": data_hash,
+                "startTime": _iso(start_ms),
+                "endTime": _iso(end_ms),
+                "distanceMeters": round(distance, 1),
+                "flightAreaRadius": radius_m,
+                "status": claim
+            })
+        conflicts.sort(key=lambda conflict: conflict["distanceMeters"])
+        return conflicts[:int(settings["max_reported"])]
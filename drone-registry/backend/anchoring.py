@@ -0,0 +1,313 @@
+import json
+import os
+import sqlite3
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from eth_hash.auto import keccak
+from web3 import Web3
+
+from config import CONFIG
+
+# Anchors validated flight hashes on-chain in batches. Pending dataHash values from
+# flight_mappings become the leaves of a Merkle tree and only its root is sent, as the calldata
+# of one transaction (anchor(bytes32 root, uint256 leafCount)). Each flight keeps its proof, so
+# anyone can show its hash is covered by the anchored root without one transaction per flight.
+#
+# The tree follows OpenZeppelin's MerkleProof conventions: leaf = keccak(dataHash), parents hash
+# the sorted pair of their children, and an unpaired node moves up a level unchanged, so a proof
+# is the list of sibling hashes and can be checked with MerkleProof.verify on-chain.
+
+ANCHOR_SELECTOR = keccak(b"anchor(bytes32,uint256)")[:4]
+
+
+def _hash_pair(a: bytes, b: bytes) -> bytes:
+    return keccak(a + b if a < b else b + a)
+
+
+def merkle_leaf(data_hash: str) -> bytes:
+    """Leaf for a 0x-prefixed dataHash; hashing it again keeps leaves distinct from internal nodes."""
+    return keccak(bytes.fromhex(data_hash[2:] if data_hash.startswith("0x") else data_hash))
+
+
+def merkle_tree(leaves: List[bytes]) -> List[List[bytes]]:
+    """All levels of the tree, leaves first and the root last."""
+    if not leaves:
+        raise ValueError("Cannot build a Merkle tree without leaves.")
+    levels = [list(leaves)]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        parents = [_hash_pair(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            parents.append(level[-1])
+        levels.append(parents)
+    return levels
+
+
+def merkle_proof(levels: List[List[bytes]], index: int) -> List[bytes]:
+    """Sibling hashes from the leaf at index up to the root."""
+    proof = []
+    for level in levels[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append(level[sibling])
+        index //= 2
+    return proof
+
+
+def verify_proof(data_hash: str, proof: List[str], root: str) -> bool:
+    """Check an inclusion proof the same way MerkleProof.verify does."""
+    node = merkle_leaf(data_hash)
+    for sibling in proof:
+        node = _hash_pair(node, bytes.fromhex(sibling[2:]))
+    return "0x" + node.hex() == root.lower()
+
+
+class AnchoringService:
+    """Batches flight_mappings hashes into Merkle roots and anchors them with its own account."""
+
+    def __init__(self, db_path: Optional[str] = None, w3: Optional[Web3] = None, private_key: Optional[str] = None):
+        self.settings = CONFIG["anchoring"]
+        self.db_path = db_path or CONFIG["database"]["path"]
+        self.w3 = w3 or Web3(Web3.HTTPProvider(CONFIG["blockchain"]["rpc_url"]))
+        private_key = private_key or os.getenv("ANCHOR_PRIVATE_KEY")
+        if not private_key:
+            raise ValueError("ANCHOR_PRIVATE_KEY environment variable is not set.")
+        self.account = self.w3.eth.account.from_key(private_key)
+        # Without a dedicated anchor contract the root is sent to the service's own address
+        self.anchor_address = Web3.to_checksum_address(self.settings["anchor_address"] or self.account.address)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=5.0)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS flight_mappings (
+                data_hash TEXT PRIMARY KEY,
+                ipfs_cid TEXT
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS anchor_batches (
+                batch_id INTEGER PRIMARY KEY,
+                merkle_root TEXT,
+                leaf_count INTEGER,
+                nonce INTEGER,
+                tx_hash TEXT,
+                max_fee_per_gas INTEGER,
+                max_priority_fee_per_gas INTEGER,
+                status TEXT,
+                block_number INTEGER,
+                sent_at REAL
+            )
+        ''')
+        # Every transaction sent for a batch: the original and each fee-bumped replacement
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS anchor_transactions (
+                tx_hash TEXT PRIMARY KEY,
+                batch_id INTEGER,
+                sent_at REAL
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS anchor_leaves (
+                data_hash TEXT PRIMARY KEY,
+                batch_id INTEGER,
+                leaf_index INTEGER,
+                proof TEXT
+            )
+        ''')
+        return conn
+
+    # --- Transactions ---
+
+    def _next_nonce(self, conn: sqlite3.Connection) -> int:
+        """The chain's pending count, or one past the last nonce this service used if that is higher."""
+        chain_nonce = self.w3.eth.get_transaction_count(self.account.address, "pending")
+        last_used = conn.execute('SELECT MAX(nonce) FROM anchor_batches WHERE status IN (?, ?)',
+                                 ("sent", "confirmed")).fetchone()[0]
+        return max(chain_nonce, -1 if last_used is None else last_used + 1)
+
+    def _fees(self, bump_from: Optional[tuple] = None):
+        """EIP-1559 fees, bumped above a previous attempt when replacing it; None above the fee cap."""
+        base_fee = self.w3.eth.get_block("latest")["baseFeePerGas"]
+        priority_fee = self.w3.eth.max_priority_fee
+        max_fee = 2 * base_fee + priority_fee
+        if bump_from:
+            bump = 1 + self.settings["fee_bump_percent"] / 100.0
+            max_fee = max(max_fee, int(bump_from[0] * bump) + 1)
+            priority_fee = max(priority_fee, int(bump_from[1] * bump) + 1)
+        if max_fee > Web3.to_wei(self.settings["max_fee_per_gas_gwei"], "gwei"):
+            return None
+        return max_fee, priority_fee
+
+    def _send(self, root: bytes, leaf_count: int, nonce: int, fees: tuple) -> str:
+        data = ANCHOR_SELECTOR + root + leaf_count.to_bytes(32, "big")
+        tx = {
+            "chainId": CONFIG["blockchain"]["chain_id"],
+            "from": self.account.address,
+            "to": self.anchor_address,
+            "value": 0,
+            "data": data,
+            "nonce": nonce,
+            "maxFeePerGas": fees[0],
+            "maxPriorityFeePerGas": fees[1],
+        }
+        gas = self.w3.eth.estimate_gas(tx)
+        if gas > self.settings["max_gas"]:
+            raise ValueError(f"Anchoring transaction needs {gas} gas, above the limit of {self.settings['max_gas']}.")
+        tx["gas"] = gas
+        signed = self.account.sign_transaction(tx)
+        return "0x" + bytes(self.w3.eth.send_raw_transaction(signed.raw_transaction)).hex()
+
+    # --- Batches ---
+
+    def _receipt(self, conn: sqlite3.Connection, batch_id: int):
+        """Receipt of whichever transaction sent for the batch was mined (the original or a replacement), or None."""
+        tx_hashes = [row[0] for row in conn.execute(
+            'SELECT tx_hash FROM anchor_transactions WHERE batch_id = ? ORDER BY sent_at DESC', (batch_id,))]
+        for tx_hash in tx_hashes:
+            try:
+                return self.w3.eth.get_transaction_receipt(tx_hash)
+            except Exception:
+                pass  # Not mined (web3 raises TransactionNotFound)
+        return None
+
+    def _reconcile_batch(self, conn: sqlite3.Connection, batch: tuple) -> None:
+        batch_id, root, leaf_count, nonce, tx_hash, max_fee, priority_fee, sent_at = batch
+        # Read before the receipts: if the nonce is used by then, any of ours that was mined has a receipt
+        nonce_used = self.w3.eth.get_transaction_count(self.account.address, "latest") > nonce
+        receipt = self._receipt(conn, batch_id)
+        with conn:
+            if receipt is not None and receipt["status"] == 1:
+                conn.execute('UPDATE anchor_batches SET status = ?, tx_hash = ?, block_number = ? WHERE batch_id = ?',
+                             ("confirmed", "0x" + bytes(receipt["transactionHash"]).hex(), receipt["blockNumber"], batch_id))
+            elif receipt is not None:
+                conn.execute('UPDATE anchor_batches SET status = ? WHERE batch_id = ?', ("failed", batch_id))
+                conn.execute('DELETE FROM anchor_leaves WHERE batch_id = ?', (batch_id,))
+            elif nonce_used:
+                # The nonce was taken by a transaction that is none of this batch's; anchor its hashes again
+                print(f"Anchoring nonce {nonce} was used by another transaction; batch {batch_id} will be re-sent.",
+                      file=sys.stderr)
+                conn.execute('UPDATE anchor_batches SET status = ? WHERE batch_id = ?', ("dropped", batch_id))
+                conn.execute('DELETE FROM anchor_leaves WHERE batch_id = ?', (batch_id,))
+            elif time.time() - sent_at > self.settings["replace_after_seconds"]:
+                fees = self._fees(bump_from=(max_fee, priority_fee))
+                if fees is None:
+                    return
+                new_hash = self._send(bytes.fromhex(root[2:]), leaf_count, nonce, fees)
+                print(f"Replaced anchoring transaction {tx_hash} with {new_hash} (nonce {nonce}).", file=sys.stderr)
+                now = time.time()
+                conn.execute('UPDATE anchor_batches SET tx_hash = ?, max_fee_per_gas = ?, max_priority_fee_per_gas = ?, '
+                             'sent_at = ? WHERE batch_id = ?', (new_hash, fees[0], fees[1], now, batch_id))
+                conn.execute('INSERT INTO anchor_transactions (tx_hash, batch_id, sent_at) VALUES (?, ?, ?)',
+                             (new_hash, batch_id, now))
+
+    def reconcile(self) -> None:
+        """
+        Settle sent batches: confirmed ones record their block, reverted ones (or ones whose nonce went to
+        another transaction) release their hashes for the next batch, and ones pending too long are
+        replaced at the same nonce with higher fees. A failure with one batch does not stop the others.
+        """
+        conn = self._connect()
+        try:
+            sent = conn.execute('SELECT batch_id, merkle_root, leaf_count, nonce, tx_hash, max_fee_per_gas, '
+                                'max_priority_fee_per_gas, sent_at FROM anchor_batches WHERE status = ?', ("sent",)).fetchall()
+            for batch in sent:
+                try:
+                    self._reconcile_batch(conn, batch)
+                except Exception as e:
+                    print(f"Warning: Failed to reconcile anchoring batch {batch[0]}: {e}", file=sys.stderr)
+        finally:
+            conn.close()
+
+    def anchor_pending(self, force: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Anchor up to max_batch_size unanchored hashes as one Merkle root. Nothing is sent while fewer than
+        min_batch_size are pending (unless force), or while fees are above the configured cap.
+        """
+        conn = self._connect()
+        try:
+            # UPLOAD_FAILED rows still have a valid content hash and are anchored too
+            rows = conn.execute('''
+                SELECT m.data_hash FROM flight_mappings m
+                LEFT JOIN anchor_leaves l ON l.data_hash = m.data_hash
+                WHERE l.data_hash IS NULL ORDER BY m.rowid LIMIT ?
+            ''', (self.settings["max_batch_size"],)).fetchall()
+            data_hashes = [row[0] for row in rows]
+            if not data_hashes or (len(data_hashes) < self.settings["min_batch_size"] and not force):
+                return None
+            fees = self._fees()
+            if fees is None:
+                print("Anchoring deferred: gas price above the configured cap.", file=sys.stderr)
+                return None
+
+            levels = merkle_tree([merkle_leaf(data_hash) for data_hash in data_hashes])
+            root = levels[-1][0]
+            nonce = self._next_nonce(conn)
+            tx_hash = self._send(root, len(data_hashes), nonce, fees)
+            with conn:
+                batch_id = conn.execute(
+                    'INSERT INTO anchor_batches (merkle_root, leaf_count, nonce, tx_hash, max_fee_per_gas, '
+                    'max_priority_fee_per_gas, status, sent_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    ("0x" + root.hex(), len(data_hashes), nonce, tx_hash, fees[0], fees[1], "sent", time.time())).lastrowid
+                conn.executemany('INSERT INTO anchor_leaves (data_hash, batch_id, leaf_index, proof) VALUES (?, ?, ?, ?)', [
+                    (data_hash, batch_id, index, json.dumps(["0x" + node.hex() for node in merkle_proof(levels, index)]))
+                    for index, data_hash in enumerate(data_hashes)
+                ])
+                conn.execute('INSERT INTO anchor_transactions (tx_hash, batch_id, sent_at) VALUES (?, ?, ?)',
+                             (tx_hash, batch_id, time.time()))
+            print(f"Anchored {len(data_hashes)} flight hashes under root 0x{root.hex()} in {tx_hash} (nonce {nonce}).",
+                  file=sys.stderr)
+            return {"batchId": batch_id, "merkleRoot": "0x" + root.hex(), "leafCount": len(data_hashes),
+                    "txHash": tx_hash, "nonce": nonce}
+        finally:
+            conn.close()
+
+    def inclusion_proof(self, data_hash: str) -> Optional[Dict[str, Any]]:
+        """The batch, root, anchoring transaction and proof for a flight hash, or None if not batched yet."""
+        conn = self._connect()
+        try:
+            row = conn.execute('''
+                SELECT l.leaf_index, l.proof, b.batch_id, b.merkle_root, b.tx_hash, b.status, b.block_number
+                FROM anchor_leaves l JOIN anchor_batches b ON b.batch_id = l.batch_id WHERE l.data_hash = ?
+            ''', (data_hash,)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        leaf_index, proof, batch_id, root, tx_hash, status, block_number = row
+        return {"dataHash": data_hash, "leafIndex": leaf_index, "proof": json.loads(proof), "batchId": batch_id,
+                "merkleRoot": root, "txHash": tx_hash, "status": status, "blockNumber": block_number}
+
+    def run(self) -> None:
+        """Reconcile and anchor every interval_seconds until interrupted."""
+        while True:
+            # Separate so that a failing reconcile never stops new batches from being anchored
+            for step in (self.reconcile, self.anchor_pending):
+                try:
+                    step()
+                except Exception as e:
+                    print(f"Anchoring error: {e}", file=sys.stderr)
+            time.sleep(self.settings["interval_seconds"])
+
+
+if __name__ == "__main__":
+    # python anchoring.py run | once | proof <dataHash>
+    command = sys.argv[1] if len(sys.argv) > 1 else "once"
+    try:
+        service = AnchoringService()
+        if command == "run":
+            service.run()
+        elif command == "once":
+            service.reconcile()
+            print(json.dumps({"batch": service.anchor_pending(force=True), "error": None}))
+        elif command == "proof" and len(sys.argv) > 2:
+            print(json.dumps({"proof": service.inclusion_proof(sys.argv[2]), "error": None}))
+        else:
+            raise ValueError("Usage: anchoring.py run | once | proof <dataHash>")
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        sys.stderr.write(f"Error: {e}\n")
+        print(json.dumps({"error": str(e)}))
+        sys.exit(1)
@@ -0,0 +1,67 @@
+"""
+Canonical JSON encoding used for every hashed package.
+
+The canonical form is exactly `json.dumps(obj, sort_keys=True, separators=(',', ':'))`.
+Hashes of this form are already recorded on-chain, so the output must never change
+by a single byte. When orjson is installed it is tried first; its output is only used
+when it cannot differ from the stdlib encoding, otherwise the stdlib encoder runs.
+"""
+import json
+import re
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # Optional accelerator; the stdlib encoder is always correct
+    orjson = None
+
+_ORJSON_OPTIONS = 0
+if orjson is not None:
+    # Subclasses, dataclasses and datetimes are passed to _reject so they take the stdlib path
+    _ORJSON_OPTIONS = (orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_SUBCLASS
+                       | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_PASSTHROUGH_DATETIME)
+
+# Output that orjson may format differently from the stdlib:
+#   e followed by a digit or minus  exponents ("1e16" vs "1e+16", "1e-7" vs "1e-07")
+#   0.0000 not after a digit or dot  floats in [1e-5, 1e-4), written in full by orjson
+#                                    but in exponent form by repr()
+#   null                             NaN/Infinity, written as null by orjson and NaN/Infinity by the stdlib
+#   \x7f                             DEL, which the stdlib escapes as \u007f
+# Non-ASCII output is rejected separately (the stdlib escapes it as \uXXXX).
+# A match inside a string only costs a fallback, never a wrong result. The checks use
+# literal-prefixed searches, which are much faster than a character-class alternation.
+_EXPONENT = re.compile(rb"e[-0-9]")
+_SMALL_FLOAT = re.compile(rb"0\.0000")
+_NUMBER_CHARS = frozenset(b"0123456789.")
+
+
+def _may_differ(encoded: bytes) -> bool:
+    """True if orjson's output could differ from the stdlib encoding of the same object."""
+    if not encoded.isascii() or b"null" in encoded or b"\x7f" in encoded or _EXPONENT.search(encoded):
+        return True
+    # Microsecond timestamps such as "09:26:50.000050" also contain 0.0000 but follow a digit
+    return any(match.start() == 0 or encoded[match.start() - 1] not in _NUMBER_CHARS
+               for match in _SMALL_FLOAT.finditer(encoded))
+
+
+def _reject(obj: Any) -> Any:
+    raise TypeError(f"Type {type(obj).__name__} is encoded by the stdlib path")
+
+
+def stdlib_dumps(obj: Any) -> str:
+    """The reference canonical encoding."""
+    return json.dumps(obj, sort_keys=True, separators=(',', ':'))
+
+
+def canonical_dumps(obj: Any) -> str:
+    """Serialize obj to its canonical JSON string, byte-identical to stdlib_dumps."""
+    if orjson is not None:
+        try:
+            encoded = orjson.dumps(obj, default=_reject, option=_ORJSON_OPTIONS)
+        except TypeError:
+            # Unsupported types, non-str keys and integers beyond 64 bits
+            return stdlib_dumps(obj)
+        if not _may_differ(encoded):
+            return encoded.decode("ascii")
+    return stdlib_dumps(obj)
+
@@ -0,0 +1,92 @@
+import asyncio
+import json
+import sqlite3
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from admission import DeadlineExceededError, remaining_time
+from config import CONFIG
+
+# Duplicate submissions arrive as separate Python processes, so the single-flight table lives in
+# the shared SQLite state file. The first process to claim a key runs the validation; the others
+# poll for its stored result. Rows expire so a crashed leader never blocks a key for long.
+
+
+class SingleFlight:
+    """Coalesce concurrent executions that share a key into one."""
+
+    def __init__(self, state_path: Optional[str] = None):
+        self.state_path = state_path or CONFIG["coalescing"]["state_path"]
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.state_path, timeout=5.0, isolation_level=None)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS single_flight (
+                key TEXT PRIMARY KEY,
+                state TEXT,
+                result TEXT,
+                expires_at REAL
+            )
+        ''')
+        return conn
+
+    def _claim(self, conn: sqlite3.Connection, key: str):
+        """Become the leader for key, or return the state and stored result of the current leader."""
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute('DELETE FROM single_flight WHERE expires_at < ?', (now,))
+            row = conn.execute('SELECT state, result FROM single_flight WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                conn.execute("INSERT INTO single_flight (key, state, result, expires_at) VALUES (?, 'running', NULL, ?)",
+                             (key, now + CONFIG["coalescing"]["lease_ttl_seconds"]))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return ("leader", None) if row is None else row
+
+    def _complete(self, conn: sqlite3.Connection, key: str, result: Any) -> None:
+        # The result stays available briefly so retries that arrive just after completion reuse it
+        conn.execute("UPDATE single_flight SET state = 'done', result = ?, expires_at = ? WHERE key = ?",
+                     (json.dumps(result), time.time() + CONFIG["coalescing"]["result_ttl_seconds"], key))
+
+    def _abandon(self, conn: sqlite3.Connection, key: str) -> None:
+        conn.execute("DELETE FROM single_flight WHERE key = ? AND state = 'running'", (key,))
+
+    async def run(self, key: str, func: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        Run func() unless an identical execution is in flight, in which case await its result
+        (within the current deadline, else DeadlineExceededError).
+        """
+        if not CONFIG["coalescing"]["enabled"]:
+            return await func()
+        conn = self._connect()
+        try:
+            while True:
+                state, stored = self._claim(conn, key)
+                if state == "leader":
+                    try:
+                        result = await func()
+                    except BaseException:
+                        # Let a waiting duplicate take over instead of waiting for the lease to expire
+                        self._abandon(conn, key)
+                        raise
+                    try:
+                        self._complete(conn, key, result)
+                    except (sqlite3.Error, TypeError, ValueError) as e:
+                        print(f"Warning: Failed to share coalesced result: {e}", file=sys.stderr)
+                        self._abandon(conn, key)
+                    return result
+                if state == "done":
+                    print(f"Reusing result of identical validation {key[:18]}...", file=sys.stderr)
+                    return json.loads(stored)
+                # Another process is running the same validation; its row disappears if it fails
+                poll_interval = CONFIG["coalescing"]["poll_interval_seconds"]
+                remaining = remaining_time()
+                if remaining is not None and remaining < poll_interval:
+                    raise DeadlineExceededError(f"deadline passed while waiting for identical validation {key[:18]}...")
+                await asyncio.sleep(poll_interval)
+        finally:
+            conn.close()
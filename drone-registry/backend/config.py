@@ -30,10 +30,159 @@ CONFIG = {
             "purpose"
         ]
     },
+    "telemetry": {
+        "max_altitude_m": float(os.getenv("TELEMETRY_MAX_ALTITUDE_M", "120")),
+        "max_speed_mps": float(os.getenv("TELEMETRY_MAX_SPEED_MPS", "30")),
+        "speed_spike_delta_mps": float(os.getenv("TELEMETRY_SPEED_SPIKE_DELTA_MPS", "10")),
+        # Windows are in seconds so the checks behave the same at any sample rate
+        "speed_spike_window_seconds": float(os.getenv("TELEMETRY_SPEED_SPIKE_WINDOW_SECONDS", "5")),
+        "max_climb_rate_mps": float(os.getenv("TELEMETRY_MAX_CLIMB_RATE_MPS", "6")),
+        "climb_rate_window_seconds": float(os.getenv("TELEMETRY_CLIMB_RATE_WINDOW_SECONDS", "3")),
+        "min_battery_reserve": float(os.getenv("TELEMETRY_MIN_BATTERY_RESERVE", "10")),
+        "operating_hours_start": os.getenv("OPERATING_HOURS_START", "09:00"),
+        "operating_hours_end": os.getenv("OPERATING_HOURS_END", "17:30")
+    },
+    "solar": {
+        # Flight plan times are local; West Africa Time (UTC+1) has no daylight saving
+        "utc_offset_hours": float(os.getenv("FLIGHT_UTC_OFFSET_HOURS", "1")),
+        # Dawn/dusk are computed once per date and cell of this size
+        "cell_degrees": float(os.getenv("SOLAR_CELL_DEGREES", "0.1")),
+        # Sun zenith angle (degrees) beyond which it is night; 96 is civil twilight, 6 degrees below the horizon
+        "zenith": float(os.getenv("SOLAR_TWILIGHT_ZENITH", "96"))
+    },
+    "geofence": {
+        "tolerance_m": float(os.getenv("GEOFENCE_TOLERANCE_M", "5"))
+    },
+    "dgip": {
+        # Unset disables simplification; uploads then contain every waypoint as before
+        "simplify_tolerance_m": float(os.getenv("DGIP_SIMPLIFY_TOLERANCE_M")) if os.getenv("DGIP_SIMPLIFY_TOLERANCE_M") else None,
+        "simplify_altitude_tolerance_m": float(os.getenv("DGIP_SIMPLIFY_ALTITUDE_TOLERANCE_M", "2")),
+        "simplify_speed_tolerance_mps": float(os.getenv("DGIP_SIMPLIFY_SPEED_TOLERANCE_MPS", "1")),
+        "simplify_battery_tolerance": float(os.getenv("DGIP_SIMPLIFY_BATTERY_TOLERANCE", "1")),
+        "simplify_max_interval_seconds": float(os.getenv("DGIP_SIMPLIFY_MAX_INTERVAL_SECONDS", "60"))
+    },
+    "airspace": {
+        "enabled": os.getenv("AIRSPACE_CONFLICTS_ENABLED", "True").lower() == "true",
+        # Extra distance between flight areas and extra time between flights required for no conflict
+        "separation_m": float(os.getenv("AIRSPACE_SEPARATION_M", "0")),
+        "time_buffer_minutes": float(os.getenv("AIRSPACE_TIME_BUFFER_MINUTES", "0")),
+        # Validated flights claim their airspace for this long; afterwards only once registered on-chain
+        "hold_minutes": float(os.getenv("AIRSPACE_HOLD_MINUTES", "60")),
+        # Conflicts are reported only; when true they also block registration
+        "block_on_conflict": os.getenv("AIRSPACE_BLOCK_ON_CONFLICT", "False").lower() == "true",
+        "max_reported": int(os.getenv("AIRSPACE_MAX_REPORTED", "20"))
+    },
+    "ingest": {
+        # Flight logs are thinned to at most one waypoint per interval (0 keeps every fix)
+        "min_interval_seconds": float(os.getenv("INGEST_MIN_INTERVAL_SECONDS", "1")),
+        # Serialized package bytes buffered before each hash update and spool write
+        "write_buffer_bytes": int(os.getenv("INGEST_WRITE_BUFFER_BYTES", "65536")),
+        # UTC offset of the flight's local time: UTC log times are converted to it, local log times are tagged with it
+        "utc_offset_minutes": int(os.getenv("INGEST_UTC_OFFSET_MINUTES", "0")),
+        # Waypoints converted to telemetry arrays at a time while a log is streamed
+        "analysis_chunk_waypoints": int(os.getenv("INGEST_ANALYSIS_CHUNK_WAYPOINTS", "10000"))
+    },
+    "risk_grid": {
+        "enabled": os.getenv("RISK_GRID_ENABLED", "True").lower() == "true",
+        # Precision 6 cells are about 1.2 km x 0.6 km
+        "geohash_precision": int(os.getenv("RISK_GRID_GEOHASH_PRECISION", "6"))
+    },
+    "verification": {
+        # Local cache of IPFS package content, keyed by CID; least recently used files are evicted
+        "cache_dir": os.getenv("PACKAGE_CACHE_DIR", "package_cache"),
+        "cache_max_bytes": int(os.getenv("PACKAGE_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+        # Packages verified at once by a batch request
+        "max_parallel": int(os.getenv("VERIFY_MAX_PARALLEL", "8")),
+        "chunk_bytes": int(os.getenv("VERIFY_CHUNK_BYTES", "65536"))
+    },
+    "anchoring": {
+        # Receiver of the anchoring transactions; empty sends them to the anchoring account itself
+        "anchor_address": os.getenv("ANCHOR_ADDRESS", ""),
+        "min_batch_size": int(os.getenv("ANCHOR_MIN_BATCH_SIZE", "1")),
+        "max_batch_size": int(os.getenv("ANCHOR_MAX_BATCH_SIZE", "1024")),
+        "interval_seconds": int(os.getenv("ANCHOR_INTERVAL_SECONDS", "300")),
+        "max_gas": int(os.getenv("ANCHOR_MAX_GAS", "100000")),
+        # Anchoring waits while maxFeePerGas would exceed this
+        "max_fee_per_gas_gwei": float(os.getenv("ANCHOR_MAX_FEE_PER_GAS_GWEI", "50")),
+        # A transaction still pending after this long is replaced at the same nonce
+        "replace_after_seconds": int(os.getenv("ANCHOR_REPLACE_AFTER_SECONDS", "600")),
+        "fee_bump_percent": int(os.getenv("ANCHOR_FEE_BUMP_PERCENT", "15"))
+    },
+    "archive": {
+        "enabled": os.getenv("TELEMETRY_ARCHIVE_ENABLED", "True").lower() == "true",
+        "directory": os.getenv("TELEMETRY_ARCHIVE_DIR", "telemetry_archive"),
+        # One sparse index entry per this many records of a flight
+        "index_stride": int(os.getenv("TELEMETRY_ARCHIVE_INDEX_STRIDE", "64"))
+    },
+    "llm": {
+        "model": os.getenv("LLM_MODEL", "gpt-4o-mini")
+    },
+    "prompt": {
+        "max_tokens": int(os.getenv("PROMPT_MAX_TOKENS", "3000")),
+        "max_nfz_zones": int(os.getenv("PROMPT_MAX_NFZ_ZONES", "10")),
+        "retrieval_top_k": int(os.getenv("PROMPT_RETRIEVAL_TOP_K", "2"))
+    },
+    "regulations": {
+        # "vector" (LlamaParse + embeddings) or "bm25" (local lexical retrieval, no network calls)
+        "retriever": os.getenv("REGULATIONS_RETRIEVER", "vector").lower()
+    },
+    "limits": {
+        "enabled": os.getenv("ADMISSION_CONTROL_ENABLED", "True").lower() == "true",
+        # Shared by every backend process on the host
+        "state_path": os.getenv("ADMISSION_STATE_PATH", "admission_state.db"),
+        "request_deadline_seconds": float(os.getenv("REQUEST_DEADLINE_SECONDS", "120")),
+        # Upper bound on how long a crashed process can hold a slot
+        "lease_ttl_seconds": float(os.getenv("ADMISSION_LEASE_TTL_SECONDS", "300")),
+        "poll_interval_seconds": float(os.getenv("ADMISSION_POLL_INTERVAL_SECONDS", "0.05")),
+        # 0 disables a limit; tpm only applies to LLM calls
+        "destinations": {
+            "openai": {
+                "max_concurrency": int(os.getenv("OPENAI_MAX_CONCURRENCY", "4")),
+                "rpm": float(os.getenv("OPENAI_RPM", "500")),
+                "tpm": float(os.getenv("OPENAI_TPM", "200000")),
+                "max_queue": int(os.getenv("OPENAI_MAX_QUEUE", "32")),
+                # Added to the prompt size when reserving TPM for each LLM request
+                "completion_tokens": int(os.getenv("OPENAI_COMPLETION_TOKEN_ESTIMATE", "1024"))
+            },
+            "mcp": {
+                "max_concurrency": int(os.getenv("MCP_MAX_CONCURRENCY", "4")),
+                "rpm": float(os.getenv("MCP_RPM", "120")),
+                "tpm": 0,
+                "max_queue": int(os.getenv("MCP_MAX_QUEUE", "32"))
+            },
+            "ipfs": {
+                "max_concurrency": int(os.getenv("IPFS_MAX_CONCURRENCY", "8")),
+                "rpm": float(os.getenv("IPFS_RPM", "0")),
+                "tpm": 0,
+                "max_queue": int(os.getenv("IPFS_MAX_QUEUE", "64"))
+            }
+        }
+    },
+    "coalescing": {
+        "enabled": os.getenv("COALESCE_VALIDATIONS", "True").lower() == "true",
+        "state_path": os.getenv("ADMISSION_STATE_PATH", "admission_state.db"),
+        # How long a running validation may hold its key if the process dies
+        "lease_ttl_seconds": float(os.getenv("COALESCE_LEASE_TTL_SECONDS", "180")),
+        # How long a finished result is reused by late duplicates
+        "result_ttl_seconds": float(os.getenv("COALESCE_RESULT_TTL_SECONDS", "10")),
+        "poll_interval_seconds": float(os.getenv("COALESCE_POLL_INTERVAL_SECONDS", "0.1"))
+    },
+    "http": {
+        # Shared OpenAI clients (httpx); HTTP/2 is used when the h2 package is installed
+        "http2": os.getenv("HTTP2_ENABLED", "True").lower() == "true",
+        "max_connections": int(os.getenv("HTTP_MAX_CONNECTIONS", "20")),
+        "max_keepalive_connections": int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "10")),
+        "keepalive_expiry_seconds": float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "30")),
+        "connect_timeout_seconds": float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "10")),
+        "openai_timeout_seconds": float(os.getenv("OPENAI_TIMEOUT_SECONDS", "60")),
+        # Pooled connections to the IPFS API; endpoint and timeout come from CONFIG["ipfs"]
+        "ipfs_max_connections": int(os.getenv("IPFS_MAX_CONNECTIONS", "10"))
+    },
     "api": {
         "host": os.getenv("API_HOST", "0.0.0.0"),
         "port": int(os.getenv("API_PORT", "8000")),
-        "debug": os.getenv("DEBUG", "False").lower() == "true"
+        "debug": os.getenv("DEBUG", "False").lower() == "true",
+        "stream_validation": os.getenv("VALIDATION_STREAM", "False").lower() == "true"
     },
     "logging": {
         "level": os.getenv("LOG_LEVEL", "INFO"),
@@ -42,5 +191,13 @@ CONFIG = {
     },
     "database": {
         "path": os.getenv("DB_PATH", "flight_data.db")
+    },
+    "profiling": {
+        "enabled": os.getenv("PROFILE_ENABLED", "False").lower() == "true",
+        "sample_rate": float(os.getenv("PROFILE_SAMPLE_RATE", "1.0")),
+        "output_dir": os.getenv("PROFILE_DIR", "profiles"),
+        "loop_lag_interval_ms": float(os.getenv("PROFILE_LOOP_LAG_INTERVAL_MS", "50")),
+        "tracemalloc_frames": int(os.getenv("PROFILE_TRACEMALLOC_FRAMES", "10")),
+        "top_n": int(os.getenv("PROFILE_TOP_N", "50"))
     }
 }
\ No newline at end of file
@@ -0,0 +1,353 @@
+import argparse
+import asyncio
+import csv
+import datetime
+import json
+import math
+import os
+import struct
+import sys
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from config import CONFIG
+
+# Streaming readers that turn real autopilot logs into DGIP waypoints
+# (timestamp, latitude, longitude, altitude, speed, heading, battery), one at a time.
+# Nothing holds more than the current record, so logs of any length are read in constant memory.
+#
+# Every reader emits timestamps in the flight's local time with an explicit UTC offset
+# (CONFIG["ingest"]["utc_offset_minutes"] unless given): times the log records in UTC
+# (tlog, Airdata datetime(utc)) are converted to it, and local times (DJI CUSTOM.date [local])
+# are tagged with it. Naive values in generic timestamp columns are taken as UTC.
+
+FEET = 0.3048
+MPH = 0.44704
+KMH = 1 / 3.6
+
+# --- CSV exports (DJI flight records converted by Airdata, PhantomHelp, DatCon, ...) ---
+
+# Header aliases (lowercased, stripped) and the factor that converts each to SI units
+CSV_COLUMNS: Dict[str, List[Tuple[str, float]]] = {
+    "latitude": [("latitude", 1.0), ("osd.latitude", 1.0), ("lat", 1.0)],
+    "longitude": [("longitude", 1.0), ("osd.longitude", 1.0), ("lon", 1.0), ("lng", 1.0)],
+    "altitude": [("altitude(m)", 1.0), ("height_above_takeoff(meters)", 1.0), ("height_above_takeoff(feet)", FEET),
+                 ("osd.height [m]", 1.0), ("osd.height [ft]", FEET), ("altitude", 1.0)],
+    "speed": [("speed(m/s)", 1.0), ("speed(mps)", 1.0), ("speed(mph)", MPH), ("speed(km/h)", KMH),
+              ("osd.hspeed [m/s]", 1.0), ("osd.hspeed [mph]", MPH), ("speed", 1.0)],
+    "heading": [("compass_heading(degrees)", 1.0), ("osd.yaw [360]", 1.0), ("osd.yaw", 1.0), ("heading", 1.0), ("yaw", 1.0)],
+    "battery": [("battery_percent", 1.0), ("battery.chargelevel", 1.0), ("battery(%)", 1.0), ("battery", 1.0)],
+}
+_CSV_TIMESTAMP_COLUMNS = ("datetime(utc)", "timestamp", "time(utc)", "datetime")
+_CSV_OFFSET_COLUMN = "time(millisecond)"
+_CSV_DJI_DATE_COLUMNS = ("custom.date [local]", "custom.updatetime [local]")
+
+
+def _waypoint(timestamp: datetime.datetime, latitude: float, longitude: float, altitude: Optional[float],
+              speed: Optional[float], heading: Optional[float], battery: Optional[float]) -> Dict[str, Any]:
+    """A DGIP waypoint, rounded like dgip_simulation output."""
+    def rounded(value: Optional[float], digits: int) -> Optional[float]:
+        return None if value is None or math.isnan(value) else round(value, digits)
+    return {
+        "timestamp": timestamp.isoformat(timespec="milliseconds" if timestamp.microsecond else "seconds"),
+        "latitude": round(latitude, 6),
+        "longitude": round(longitude, 6),
+        "altitude": rounded(altitude, 2),
+        "speed": rounded(speed, 2),
+        "heading": None if heading is None else round(heading % 360, 2),
+        "battery": rounded(battery, 2),
+    }
+
+
+def _flight_timezone(utc_offset_minutes: Optional[float]) -> datetime.timezone:
+    if utc_offset_minutes is None:
+        utc_offset_minutes = CONFIG["ingest"]["utc_offset_minutes"]
+    return datetime.timezone(datetime.timedelta(minutes=utc_offset_minutes))
+
+
+def _localize(timestamp: datetime.datetime, timezone: datetime.timezone, naive_is_utc: bool) -> datetime.datetime:
+    """The timestamp in the flight's time zone; naive values are UTC or already local."""
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=datetime.timezone.utc if naive_is_utc else timezone)
+    return timestamp.astimezone(timezone)
+
+
+def _throttle(min_interval_seconds: float) -> Callable[[datetime.datetime], bool]:
+    """Predicate that accepts a timestamp only if min_interval_seconds passed since the last accepted one."""
+    last: List[Optional[datetime.datetime]] = [None]
+
+    def accept(timestamp: datetime.datetime) -> bool:
+        if last[0] is not None and (timestamp - last[0]).total_seconds() < min_interval_seconds:
+            return False
+        last[0] = timestamp
+        return True
+    return accept
+
+
+def _parse_csv_timestamp(value: str) -> datetime.datetime:
+    value = value.strip().replace("Z", "+00:00")
+    for pattern in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%m/%d/%Y %I:%M:%S.%f %p", "%m/%d/%Y %I:%M:%S %p"):
+        try:
+            return datetime.datetime.strptime(value, pattern)
+        except ValueError:
+            continue
+    return datetime.datetime.fromisoformat(value)
+
+
+def _float(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _column_value(row: List[str], column: Optional[Tuple[int, float]]) -> Optional[float]:
+    """The row's value in a resolved (index, scale) column, converted to SI units."""
+    if column is None or column[0] >= len(row):
+        return None
+    number = _float(row[column[0]])
+    return None if number is None else number * column[1]
+
+
+def iter_csv_waypoints(path: str, min_interval_seconds: Optional[float] = None,
+                       utc_offset_minutes: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+    """Stream waypoints from a flight-log CSV export; rows without a GPS fix are skipped."""
+    if min_interval_seconds is None:
+        min_interval_seconds = CONFIG["ingest"]["min_interval_seconds"]
+    accept = _throttle(min_interval_seconds)
+    timezone = _flight_timezone(utc_offset_minutes)
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = [name.strip().lower() for name in next(reader, [])]
+        positions = {name: index for index, name in enumerate(header)}
+
+        columns: Dict[str, Optional[Tuple[int, float]]] = {}
+        for field, aliases in CSV_COLUMNS.items():
+            columns[field] = next(((positions[name], scale) for name, scale in aliases if name in positions), None)
+        if columns["latitude"] is None or columns["longitude"] is None:
+            raise ValueError(f"{path}: no latitude/longitude columns found in the CSV header.")
+        timestamp_column = next((positions[name] for name in _CSV_TIMESTAMP_COLUMNS if name in positions), None)
+        offset_column = positions.get(_CSV_OFFSET_COLUMN)
+        dji_columns = tuple(positions.get(name) for name in _CSV_DJI_DATE_COLUMNS)
+        if timestamp_column is None and None in dji_columns:
+            raise ValueError(f"{path}: no timestamp column found in the CSV header.")
+
+        start: Optional[datetime.datetime] = None
+        for row in reader:
+            latitude, longitude = _column_value(row, columns["latitude"]), _column_value(row, columns["longitude"])
+            if latitude is None or longitude is None or (latitude == 0 and longitude == 0):
+                continue
+            try:
+                if timestamp_column is not None:
+                    timestamp = _localize(_parse_csv_timestamp(row[timestamp_column]), timezone, naive_is_utc=True)
+                    # Airdata writes whole seconds plus a millisecond offset from the start of the log
+                    if offset_column is not None and _float(row[offset_column]) is not None:
+                        start = start or timestamp - datetime.timedelta(milliseconds=_float(row[offset_column]))
+                        timestamp = start + datetime.timedelta(milliseconds=_float(row[offset_column]))
+                else:
+                    timestamp = _localize(_parse_csv_timestamp(f"{row[dji_columns[0]]} {row[dji_columns[1]]}"),
+                                          timezone, naive_is_utc=False)
+            except (IndexError, ValueError):
+                continue
+            if accept(timestamp):
+                yield _waypoint(timestamp, latitude, longitude, _column_value(row, columns["altitude"]),
+                                _column_value(row, columns["speed"]), _column_value(row, columns["heading"]),
+                                _column_value(row, columns["battery"]))
+
+
+# --- MAVLink telemetry logs (.tlog: each packet prefixed by a big-endian microsecond timestamp) ---
+
+_MAVLINK_V1 = 0xFE
+_MAVLINK_V2 = 0xFD
+_MSG_SYS_STATUS = 1
+_MSG_GLOBAL_POSITION_INT = 33
+_MSG_VFR_HUD = 74
+# Per-message CRC seeds and payload lengths from the MAVLink common dialect
+_CRC_EXTRA = {_MSG_SYS_STATUS: 124, _MSG_GLOBAL_POSITION_INT: 104, _MSG_VFR_HUD: 20}
+_PAYLOAD_LENGTH = {_MSG_SYS_STATUS: 31, _MSG_GLOBAL_POSITION_INT: 28, _MSG_VFR_HUD: 20}
+# Timestamp, MAVLink 2 header, largest payload, CRC and signature
+_MAX_RECORD = 8 + 10 + 255 + 2 + 13
+_GLOBAL_POSITION_INT = struct.Struct("<IiiiihhhH")
+_VFR_HUD = struct.Struct("<ffffhH")
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def _x25_crc(data: bytes, crc: int = 0xFFFF) -> int:
+    for byte in data:
+        tmp = byte ^ (crc & 0xFF)
+        tmp = (tmp ^ (tmp << 4)) & 0xFF
+        crc = ((crc >> 8) ^ (tmp << 8) ^ (tmp << 3) ^ (tmp >> 4)) & 0xFFFF
+    return crc
+
+
+def iter_tlog_packets(path: str, read_size: int = 1 << 16) -> Iterator[Tuple[int, int, bytes]]:
+    """
+    Stream (timestamp_us, message_id, payload) for the messages used by ingestion, with valid CRCs.
+    Other messages are skipped without decoding; corrupt bytes are skipped until the next valid packet.
+    """
+    buffer = bytearray()
+    position = 0
+    eof = False
+    with open(path, "rb") as f:
+        while True:
+            # Keep at least one whole record buffered so a packet never straddles a read
+            while not eof and len(buffer) - position < _MAX_RECORD:
+                del buffer[:position]
+                position = 0
+                chunk = f.read(read_size)
+                eof = not chunk
+                buffer += chunk
+            if len(buffer) - position < 8 + 12:
+                return
+            magic = buffer[position + 8]
+            if magic == _MAVLINK_V1:
+                header_length, signature = 6, 0
+                message_id = buffer[position + 13]
+            elif magic == _MAVLINK_V2:
+                header_length = 10
+                signature = 13 if buffer[position + 10] & 0x01 else 0
+                message_id = int.from_bytes(buffer[position + 15:position + 18], "little")
+            else:
+                position += 1
+                continue
+            payload_start = position + 8 + header_length
+            payload_end = payload_start + buffer[position + 9]
+            end = payload_end + 2 + signature
+            if end > len(buffer):
+                # Truncated final packet, or a false magic byte near the end of the file
+                position += 1
+                continue
+            if message_id in _CRC_EXTRA:
+                crc = int.from_bytes(buffer[payload_end:payload_end + 2], "little")
+                if _x25_crc(bytes([_CRC_EXTRA[message_id]]), _x25_crc(buffer[position + 9:payload_end])) != crc:
+                    position += 1
+                    continue
+                timestamp_us = int.from_bytes(buffer[position:position + 8], "big")
+                # MAVLink 2 truncates trailing zero bytes of the payload
+                payload = bytes(buffer[payload_start:payload_end]).ljust(_PAYLOAD_LENGTH[message_id], b"\0")
+                yield timestamp_us, message_id, payload
+            position = end
+
+
+def iter_tlog_waypoints(path: str, min_interval_seconds: Optional[float] = None,
+                        utc_offset_minutes: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Stream waypoints from a MAVLink .tlog: one per GLOBAL_POSITION_INT, with the latest battery
+    level (SYS_STATUS) and, when the position message lacks it, the latest VFR_HUD heading.
+    """
+    if min_interval_seconds is None:
+        min_interval_seconds = CONFIG["ingest"]["min_interval_seconds"]
+    accept = _throttle(min_interval_seconds)
+    timezone = _flight_timezone(utc_offset_minutes)
+    battery: Optional[float] = None
+    hud_heading: Optional[float] = None
+    for timestamp_us, message_id, payload in iter_tlog_packets(path):
+        if message_id == _MSG_SYS_STATUS:
+            remaining = struct.unpack_from("<b", payload, 30)[0]
+            battery = None if remaining < 0 else float(remaining)
+        elif message_id == _MSG_VFR_HUD:
+            hud_heading = float(_VFR_HUD.unpack(payload)[4])
+        else:
+            _, lat, lon, _, relative_alt, vx, vy, _, hdg = _GLOBAL_POSITION_INT.unpack(payload)
+            if lat == 0 and lon == 0:
+                continue  # No GPS fix yet
+            # The tlog prefix is microseconds since the Unix epoch, in UTC
+            timestamp = (_EPOCH + datetime.timedelta(microseconds=timestamp_us)).astimezone(timezone)
+            if not accept(timestamp):
+                continue
+            heading = hdg / 100.0 if hdg != 0xFFFF else hud_heading
+            yield _waypoint(timestamp, lat / 1e7, lon / 1e7, relative_alt / 1000.0,
+                            math.hypot(vx, vy) / 100.0, heading, battery)
+
+
+LOG_READERS: Dict[str, Callable[..., Iterator[Dict[str, Any]]]] = {
+    "csv": iter_csv_waypoints,
+    "tlog": iter_tlog_waypoints,
+}
+
+
+def iter_log_waypoints(path: str, log_format: Optional[str] = None,
+                       utc_offset_minutes: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+    """Stream DGIP waypoints from a flight log; the format defaults to the file extension."""
+    log_format = (log_format or os.path.splitext(path)[1].lstrip(".")).lower()
+    if log_format not in LOG_READERS:
+        raise ValueError(f"Unsupported flight log format '{log_format}'. Expected one of: {', '.join(LOG_READERS)}.")
+    return LOG_READERS[log_format](path, utc_offset_minutes=utc_offset_minutes)
+
+
+def _parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="dgip_ingest.py", description="Ingest a flight log as a DGIP package.")
+    parser.add_argument("path", help="Flight log file")
+    parser.add_argument("format", nargs="?", choices=sorted(LOG_READERS), help="Log format (defaults to the extension)")
+    parser.add_argument("--center", help="Registered flightAreaCenter as 'lat,lng', for the geofence check")
+    parser.add_argument("--radius", type=float, help="Registered flightAreaRadius in metres")
+    parser.add_argument("--utc-offset", type=int, help="UTC offset of the flight's local time, in minutes")
+    return parser.parse_args(argv)
+
+
+async def main():
+    """
+    Ingest a flight log and print its DGIP hash, CID and telemetry/geofence analysis.
+
+    The log is streamed once: waypoints are hashed and spooled for IPFS while being converted
+    to telemetry arrays in bounded chunks, which are then archived, analyzed and added to the
+    risk grid exactly as process_dgip does for uploaded logs.
+    """
+    # Imported here so the readers above stay usable without the IPFS stack
+    from admission import deadline_scope
+    from http_clients import close_http_clients
+    from process_dgip import analyze_dgip_columns, collect_columns, concat_columns, process_dgip_stream
+    from risk_grid import record_dgip
+    from rules_engine import parse_center
+    from telemetry_archive import TelemetryArchive
+    args = _parse_args(sys.argv[1:])
+    try:
+        flight_area = None
+        if args.center is not None or args.radius is not None:
+            center = parse_center(args.center)
+            if center is None or args.radius is None:
+                raise ValueError("--center 'lat,lng' and --radius must be given together.")
+            flight_area = {"flightAreaCenter": {"latitude": center[0], "longitude": center[1]},
+                           "flightAreaRadius": args.radius}
+
+        first: List[Dict[str, Any]] = []
+
+        def remember_first(stream: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+            for waypoint in stream:
+                if not first:
+                    first.append(waypoint)
+                yield waypoint
+
+        chunks: List[Dict[str, Any]] = []
+        waypoints = collect_columns(remember_first(iter_log_waypoints(args.path, args.format, args.utc_offset)), chunks)
+        try:
+            with deadline_scope(CONFIG["limits"]["request_deadline_seconds"]):
+                dgip_data_hash, ipfs_cid, count, error = await process_dgip_stream(waypoints)
+        finally:
+            await close_http_clients()
+
+        analysis = {"telemetryCompliance": None, "geofence": None}
+        if not error:
+            columns = concat_columns(chunks)
+            if CONFIG["archive"]["enabled"]:
+                try:
+                    TelemetryArchive().append_columns(dgip_data_hash, columns)
+                except Exception as e:
+                    sys.stderr.write(f"Warning: Failed to archive DGIP data: {e}\n")
+            analysis = analyze_dgip_columns(columns, flight_area)
+            try:
+                # Only the first waypoint is used, for the cell and hour when there is no flight area
+                record_dgip(first, analysis, flight_area)
+            except Exception as e:
+                sys.stderr.write(f"Warning: Failed to update the risk grid: {e}\n")
+
+        print(json.dumps({"dgipDataHash": dgip_data_hash, "ipfsCid": ipfs_cid, "waypoints": count,
+                          "telemetryCompliance": analysis["telemetryCompliance"], "geofence": analysis["geofence"],
+                          "error": error}))
+    except (ValueError, OSError) as e:
+        sys.stderr.write(f"Error: {e}\n")
+        print(json.dumps({"dgipDataHash": None, "ipfsCid": None, "error": str(e)}))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -7,7 +7,8 @@ import sys
 # Define the target number of simulated points
 TARGET_NUM_POINTS = 10
 
-def generate_dgip_data(center_lat, center_lng, radius_meters, start_time_iso, end_time_iso):
+def generate_dgip_data(center_lat, center_lng, radius_meters, start_time_iso, end_time_iso,
+                       num_points=TARGET_NUM_POINTS):
     """
     Generates simulated DGIP data for a flight path with a fixed number of points.
 
@@ -17,6 +18,7 @@ def generate_dgip_data(center_lat, center_lng, radius_meters, start_time_iso, en
         radius_meters (float): Radius of the flight area in meters.
         start_time_iso (str): ISO 8601 string for the flight start time.
         end_time_iso (str): ISO 8601 string for the flight end time.
+        num_points (int): Number of points to simulate (fleet simulations derive it from a sample rate).
 
     Returns:
         list: A list of dictionaries, where each dictionary is a DGIP log entry.
@@ -52,8 +54,8 @@ def generate_dgip_data(center_lat, center_lng, radius_meters, start_time_iso, en
                 }]
             return [] # Return empty list if end time is before start time
 
-        # Use the fixed target number of points
-        num_points_to_generate = TARGET_NUM_POINTS
+        # Use the requested number of points (TARGET_NUM_POINTS by default)
+        num_points_to_generate = num_points
 
         # Calculate the time interval needed to get the target number of points over the duration
         # Avoid division by zero if only one point is requested (though TARGET_NUM_POINTS is fixed at 10)
@@ -0,0 +1,176 @@
+import datetime
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from canonical_json import canonical_dumps
+from dgip_simulation import generate_dgip_data
+from telemetry_archive import RECORD_DTYPE
+from telemetry_compliance import waypoints_to_arrays
+
+# Fleet-scale synthetic DGIP datasets for capacity testing. Flights are split into shards; each
+# shard is generated by one worker process and written straight to its own file. Every shard
+# draws from its own generator seeded by (seed, shard index), so a run is reproducible for a given
+# spec no matter how many workers execute it.
+
+DEFAULT_SPEC: Dict[str, Any] = {
+    "flights": 1000,
+    "shards": 8,
+    "workers": None,  # Defaults to the number of CPUs
+    "seed": 0,
+    "format": "ndjson",  # "ndjson" (one flight per line) or "npy" (telemetry_archive records)
+    "output_dir": "fleet_simulation",
+    # Flight area centres are drawn around these sites, chosen by weight
+    "centers": [{"latitude": 6.5244, "longitude": 3.3792, "spread_m": 20000, "weight": 1}],
+    # Each distribution is a number, {"min", "max"} (uniform) or {"choices", "weights"?}
+    "radius_m": {"min": 50, "max": 1000},
+    "duration_minutes": {"min": 5, "max": 60},
+    "sample_interval_seconds": {"choices": [1, 2, 5]},
+    "start_date": "2025-01-01",
+    "days": 365,
+    "earliest_start": "09:00",
+    "latest_start": "16:00",
+}
+
+NPY_DTYPE = np.dtype([("flight", "<i8")] + [(name, RECORD_DTYPE[name]) for name in RECORD_DTYPE.names])
+
+_METERS_PER_DEGREE = 111_000.0
+
+
+def _sample(rng: np.random.Generator, distribution: Any) -> float:
+    if isinstance(distribution, (int, float)):
+        return float(distribution)
+    if "choices" in distribution:
+        weights = distribution.get("weights")
+        if weights is not None:
+            weights = np.asarray(weights, dtype=float) / np.sum(weights)
+        return float(rng.choice(distribution["choices"], p=weights))
+    return float(rng.uniform(distribution["min"], distribution["max"]))
+
+
+def _minutes(value: str) -> int:
+    hours, minutes = value.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def sample_flight(rng: np.random.Generator, spec: Dict[str, Any]) -> Dict[str, Any]:
+    """Draw the parameters of one flight from the spec's distributions."""
+    centers = spec["centers"]
+    weights = np.asarray([center.get("weight", 1) for center in centers], dtype=float)
+    site = centers[int(rng.choice(len(centers), p=weights / weights.sum()))]
+    # Uniform over a disk of radius spread_m around the site
+    distance = site.get("spread_m", 0) * math.sqrt(rng.random())
+    bearing = rng.uniform(0, 2 * math.pi)
+    latitude = site["latitude"] + distance * math.cos(bearing) / _METERS_PER_DEGREE
+    longitude = site["longitude"] + distance * math.sin(bearing) / (_METERS_PER_DEGREE * math.cos(math.radians(site["latitude"])))
+
+    day = datetime.date.fromisoformat(spec["start_date"]) + datetime.timedelta(days=int(rng.integers(0, max(1, spec["days"]))))
+    start_minute = rng.uniform(_minutes(spec["earliest_start"]), _minutes(spec["latest_start"]))
+    start = datetime.datetime.combine(day, datetime.time()) + datetime.timedelta(seconds=round(start_minute * 60))
+    duration_seconds = _sample(rng, spec["duration_minutes"]) * 60
+    interval_seconds = max(_sample(rng, spec["sample_interval_seconds"]), 0.001)
+    return {
+        "latitude": round(latitude, 6),
+        "longitude": round(longitude, 6),
+        "radius_m": round(_sample(rng, spec["radius_m"]), 1),
+        "start": start.isoformat(),
+        "end": (start + datetime.timedelta(seconds=round(duration_seconds))).isoformat(),
+        "num_points": int(round(duration_seconds / interval_seconds)) + 1,
+    }
+
+
+def _shard_bounds(flights: int, shards: int, shard: int) -> Tuple[int, int]:
+    """Flights [first, last) of a shard; shard sizes differ by at most one."""
+    base, extra = divmod(flights, shards)
+    first = shard * base + min(shard, extra)
+    return first, first + base + (1 if shard < extra else 0)
+
+
+def generate_shard(spec: Dict[str, Any], shard: int) -> Dict[str, Any]:
+    """Generate one shard and write it to its file; runs in a worker process."""
+    started = time.perf_counter()
+    first, last = _shard_bounds(spec["flights"], spec["shards"], shard)
+    rng = np.random.default_rng([spec["seed"], shard])
+    extension = "npy" if spec["format"] == "npy" else "ndjson"
+    path = os.path.join(spec["output_dir"], f"shard-{shard:05d}.{extension}")
+    points = 0
+
+    if extension == "ndjson":
+        with open(path, "w", encoding="utf-8") as f:
+            for flight in range(first, last):
+                params = sample_flight(rng, spec)
+                waypoints = generate_dgip_data(params["latitude"], params["longitude"], params["radius_m"],
+                                               params["start"], params["end"], num_points=params["num_points"])
+                points += len(waypoints)
+                f.write(canonical_dumps({"flight": flight, "params": params, "waypoints": waypoints}))
+                f.write("\n")
+    else:
+        chunks: List[np.ndarray] = []
+        for flight in range(first, last):
+            params = sample_flight(rng, spec)
+            waypoints = generate_dgip_data(params["latitude"], params["longitude"], params["radius_m"],
+                                           params["start"], params["end"], num_points=params["num_points"])
+            columns = waypoints_to_arrays(waypoints)
+            records = np.empty(len(waypoints), dtype=NPY_DTYPE)
+            records["flight"] = flight
+            for name in RECORD_DTYPE.names:
+                records[name] = columns[name]
+            chunks.append(records)
+            points += len(waypoints)
+        np.save(path, np.concatenate(chunks) if chunks else np.empty(0, dtype=NPY_DTYPE))
+
+    return {"shard": shard, "path": path, "flights": last - first, "points": points,
+            "seconds": round(time.perf_counter() - started, 3)}
+
+
+def run_fleet_simulation(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Generate a fleet dataset across a process pool and write a manifest.json next to the shards.
+
+    Returns:
+        dict: The manifest: the full spec (including the seed) and per-shard file, flight and point counts.
+    """
+    spec = {**DEFAULT_SPEC, **spec}
+    if spec["format"] not in ("ndjson", "npy"):
+        raise ValueError(f"Unsupported format '{spec['format']}'. Expected 'ndjson' or 'npy'.")
+    spec["shards"] = max(1, min(int(spec["shards"]), int(spec["flights"]) or 1))
+    os.makedirs(spec["output_dir"], exist_ok=True)
+
+    started = time.perf_counter()
+    workers = spec["workers"] or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=min(workers, spec["shards"])) as pool:
+        shards = list(pool.map(generate_shard, [spec] * spec["shards"], range(spec["shards"])))
+
+    manifest = {
+        "spec": spec,
+        "shards": shards,
+        "flights": sum(shard["flights"] for shard in shards),
+        "points": sum(shard["points"] for shard in shards),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    with open(os.path.join(spec["output_dir"], "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+if __name__ == "__main__":
+    # Spec from a JSON file argument or stdin; unspecified keys take the DEFAULT_SPEC values
+    try:
+        if len(sys.argv) > 1:
+            with open(sys.argv[1], encoding="utf-8") as spec_file:
+                fleet_spec = json.load(spec_file)
+        else:
+            fleet_spec = json.loads(sys.stdin.read() or "{}")
+        result = run_fleet_simulation(fleet_spec)
+        print(f"Generated {result['flights']} flights ({result['points']} points) in {result['seconds']}s.", file=sys.stderr)
+        print(json.dumps(result))
+    except (json.JSONDecodeError, KeyError, ValueError, OSError) as e:
+        print(f"Error running fleet simulation: {e}", file=sys.stderr)
+        print(json.dumps({"error": f"Failed to run fleet simulation: {e}"}))
+        sys.exit(1)
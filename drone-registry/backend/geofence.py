@@ -0,0 +1,92 @@
+import sys
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from config import CONFIG
+from telemetry_compliance import waypoints_to_arrays
+
+# Mean Earth radius used for great-circle distances
+EARTH_RADIUS_M = 6_371_008.8
+
+
+def haversine_distances(latitudes: np.ndarray, longitudes: np.ndarray,
+                        center_lat: float, center_lng: float) -> np.ndarray:
+    """Great-circle distance in metres from (center_lat, center_lng) to every point."""
+    lat1 = np.radians(center_lat)
+    lat2 = np.radians(latitudes)
+    half_dlat = (lat2 - lat1) / 2.0
+    half_dlng = np.radians(longitudes - center_lng) / 2.0
+    a = np.sin(half_dlat) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(half_dlng) ** 2
+    return 2.0 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def check_geofence(columns: Dict[str, np.ndarray], center_lat: float, center_lng: float,
+                   radius_m: float, tolerance_m: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Check whether the flown path stayed inside the registered circular flight area.
+
+    Args:
+        columns (dict): Arrays as returned by telemetry_compliance.waypoints_to_arrays.
+        center_lat (float): Latitude of the registered flightAreaCenter.
+        center_lng (float): Longitude of the registered flightAreaCenter.
+        radius_m (float): Registered flightAreaRadius in metres.
+        tolerance_m (float): GPS allowance added to the radius; defaults to CONFIG["geofence"].
+
+    Returns:
+        dict: Whether the path stayed inside, the maximum excursion beyond the radius plus
+        tolerance (the same boundary "inside" uses), the tolerance applied, the time spent
+        outside and the first breach index/timestamp (None if no breach).
+    """
+    if tolerance_m is None:
+        tolerance_m = CONFIG["geofence"]["tolerance_m"]
+
+    timestamps_ms = columns["timestamp"]
+    if len(timestamps_ms) == 0:
+        return {"inside": True, "points_evaluated": 0, "points_outside": 0, "max_distance_m": 0.0,
+                "max_excursion_m": 0.0, "tolerance_m": tolerance_m, "time_outside_seconds": 0.0,
+                "first_breach_index": None, "first_breach_time": None}
+
+    distances = haversine_distances(columns["latitude"], columns["longitude"], center_lat, center_lng)
+    boundary_m = radius_m + tolerance_m
+    # Points without a position fix are neither inside nor outside
+    outside = np.nan_to_num(distances, nan=0.0) > boundary_m
+
+    # A segment counts fully when both ends are outside and half when it crosses the boundary
+    segment_seconds = np.diff(timestamps_ms) / 1000.0
+    outside_weight = outside.astype(np.float64)
+    time_outside = float(np.dot((outside_weight[:-1] + outside_weight[1:]) / 2.0, segment_seconds))
+
+    first_breach_index = int(np.argmax(outside)) if outside.any() else None
+    first_breach_time = None
+    if first_breach_index is not None:
+        # Shown in local time, like the telemetry violation intervals
+        offset_ms = columns["utc_offset_ms"][first_breach_index] if "utc_offset_ms" in columns else 0
+        local_ms = timestamps_ms[first_breach_index] + offset_ms
+        first_breach_time = str(np.datetime_as_string(local_ms.astype("datetime64[ms]")))
+
+    max_distance = float(np.nanmax(distances)) if not np.isnan(distances).all() else 0.0
+    return {
+        "inside": first_breach_index is None,
+        "points_evaluated": int(len(timestamps_ms)),
+        "points_outside": int(np.count_nonzero(outside)),
+        "max_distance_m": round(max_distance, 2),
+        "max_excursion_m": round(max(0.0, max_distance - boundary_m), 2),
+        "tolerance_m": tolerance_m,
+        "time_outside_seconds": round(time_outside, 3),
+        "first_breach_index": first_breach_index,
+        "first_breach_time": first_breach_time,
+    }
+
+
+def check_waypoints_geofence(waypoints: List[Dict[str, Any]], flight_area_center: Dict[str, Any],
+                             flight_area_radius: Any) -> Dict[str, Any]:
+    """Convenience wrapper taking DGIP waypoint dicts and the plan's flightAreaCenter/flightAreaRadius."""
+    try:
+        return check_geofence(waypoints_to_arrays(waypoints),
+                              float(flight_area_center["latitude"]),
+                              float(flight_area_center["longitude"]),
+                              float(flight_area_radius))
+    except (KeyError, TypeError, ValueError) as e:
+        print(f"Error checking geofence conformance: {e}", file=sys.stderr)
+        return {"inside": False, "error": f"Invalid geofence input: {e}"}
@@ -0,0 +1,100 @@
+import importlib.util
+import sys
+from typing import Optional
+
+import aioipfs
+import httpx
+
+from config import CONFIG
+
+# One set of HTTP clients per process. The ReAct agent makes several OpenAI calls per validation
+# and every IPFS upload used to open its own session; sharing pooled keep-alive connections pays
+# the TCP/TLS handshake once per process instead of once per call. close_http_clients() must be
+# awaited before the event loop ends.
+
+_openai_client: Optional[httpx.Client] = None
+_openai_async_client: Optional[httpx.AsyncClient] = None
+_ipfs_client: Optional[aioipfs.AsyncIPFS] = None
+_ipfs_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _http2_available() -> bool:
+    # httpx speaks HTTP/2 only when the optional h2 package is installed
+    return CONFIG["http"]["http2"] and importlib.util.find_spec("h2") is not None
+
+
+def _limits() -> httpx.Limits:
+    settings = CONFIG["http"]
+    return httpx.Limits(max_connections=settings["max_connections"],
+                        max_keepalive_connections=settings["max_keepalive_connections"],
+                        keepalive_expiry=settings["keepalive_expiry_seconds"])
+
+
+def _timeout() -> httpx.Timeout:
+    settings = CONFIG["http"]
+    return httpx.Timeout(settings["openai_timeout_seconds"], connect=settings["connect_timeout_seconds"])
+
+
+def openai_http_client() -> httpx.Client:
+    """Shared synchronous client for OpenAI calls made outside the event loop (index building)."""
+    global _openai_client
+    if _openai_client is None:
+        _openai_client = httpx.Client(http2=_http2_available(), limits=_limits(), timeout=_timeout())
+    return _openai_client
+
+
+def openai_async_http_client() -> httpx.AsyncClient:
+    """Shared asynchronous client for OpenAI LLM and embedding calls."""
+    global _openai_async_client
+    if _openai_async_client is None:
+        _openai_async_client = httpx.AsyncClient(http2=_http2_available(), limits=_limits(), timeout=_timeout())
+    return _openai_async_client
+
+
+def ipfs_api_url() -> str:
+    """Base URL of the IPFS HTTP API from CONFIG["ipfs"]; uploads and verification use the same node."""
+    ipfs = CONFIG["ipfs"]
+    return f"{ipfs['protocol']}://{ipfs['host']}:{ipfs['port']}/api/v0"
+
+
+def shared_ipfs_client() -> aioipfs.AsyncIPFS:
+    """Shared IPFS API client (aiohttp, HTTP/1.1 keep-alive); must be created inside the event loop."""
+    global _ipfs_client
+    if _ipfs_client is None:
+        ipfs, settings = CONFIG["ipfs"], CONFIG["http"]
+        _ipfs_client = aioipfs.AsyncIPFS(host=ipfs["host"], port=ipfs["port"], scheme=ipfs["protocol"],
+                                         conns_max=settings["ipfs_max_connections"],
+                                         conns_max_per_host=settings["ipfs_max_connections"],
+                                         read_timeout=ipfs["timeout"])
+    return _ipfs_client
+
+
+def ipfs_http_client() -> httpx.AsyncClient:
+    """Shared httpx client for the IPFS HTTP API, for responses that are read as a stream (aioipfs buffers them)."""
+    global _ipfs_http_client
+    if _ipfs_http_client is None:
+        ipfs, settings = CONFIG["ipfs"], CONFIG["http"]
+        _ipfs_http_client = httpx.AsyncClient(
+            base_url=ipfs_api_url(),
+            limits=httpx.Limits(max_connections=settings["ipfs_max_connections"],
+                                max_keepalive_connections=settings["ipfs_max_connections"],
+                                keepalive_expiry=settings["keepalive_expiry_seconds"]),
+            timeout=httpx.Timeout(ipfs["timeout"], connect=settings["connect_timeout_seconds"]))
+    return _ipfs_http_client
+
+
+async def close_http_clients() -> None:
+    """Close every client that was opened in this process; a failure to close one does not skip the others."""
+    global _openai_client, _openai_async_client, _ipfs_client, _ipfs_http_client
+    clients = [(_ipfs_client, "close"), (_ipfs_http_client, "aclose"),
+               (_openai_async_client, "aclose"), (_openai_client, "close")]
+    _openai_client = _openai_async_client = _ipfs_client = _ipfs_http_client = None
+    for client, method in clients:
+        if client is None:
+            continue
+        try:
+            closed = getattr(client, method)()
+            if closed is not None:
+                await closed
+        except Exception as e:
+            print(f"Warning: Failed to close {type(client).__name__}: {e}", file=sys.stderr)
@@ -2,20 +2,19 @@ import sys
 import json
 import os
 import re
-from datetime import datetime, time
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Callable, Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass
 
 # Note: LlamaIndex, OpenAI LLM, etc. imports remain as they are used for AI analysis [21]
 from llama_index.core import VectorStoreIndex, Settings
 from llama_index.llms.openai import OpenAI
+from llama_index.embeddings.openai import OpenAIEmbedding
 from llama_index.core.tools import QueryEngineTool
 from llama_index.core.agent import ReActAgent
 from llama_index.readers.llama_parse import LlamaParse
 
-# Note: Web3 and aioipfs imports remain as they are used for hashing and IPFS [21]
+# Note: Web3 import remains as it is used for hashing; IPFS uploads go through http_clients [21]
 from web3 import Web3
-import aioipfs
 import asyncio
 from eth_hash.auto import keccak
 
@@ -25,6 +24,17 @@ from dotenv import load_dotenv
 
 # Import the MCP client integration (which now gets config from env vars) [8]
 from mcp_integration.client import OpenAIPClientIntegration
+from profiling import profile_request, should_profile
+from rules_engine import DEFAULT_RULE_SET, critical_findings, parse_center
+from canonical_json import canonical_dumps
+from prompt_builder import build_compliance_prompt, count_tokens
+from regulations_retriever import build_bm25_query_engine
+from admission import deadline_scope, limiter
+from coalescing import SingleFlight
+from airspace_index import AirspaceIndex, drone_key, flight_footprint, onchain_registration_checker
+from risk_grid import record_validation
+from http_clients import close_http_clients, openai_async_http_client, openai_http_client, shared_ipfs_client
+from config import CONFIG
 
 # Load environment variables
 load_dotenv()
@@ -32,7 +42,60 @@ load_dotenv()
 # Initialize Web3 (used for hashing with keccak) [8]
 # w3 = Web3() # While w3 is imported, keccak is used directly [8]
 # Set the LLM settings [8]
-Settings.llm = OpenAI(model="gpt-4o-mini", temperature=0)
+class AdmittedOpenAI(OpenAI):
+    """
+    OpenAI LLM whose async requests each go through the shared "openai" admission limiter.
+
+    A ReAct agent turn makes one LLM call per reasoning step, and the regulations query engine adds
+    its own, so RPM and TPM are reserved per request (prompt tokens plus the completion estimate)
+    rather than once per agent turn. Streaming calls hold their slot until the stream ends.
+    """
+
+    @staticmethod
+    def _reservation(prompt: str) -> int:
+        return count_tokens(prompt) + CONFIG["limits"]["destinations"]["openai"]["completion_tokens"]
+
+    @staticmethod
+    def _messages_text(messages) -> str:
+        return "\n".join(str(message.content or "") for message in messages)
+
+    async def achat(self, messages, **kwargs):
+        parent = super().achat
+        return await limiter("openai").call(lambda: parent(messages, **kwargs),
+                                            self._reservation(self._messages_text(messages)))
+
+    async def acomplete(self, prompt, formatted=False, **kwargs):
+        parent = super().acomplete
+        return await limiter("openai").call(lambda: parent(prompt, formatted=formatted, **kwargs),
+                                            self._reservation(prompt))
+
+    async def astream_chat(self, messages, **kwargs):
+        parent = super().astream_chat
+        tokens = self._reservation(self._messages_text(messages))
+
+        async def gen():
+            async with limiter("openai").slot(tokens):
+                async for response in await parent(messages, **kwargs):
+                    yield response
+        return gen()
+
+    async def astream_complete(self, prompt, formatted=False, **kwargs):
+        parent = super().astream_complete
+        tokens = self._reservation(prompt)
+
+        async def gen():
+            async with limiter("openai").slot(tokens):
+                async for response in await parent(prompt, formatted=formatted, **kwargs):
+                    yield response
+        return gen()
+
+
+# The LLM and embeddings share the process-wide pooled HTTP clients (keep-alive, timeouts from CONFIG)
+Settings.llm = AdmittedOpenAI(model=CONFIG["llm"]["model"], temperature=0,
+                      timeout=CONFIG["http"]["openai_timeout_seconds"],
+                      http_client=openai_http_client(), async_http_client=openai_async_http_client())
+Settings.embed_model = OpenAIEmbedding(timeout=CONFIG["http"]["openai_timeout_seconds"],
+                                       http_client=openai_http_client(), async_http_client=openai_async_http_client())
 
 @dataclass
 class ValidationState:
@@ -43,6 +106,7 @@ class ValidationState:
     ipfs_cid: Optional[str] = None
     deterministic_results: Optional[Dict[str, List[str]]] = None
     mcp_results: Optional[Dict[str, Any]] = None
+    airspace_conflicts: Optional[List[Dict[str, Any]]] = None
     ai_report: Optional[str] = None
     validation_package: Optional[Dict[str, Any]] = None
     is_critically_compliant: bool = False
@@ -108,38 +172,51 @@ class FlightDataValidator:
         except (ValueError, TypeError):
             return None
 
+    def _normalize_flight_data(self, flight_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Normalize the flight fields stored in the validation package."""
+        # Extract lat/lng from the flightAreaCenter object for the package [24]; this also runs before
+        # validation (coalescing key), so a null or "lat,lng" center must not raise
+        flight_area_center = flight_data.get("flightAreaCenter", {})
+        if isinstance(flight_area_center, dict):
+            latitude, longitude = flight_area_center.get("latitude"), flight_area_center.get("longitude")
+        else:
+            latitude, longitude = parse_center(flight_area_center) or (None, None)
+        normalized_latitude = self._normalize_float(latitude)
+        normalized_longitude = self._normalize_float(longitude)
+
+        return {
+            "droneName": self._normalize_string(flight_data.get("droneName")),
+            "droneModel": self._normalize_string(flight_data.get("droneModel")),
+            "droneType": self._normalize_string(flight_data.get("droneType")),
+            "serialNumber": self._normalize_string(flight_data.get("serialNumber")),
+            "weight": self._normalize_float(flight_data.get("weight")),
+            "flightPurpose": self._normalize_string(flight_data.get("flightPurpose")),
+            "flightDescription": self._normalize_string(flight_data.get("flightDescription")),
+            "flightDate": self._normalize_string(flight_data.get("flightDate")),
+            "startTime": self._normalize_string(flight_data.get("startTime")),
+            "endTime": self._normalize_string(flight_data.get("endTime")),
+            "dayNightOperation": self._normalize_string(flight_data.get("dayNightOperation")),
+            "flightAreaCenter": { # Use normalized lat/lng in the package
+                "latitude": normalized_latitude,
+                "longitude": normalized_longitude
+            },
+            "flightAreaRadius": self._normalize_float(flight_data.get("flightAreaRadius")),
+            "flightAreaMaxHeight": self._normalize_float(flight_data.get("flightAreaMaxHeight")),
+            "additionalNotes": self._normalize_string(flight_data.get("additionalNotes"))
+        }
+
+    def coalescing_key(self, flight_data: Dict[str, Any]) -> str:
+        """Canonical hash of the normalized flight fields; identical submissions share a key."""
+        return "0x" + keccak(canonical_dumps(self._normalize_flight_data(flight_data)).encode('utf-8')).hex()
+
     def _create_validation_package(self, flight_data: Dict[str, Any],
                                 deterministic_results: Dict[str, List[str]],
                                 mcp_results: Dict[str, Any],
                                 ai_report: str) -> Dict[str, Any]:
         """Create a validation package containing all relevant data."""
-        # Extract lat/lng from the flightAreaCenter object for the package [24]
-        flight_area_center_obj = flight_data.get("flightAreaCenter", {})
-        normalized_latitude = self._normalize_float(flight_area_center_obj.get("latitude"))
-        normalized_longitude = self._normalize_float(flight_area_center_obj.get("longitude"))
-
         # Structure the package based on requirements, including necessary fields [25]
         package = {
-            "flight_data": {
-                "droneName": self._normalize_string(flight_data.get("droneName")),
-                "droneModel": self._normalize_string(flight_data.get("droneModel")),
-                "droneType": self._normalize_string(flight_data.get("droneType")),
-                "serialNumber": self._normalize_string(flight_data.get("serialNumber")),
-                "weight": self._normalize_float(flight_data.get("weight")),
-                "flightPurpose": self._normalize_string(flight_data.get("flightPurpose")),
-                "flightDescription": self._normalize_string(flight_data.get("flightDescription")),
-                "flightDate": self._normalize_string(flight_data.get("flightDate")),
-                "startTime": self._normalize_string(flight_data.get("startTime")),
-                "endTime": self._normalize_string(flight_data.get("endTime")),
-                "dayNightOperation": self._normalize_string(flight_data.get("dayNightOperation")),
-                "flightAreaCenter": { # Use normalized lat/lng in the package
-                    "latitude": normalized_latitude,
-                    "longitude": normalized_longitude
-                },
-                "flightAreaRadius": self._normalize_float(flight_data.get("flightAreaRadius")),
-                "flightAreaMaxHeight": self._normalize_float(flight_data.get("flightAreaMaxHeight")),
-                "additionalNotes": self._normalize_string(flight_data.get("additionalNotes"))
-            },
+            "flight_data": self._normalize_flight_data(flight_data),
             "validation_results": { # Include validation results in the package [26]
                 "deterministic_checks": deterministic_results,
                 "mcp_validation": mcp_results,
@@ -150,10 +227,10 @@ class FlightDataValidator:
 
     def serialize_validation_package(self, validation_package: Dict[str, Any]) -> str:
         """Serialize the validation package in a consistent manner."""
-        # Use sort_keys and separators for deterministic output regardless of Python dict order [27]
+        # Canonical encoding (sorted keys, compact separators) for deterministic output regardless of Python dict order [27]
         # Store package and serialized data in state [26]
         self._state.validation_package = validation_package
-        self._state.serialized_data = json.dumps(validation_package, sort_keys=True, separators=(',', ':'))
+        self._state.serialized_data = canonical_dumps(validation_package)
         return self._state.serialized_data
 
     def calculate_hash(self, serialized_data: str) -> bytes:
@@ -169,104 +246,56 @@ class FlightDataValidator:
         # Use INSERT OR IGNORE to avoid errors if hash already exists (e.g., duplicate submission) [28]
         c.execute('INSERT OR IGNORE INTO flight_mappings (data_hash, ipfs_cid) VALUES (?, ?)',
                 (data_hash, ipfs_cid))
+        # Index the accepted flight's airspace in the same transaction for later conflict checks
+        footprint = flight_footprint(self._state.flight_data) if self._state.flight_data else None
+        if footprint is not None:
+            AirspaceIndex(self._db_conn).add(data_hash, drone_key(self._state.flight_data), footprint)
         self._db_conn.commit()
         self._state.ipfs_cid = ipfs_cid # Store CID in state after successful DB operation [28]
 
 
     async def perform_deterministic_checks(self) -> Dict[str, List[str]]:
-        """Perform basic deterministic checks on flight data."""
+        """Perform deterministic checks on flight data using the compiled rule set."""
         self._validate_state('flight_data') # Ensure flight_data is loaded into state [29]
-        check_results = {
-            "flight_date": [],
-            "flight_times": [],
-            "drone_weight": []
-        }
-        flight_data = self._state.flight_data # Get data from state [29]
-
-        # Check flight date
-        flight_date_str = flight_data.get("flightDate")
-        if flight_date_str:
-            try:
-                # Parse date as date object for comparison
-                # Include 'T00:00:00' to avoid timezone issues with date parsing alone [29]
-                flight_date = datetime.strptime(flight_date_str + 'T00:00:00', "%Y-%m-%dT%H:%M:%S").date()
-                # Check if date is in the future
-                if flight_date < datetime.now().date():
-                    check_results["flight_date"].append(
-                        f"Flight date {flight_date_str} is in the past.")
-            except ValueError:
-                check_results["flight_date"].append(
-                    f"Invalid date format: {flight_date_str}. Expected YYYY-MM-DD.")
-        else:
-            check_results["flight_date"].append("Flight date is missing.")
-
-        # Check flight times
-        start_time_str = flight_data.get("startTime")
-        end_time_str = flight_data.get("endTime")
-        # Schema specifies time format HH:MM and range 09:00 to 17:30 [30, 31]
-        operational_start_time = time(9, 0)
-        operational_end_time = time(17, 30) # 5:30 PM
-
-        if start_time_str and end_time_str:
-            try:
-                start_time_obj = datetime.strptime(start_time_str, "%H:%M").time()
-                end_time_obj = datetime.strptime(end_time_str, "%H:%M").time()
-
-                # Check if end time is after start time (already done by frontend schema refine [32])
-                # Adding here for server-side robustness
-                if end_time_obj <= start_time_obj:
-                     check_results["flight_times"].append(
-                         f"End time {end_time_str} must be after start time {start_time_str}.")
-
-                # Check if times are within operational hours [30, 31]
-                isStartTimeValid = operational_start_time <= start_time_obj <= operational_end_time
-                isEndTimeValid = operational_start_time <= end_time_obj <= operational_end_time
-
-                # The flight must be entirely within the operational hours. [31]
-                if not isStartTimeValid or not isEndTimeValid:
-                    check_results["flight_times"].append(
-                        f"Flight times ({start_time_str} - {end_time_str}) must be between 09:00 and 17:30.")
-
-            except ValueError:
-                check_results["flight_times"].append(
-                    f"Invalid time format. Expected HH:MM for both start and end times.")
-        else:
-            if not start_time_str:
-                check_results["flight_times"].append("Start time is missing.")
-            if not end_time_str:
-                check_results["flight_times"].append("End time is missing.")
-
-        # Check drone weight
-        # Schema defines weight as min 50g, max 25000g [33]
-        # Frontend description mentions max 25kg (25000g) without special auth [17]
-        # Let's stick to the 25000g limit as per schema for critical check
-        weight = flight_data.get("weight")
-        if weight is not None:
-            try:
-                weight_grams = float(weight)
-                if weight_grams > 25000:
-                    check_results["drone_weight"].append(
-                        f"Drone weight ({weight_grams}g) exceeds 25000g (25kg). Additional regulations may apply.")
-                elif weight_grams < 50: # Also check minimum as per schema [33]
-                    check_results["drone_weight"].append(
-                        f"Drone weight ({weight_grams}g) is below minimum allowed (50g).")
-            except ValueError:
-                check_results["drone_weight"].append(
-                    f"Invalid weight format: {weight}. Expected a number.")
-        else:
-            check_results["drone_weight"].append("Drone weight is missing.")
-
+        # Rules (date, times, weight, drone specs, flight plan, night operations) are
+        # defined declaratively in rules_engine and compiled once at import
+        check_results = DEFAULT_RULE_SET.evaluate(self._state.flight_data)
         self._state.deterministic_results = check_results
         return check_results
 
-    async def validate_and_process_flight_data(self, flight_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Main validation and processing function."""
+    def check_airspace_conflicts(self) -> List[Dict[str, Any]]:
+        """Find accepted flights using the same airspace at the same time as the current flight."""
+        self._validate_state('flight_data')
+        conflicts: List[Dict[str, Any]] = []
+        footprint = flight_footprint(self._state.flight_data)
+        # Without a parsable date, times and area the deterministic checks already report the problem
+        if footprint is not None and self._db_conn and CONFIG["airspace"]["enabled"]:
+            conflicts = AirspaceIndex(self._db_conn, onchain_registration_checker()).find_conflicts(
+                footprint, exclude_drone=drone_key(self._state.flight_data))
+            self._db_conn.commit()  # Confirmed registrations and released holds
+        self._state.airspace_conflicts = conflicts
+        return conflicts
+
+    @staticmethod
+    def _record_risk(flight_data: Dict[str, Any], result: Dict[str, Any]) -> None:
+        """Add the outcome to the geohash/hour risk grid; a failure here never affects validation."""
+        try:
+            record_validation(flight_data, result)
+        except Exception as risk_error:
+            print(f"Warning: Failed to update the risk grid: {risk_error}", file=sys.stderr)
+
+    async def validate_and_process_flight_data(self, flight_data: Dict[str, Any],
+                                               emit: Optional[Callable[[str, Any], None]] = None) -> Dict[str, Any]:
+        """
+        Main validation and processing function.
+        When emit is given, the deterministic and NFZ verdicts and the AI report tokens are
+        passed to it as they become available (streaming mode).
+        """
         if self._is_processing:
             raise RuntimeError("Another validation process is already in progress")
 
         self._is_processing = True
         mcp_client = None
-        ipfs_client = None
         compliance_messages: List[str] = [] # Initialize compliance messages list
         has_critical_errors = False # Assume no critical errors initially
 
@@ -282,8 +311,17 @@ class FlightDataValidator:
             # 3. Perform deterministic checks
             print("Performing deterministic checks...", file=sys.stderr)
             deterministic_results = await self.perform_deterministic_checks()
-            # Check if deterministic checks contain any errors (considered potentially critical by backend)
-            has_deterministic_errors = any(len(messages) > 0 for messages in deterministic_results.values())
+            if emit:
+                emit("deterministic", deterministic_results)
+            # Check if deterministic checks contain any errors (considered potentially critical by backend);
+            # advisories are reported but do not block registration
+            has_deterministic_errors = any(len(messages) > 0 for messages in critical_findings(deterministic_results).values())
+
+            # Other registered flights in the same airspace at the same time
+            airspace_conflicts = self.check_airspace_conflicts()
+            if emit:
+                emit("airspace", airspace_conflicts)
+            has_airspace_conflicts = bool(airspace_conflicts) and CONFIG["airspace"]["block_on_conflict"]
 
             # 4. Call MCP validation
             print("Calling MCP validation...", file=sys.stderr)
@@ -319,37 +357,20 @@ class FlightDataValidator:
 
             # Determine overall critical errors based on deterministic and MCP results
             # If deterministic checks found errors *or* MCP validation failed/skipped/errored
-            has_critical_errors = has_deterministic_errors or has_mcp_errors
+            has_critical_errors = has_deterministic_errors or has_mcp_errors or has_airspace_conflicts
+            if emit:
+                emit("nfz", {"mcp_validation": mcp_result, "is_critically_compliant": not has_critical_errors})
             self._state.is_critically_compliant = not has_critical_errors # Set the new state field [37]
 
             # 5. Prepare AI prompt with all information (regardless of errors for AI analysis) [38]
             # The AI agent is intended to synthesize and report, not necessarily be the critical gate.
             # We run it even if there are deterministic/MCP errors to provide a comprehensive report.
 
-            comprehensive_prompt = f"""
-Given the following flight details, deterministic check results, and No-Fly Zone validation findings,
-synthesize a comprehensive report detailing all potential compliance issues.
-Present the findings as a single list of bullet points.
-If no critical issues are found based on the deterministic and NFZ validation information, state that the flight appears compliant.
-
-Flight Details:
-{json.dumps(self._state.flight_data, indent=2)}
-
-Deterministic Check Results:
-{json.dumps(deterministic_results, indent=2)}
-
-MCP No-Fly Zone Validation Results:
-{json.dumps(mcp_result, indent=2)}
-
-Please analyze all the above information and provide a comprehensive compliance report that:
-1. Incorporates findings from all validation sources
-2. Prioritizes critical safety and regulatory issues
-3. Provides clear, actionable recommendations (if any issues)
-4. Notes any conflicting or ambiguous findings
-5. Highlights any validation errors or missing information encountered by the *validators*.
-
-Structure your response with 'Answer:' followed by the comprehensive report.
-"""
+            # Compact, token-budgeted prompt; the NFZ payload is reduced to the relevant zones
+            comprehensive_prompt, prompt_tokens = build_compliance_prompt(
+                self._state.flight_data, deterministic_results, mcp_result,
+                airspace_conflicts=airspace_conflicts)
+            print(f"Compliance prompt built ({prompt_tokens} tokens).", file=sys.stderr)
 
             # 6. Call AI agent
             print("Initializing AI agent...", file=sys.stderr)
@@ -360,10 +381,15 @@ Structure your response with 'Answer:' followed by the comprehensive report.
                 regulations_path = os.path.join(os.path.dirname(__file__), "regulations.txt")
                 print(f"Loading regulations from: {regulations_path}", file=sys.stderr)
 
-                # LlamaParse needs to be awaited.
-                documents = await LlamaParse(result_type="text", verbose=False).aload_data(regulations_path)
-                index = VectorStoreIndex.from_documents(documents)
-                query_engine = index.as_query_engine()
+                retrieval_top_k = CONFIG["prompt"]["retrieval_top_k"]
+                if CONFIG["regulations"]["retriever"] == "bm25":
+                    # Local lexical retrieval over the === sections: no parse or embedding calls
+                    query_engine = build_bm25_query_engine(regulations_path, retrieval_top_k)
+                else:
+                    # LlamaParse needs to be awaited.
+                    documents = await LlamaParse(result_type="text", verbose=False).aload_data(regulations_path)
+                    index = VectorStoreIndex.from_documents(documents)
+                    query_engine = index.as_query_engine(similarity_top_k=retrieval_top_k)
                 query_tool = QueryEngineTool.from_defaults(
                     query_engine,
                     name="RegulationValidator",
@@ -372,7 +398,17 @@ Structure your response with 'Answer:' followed by the comprehensive report.
                 # Use agent.achat for async interaction [40]
                 agent = ReActAgent.from_tools([query_tool], verbose=False)
                 print("Sending comprehensive query to AI...", file=sys.stderr)
-                response = await agent.achat(comprehensive_prompt) # Use achat for async [40]
+                # Admission control (concurrency, RPM/TPM) applies to each LLM request the agent makes; see AdmittedOpenAI
+                if emit:
+                    # Stream the report tokens as they are generated
+                    streaming_response = await agent.astream_chat(comprehensive_prompt)
+                    chunks = []
+                    async for token in streaming_response.async_response_gen():
+                        chunks.append(token)
+                        emit("ai_token", token)
+                    response = "".join(chunks)
+                else:
+                    response = await agent.achat(comprehensive_prompt) # Use achat for async [40]
                 print("AI response received.", file=sys.stderr)
 
                 # 7. Process AI response [37]
@@ -392,10 +428,15 @@ Structure your response with 'Answer:' followed by the comprehensive report.
             if has_critical_errors:
                 if has_deterministic_errors:
                     # Include specific messages from deterministic checks
-                    for check_type, messages in deterministic_results.items():
+                    for check_type, messages in critical_findings(deterministic_results).items():
                         if messages:
                             compliance_messages.append(f"Deterministic Check Issue ({check_type}): " + "; ".join(messages))
 
+                if has_airspace_conflicts:
+                    compliance_messages.append("Airspace Conflict: overlaps registered flight(s) " + "; ".join(
+                        f"{c['dataHash']} ({c['startTime']} to {c['endTime']}, {c['distanceMeters']} m away)"
+                        for c in airspace_conflicts))
+
                 # Append the specific MCP message regardless of whether the call was attempted,
                 # as the message itself indicates the reason for failure/skip. [42]
                 # Use the message field from the mcp_result dictionary
@@ -431,13 +472,13 @@ Structure your response with 'Answer:' followed by the comprehensive report.
                 print("Uploading data to IPFS...", file=sys.stderr)
                 ipfs_cid = None
                 try:
-                    # Ensure IPFS client is used within an async context [45]
-                    ipfs_client = aioipfs.AsyncIPFS()
-                    async with ipfs_client:
-                        ipfs_add_result = await ipfs_client.core.add_bytes(serialized_data.encode('utf-8'))
-                        ipfs_cid = ipfs_add_result['Hash']
-                        print(f"Data uploaded to IPFS with CID: {ipfs_cid}", file=sys.stderr)
-                        self._state.ipfs_cid = ipfs_cid # Store CID in state only on success [46]
+                    # Process-wide IPFS client; its pooled connection is closed when main() exits [45]
+                    ipfs_client = shared_ipfs_client()
+                    ipfs_add_result = await limiter("ipfs").call(
+                        lambda: ipfs_client.core.add_bytes(serialized_data.encode('utf-8')))
+                    ipfs_cid = ipfs_add_result['Hash']
+                    print(f"Data uploaded to IPFS with CID: {ipfs_cid}", file=sys.stderr)
+                    self._state.ipfs_cid = ipfs_cid # Store CID in state only on success [46]
 
                 except Exception as ipfs_error:
                     # It's okay to proceed if IPFS upload fails for the MVP, but report the warning [46]
@@ -467,9 +508,11 @@ Structure your response with 'Answer:' followed by the comprehensive report.
                     "is_critically_compliant": self._state.is_critically_compliant, # This will be True
                     "raw_validation_data": { # Include raw data for debugging
                         "deterministic_checks": deterministic_results,
-                        "mcp_validation": mcp_result
+                        "mcp_validation": mcp_result,
+                        "airspace_conflicts": airspace_conflicts
                     }
                 }
+                self._record_risk(flight_data, result)
                 return result
 
             else: # has_critical_errors is True
@@ -483,9 +526,11 @@ Structure your response with 'Answer:' followed by the comprehensive report.
                     "error": "Validation reported critical issues. Data not stored on IPFS or DB.", # Top-level error for frontend [49]
                     "raw_validation_data": { # Include raw data for debugging [50]
                         "deterministic_checks": deterministic_results,
-                        "mcp_validation": mcp_result
+                        "mcp_validation": mcp_result,
+                        "airspace_conflicts": airspace_conflicts
                     }
                 }
+                self._record_risk(flight_data, result)
                 return result
 
         except Exception as e:
@@ -514,11 +559,18 @@ Structure your response with 'Answer:' followed by the comprehensive report.
                     print("MCP client cleaned up.", file=sys.stderr) # [52]
                 except Exception as cleanup_error:
                     print(f"Error during MCP client cleanup: {cleanup_error}", file=sys.stderr)
-            # IPFS client is handled by the async with block if it was initialized within the try block [52]
+            # The shared IPFS and OpenAI HTTP clients are closed once, when main() exits [52]
+
+    @staticmethod
+    def _emit_event(event: str, data: Any) -> None:
+        """Write one NDJSON event to stdout; the validate-flight route forwards each line as it arrives."""
+        print(json.dumps({"event": event, "data": data}), flush=True)
 
     async def main(self):
         """Main entry point for the script."""
         print("Script started.", file=sys.stderr) # [52]
+        # Streaming mode emits NDJSON events instead of a single JSON result
+        streaming = CONFIG["api"]["stream_validation"]
         try:
             input_json = sys.stdin.read()
             print(f"Received input JSON: {input_json}", file=sys.stderr) # [52]
@@ -528,20 +580,47 @@ Structure your response with 'Answer:' followed by the comprehensive report.
             flight_data = json.loads(input_json)
             print("Input JSON parsed successfully.", file=sys.stderr) # [53]
 
+            # Optional per-request profiling switch (honored only when PROFILE_ENABLED); removed so it never reaches the validation package
+            profile_requested = flight_data.pop("profile", None) if isinstance(flight_data, dict) else None
+            # Per-request streaming switch, handled the same way
+            stream_requested = flight_data.pop("stream", None) if isinstance(flight_data, dict) else None
+            if stream_requested is not None:
+                streaming = bool(stream_requested)
+
             # Use the context manager for the validator to ensure database connection is closed [53]
             # The main async logic is now within the context manager [53]
-            with FlightDataValidator() as validator:
-                result = await validator.validate_and_process_flight_data(flight_data)
-
-            # Output the result as JSON to stdout [53]
-            print(json.dumps(result))
+            try:
+                with FlightDataValidator() as validator:
+                    # Every outbound call made for this request shares one deadline
+                    with deadline_scope(CONFIG["limits"]["request_deadline_seconds"]):
+                        async with profile_request("validate_and_process_flight_data", should_profile(profile_requested)):
+                            run_validation = lambda: validator.validate_and_process_flight_data(
+                                flight_data, emit=self._emit_event if streaming else None)
+                            if isinstance(flight_data, dict):
+                                # Identical submissions in flight (double-clicks, retries) share one execution
+                                result = await SingleFlight().run(validator.coalescing_key(flight_data), run_validation)
+                            else:
+                                result = await run_validation()
+            finally:
+                # Pooled connections are closed while the event loop is still running
+                await close_http_clients()
+
+            # Output the result as JSON to stdout [53]; in streaming mode it is the final event
+            if streaming:
+                self._emit_event("result", result)
+            else:
+                print(json.dumps(result))
             print("Script finished successfully.", file=sys.stderr) # [53]
 
         except json.JSONDecodeError:
             error_response = {"status": "error", "message": "Invalid JSON input received from stdin.", "dataHash": None, "ipfsCid": None, "is_critically_compliant": False} # [53]
             # Output error as JSON to stderr and stdout for route handler to catch [54]
             print(json.dumps(error_response), file=sys.stderr)
-            print(json.dumps(error_response)) # Also print to stdout for the route handler [54]
+            # Also print to stdout for the route handler [54]
+            if streaming:
+                self._emit_event("result", error_response)
+            else:
+                print(json.dumps(error_response))
             sys.exit(1) # [54]
 
         except Exception as main_error:
@@ -549,7 +628,11 @@ Structure your response with 'Answer:' followed by the comprehensive report.
             error_response = {"status": "error", "message": f"Application error: {str(main_error)}", "dataHash": None, "ipfsCid": None, "is_critically_compliant": False} # [54]
             # Output error as JSON to stderr and stdout for route handler to catch [20]
             print(json.dumps(error_response), file=sys.stderr)
-            print(json.dumps(error_response)) # Also print to stdout for the route handler [20]
+            # Also print to stdout for the route handler [20]
+            if streaming:
+                self._emit_event("result", error_response)
+            else:
+                print(json.dumps(error_response))
             sys.exit(1) # [20]
 
 
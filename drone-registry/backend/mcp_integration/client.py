@@ -9,8 +9,7 @@ from contextlib import AsyncExitStack
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
 
-# Import the OpenAI SDK
-from openai import OpenAI
+from admission import limiter
 
 # Load environment variables from .env file
 from dotenv import load_dotenv
@@ -35,7 +34,6 @@ class OpenAIPClientIntegration:
     """
     Integrates MCP client functionality into the drone registry backend.
     Connects to the OpenAIP MCP server to use its tools (e.g., NFZ validation).
-    Uses OpenAI API for potential LLM orchestration or interactions.
     """
 
     def __init__(self):
@@ -45,13 +43,6 @@ class OpenAIPClientIntegration:
         self.stdio = None
         self.write = None
 
-        # Initialize OpenAI client - it automatically reads OPENAI_API_KEY from env [11]
-        try:
-            self.openai_client = OpenAI()
-        except Exception as e:
-            print(f"Error initializing OpenAI client: {e}. OpenAI API functionality may be unavailable.", file=sys.stderr)
-            self.openai_client = None
-
     async def connect_to_server(self):
         """
         Connects to the OpenAIP MCP server process.
@@ -219,7 +210,8 @@ class OpenAIPClientIntegration:
             print(f"Calling tool 'validate-nfz' with args: {tool_args}", file=sys.stderr)
 
             # Call the tool asynchronously
-            result = await self.session.call_tool("validate-nfz", tool_args)
+            # Admission control bounds concurrent MCP calls across backend processes
+            result = await limiter("mcp").call(lambda: self.session.call_tool("validate-nfz", tool_args))
             print(f"Tool call result received: {result}", file=sys.stderr)
 
             # Extract serializable content from the result
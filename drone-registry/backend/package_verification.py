@@ -0,0 +1,215 @@
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+
+from eth_hash.auto import keccak
+
+from admission import deadline_scope, limiter
+from config import CONFIG
+from http_clients import close_http_clients, ipfs_http_client
+
+# Verifies that the package stored on IPFS for a dataHash still hashes to it: the CID is looked up
+# in flight_mappings, the bytes are streamed through Keccak (never held in memory as a whole) and
+# the digest is compared with the hash. Packages are stored as their exact canonical bytes, so no
+# JSON parsing or re-serialization is involved.
+#
+# Content fetched from IPFS is kept in a local cache keyed by CID. A CID names its content, so a
+# cached file never goes stale; the cache only needs a size bound, enforced by evicting the least
+# recently used files.
+
+_HASH_PATTERN = re.compile(r"^0x[0-9a-f]{64}$")
+_CID_PATTERN = re.compile(r"^[A-Za-z0-9]+$")
+
+
+class PackageCache:
+    """Size-bounded directory of IPFS content, one file per CID, evicted least recently used first."""
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: Optional[int] = None):
+        settings = CONFIG["verification"]
+        self.directory = directory or settings["cache_dir"]
+        self.max_bytes = settings["cache_max_bytes"] if max_bytes is None else max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path(self, cid: str) -> str:
+        if not _CID_PATTERN.match(cid):
+            raise ValueError(f"Invalid CID '{cid}'.")
+        return os.path.join(self.directory, cid)
+
+    def lookup(self, cid: str) -> Optional[str]:
+        """Path of the cached content, marked as recently used, or None."""
+        path = self.path(cid)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def temporary_file(self):
+        # In the cache directory so the finished file can be renamed into place atomically
+        return tempfile.NamedTemporaryFile("wb", dir=self.directory, prefix=".partial-", delete=False)
+
+    def store(self, cid: str, temporary_path: str) -> None:
+        """Move a fully written temporary file into the cache and evict down to the size bound."""
+        os.replace(temporary_path, self.path(cid))
+        self.evict()
+
+    def evict(self) -> None:
+        entries = []
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.is_file() and not entry.name.startswith(".partial-"):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue  # Evicted by another process
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+def _normalize_hash(data_hash: str) -> str:
+    data_hash = str(data_hash).strip().lower()
+    return data_hash if data_hash.startswith("0x") else "0x" + data_hash
+
+
+def lookup_cid(data_hash: str) -> Optional[str]:
+    """The IPFS CID recorded in flight_mappings for a dataHash, or None."""
+    conn = sqlite3.connect(CONFIG["database"]["path"], timeout=5.0)
+    try:
+        row = conn.execute('SELECT ipfs_cid FROM flight_mappings WHERE data_hash = ?', (data_hash,)).fetchone()
+    except sqlite3.OperationalError:
+        return None  # No flight has been registered yet
+    finally:
+        conn.close()
+    return row[0] if row else None
+
+
+def _hash_file(path: str, chunk_bytes: int) -> Tuple[str, int]:
+    hasher = keccak.new(b"")
+    size = 0
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_bytes):
+            hasher.update(chunk)
+            size += len(chunk)
+    return "0x" + hasher.digest().hex(), size
+
+
+async def _fetch_and_hash(cid: str, cache: PackageCache, chunk_bytes: int) -> Tuple[str, int]:
+    """Stream the content from the IPFS API through Keccak and into the cache."""
+    hasher = keccak.new(b"")
+    size = 0
+    spool = cache.temporary_file()
+    try:
+        with spool:
+            async with ipfs_http_client().stream("POST", "/cat", params={"arg": cid}) as response:
+                response.raise_for_status()
+                async for chunk in response.aiter_bytes(chunk_bytes):
+                    hasher.update(chunk)
+                    size += len(chunk)
+                    # Content larger than the whole cache is hashed but not kept
+                    if size <= cache.max_bytes:
+                        spool.write(chunk)
+        if size <= cache.max_bytes:
+            cache.store(cid, spool.name)
+    finally:
+        if os.path.exists(spool.name):
+            os.remove(spool.name)
+    return "0x" + hasher.digest().hex(), size
+
+
+async def verify_package(data_hash: str, cid: Optional[str] = None, cache: Optional[PackageCache] = None) -> Dict[str, Any]:
+    """
+    Check that the IPFS content for a dataHash hashes back to it.
+
+    Args:
+        data_hash (str): The 0x-prefixed keccak256 of the package.
+        cid (str, optional): The package's CID, for packages not recorded in flight_mappings
+            (such as DGIP logs). Looked up by hash when omitted.
+
+    Returns:
+        dict: dataHash, cid, verdict ("valid", "mismatch", "unknown_hash", "not_uploaded" or
+            "unavailable"), computedHash, size, cached and error.
+    """
+    data_hash = _normalize_hash(data_hash)
+    result = {"dataHash": data_hash, "cid": cid, "verdict": None, "computedHash": None, "size": None,
+              "cached": False, "error": None}
+    if not _HASH_PATTERN.match(data_hash):
+        result.update(verdict="unknown_hash", error="dataHash must be 32 bytes of hex.")
+        return result
+    if cid is None:
+        cid = result["cid"] = lookup_cid(data_hash)
+    if cid is None:
+        result["verdict"] = "unknown_hash"
+        return result
+    if cid == "UPLOAD_FAILED":
+        result["verdict"] = "not_uploaded"
+        return result
+
+    cache = cache or PackageCache()
+    chunk_bytes = CONFIG["verification"]["chunk_bytes"]
+    try:
+        computed = None
+        cached_path = cache.lookup(cid)
+        if cached_path is not None:
+            try:
+                computed, size = await asyncio.to_thread(_hash_file, cached_path, chunk_bytes)
+                result["cached"] = True
+            except FileNotFoundError:
+                pass  # Evicted since the lookup; fetch it again
+        if computed is None:
+            with deadline_scope(CONFIG["limits"]["request_deadline_seconds"]):
+                computed, size = await limiter("ipfs").call(lambda: _fetch_and_hash(cid, cache, chunk_bytes))
+    except Exception as e:
+        result.update(verdict="unavailable", error=f"Failed to fetch {cid} from IPFS: {e}")
+        return result
+
+    result.update(verdict="valid" if computed == data_hash else "mismatch", computedHash=computed, size=size)
+    return result
+
+
+async def verify_packages(requests: List[Dict[str, Any]], max_parallel: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Verify several {"dataHash", "cid"?} requests concurrently, at most max_parallel at a time, in input order."""
+    semaphore = asyncio.Semaphore(max_parallel or CONFIG["verification"]["max_parallel"])
+    cache = PackageCache()
+
+    async def verify_one(request: Dict[str, Any]) -> Dict[str, Any]:
+        async with semaphore:
+            return await verify_package(request["dataHash"], request.get("cid"), cache)
+
+    return await asyncio.gather(*(verify_one(request) for request in requests))
+
+
+async def main():
+    """Read {"dataHash", "cid"?} or {"packages": [{"dataHash", "cid"?}, ...]} from stdin and print the verdicts."""
+    try:
+        request = json.loads(sys.stdin.read() or "{}")
+        try:
+            if isinstance(request.get("packages"), list):
+                results = await verify_packages(request["packages"])
+                print(json.dumps({"results": results, "error": None}))
+            elif request.get("dataHash"):
+                print(json.dumps({"result": await verify_package(request["dataHash"], request.get("cid")), "error": None}))
+            else:
+                raise ValueError("Input must contain a dataHash or a packages array.")
+        finally:
+            await close_http_clients()
+    except (json.JSONDecodeError, KeyError, ValueError, OSError) as e:
+        sys.stderr.write(f"Error: {e}\n")
+        print(json.dumps({"error": str(e)}))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,27 +1,55 @@
+import os
 import sys
 import json
 import asyncio
-import aioipfs
+import tempfile
+from typing import Any, Dict, Iterable, Iterator, List
+import numpy as np
 from eth_hash.auto import keccak
+from canonical_json import canonical_dumps
+from profiling import profile_request, should_profile
+from admission import deadline_scope, limiter
+from config import CONFIG
+from http_clients import close_http_clients, shared_ipfs_client
+from telemetry_compliance import evaluate_telemetry, waypoints_to_arrays
+from geofence import check_geofence
+from trajectory_simplify import simplification_tolerances, simplify_waypoints
+from telemetry_archive import TelemetryArchive
+from risk_grid import record_dgip
 
-async def process_dgip_data(dgip_log_data: list):
+async def process_dgip_data(dgip_log_data: list, simplify_tolerance_m: float = None):
     """
     Serializes, hashes, and uploads DGIP log data to IPFS.
+    When a simplification tolerance is configured (or passed in), waypoints that can be
+    interpolated within tolerance are dropped and the tolerance is recorded in the package.
     """
     if not dgip_log_data:
         return None, None, "No DGIP log data received."
 
+    # Optional error-bounded simplification before storage
+    waypoints = dgip_log_data
+    simplification = None
+    tolerances = simplification_tolerances(simplify_tolerance_m)
+    if tolerances:
+        try:
+            waypoints, simplification = simplify_waypoints(dgip_log_data, tolerances)
+            sys.stderr.write(f"Simplified DGIP log from {simplification['original_points']} to {simplification['retained_points']} waypoints.\n")
+        except (KeyError, TypeError, ValueError) as e:
+            return None, None, f"Error simplifying DGIP data: {e}"
+
     # Serialize the list of log entries consistently
-    # sort_keys=True ensures deterministic serialization for consistent hashing
+    # canonical_dumps sorts keys, ensuring deterministic serialization for consistent hashing
     try:
         # The flightPathAsset.json example wraps waypoints in a 'generated_path' object
         # Let's simulate that structure for better resemblance to potential final asset metadata
         serialized_data_obj = {
             "generated_path": {
-                "waypoints": dgip_log_data # Use the received log array as waypoints
+                "waypoints": waypoints # Use the received (possibly simplified) log array as waypoints
             }
         }
-        serialized_data_string = json.dumps(serialized_data_obj, sort_keys=True, separators=(',', ':'))
+        if simplification:
+            serialized_data_obj["generated_path"]["simplification"] = simplification
+        serialized_data_string = canonical_dumps(serialized_data_obj)
     except Exception as e:
         return None, None, f"Error serializing DGIP data: {e}"
 
@@ -36,9 +64,10 @@ async def process_dgip_data(dgip_log_data: list):
     # Upload to IPFS
     ipfs_cid = None
     try:
-        async with aioipfs.AsyncIPFS() as ipfs_client:
-            ipfs_add_result = await ipfs_client.core.add_bytes(serialized_data_string.encode('utf-8'))
-            ipfs_cid = ipfs_add_result['Hash']
+        ipfs_client = shared_ipfs_client()
+        ipfs_add_result = await limiter("ipfs").call(
+            lambda: ipfs_client.core.add_bytes(serialized_data_string.encode('utf-8')))
+        ipfs_cid = ipfs_add_result['Hash']
     except Exception as e:
         # It's okay to proceed if IPFS upload fails for the MVP, but report the error
         sys.stderr.write(f"Warning: Failed to upload DGIP data to IPFS: {e}\n")
@@ -46,6 +75,124 @@ async def process_dgip_data(dgip_log_data: list):
 
     return dgip_data_hash_hex, ipfs_cid, None
 
+async def process_dgip_stream(waypoints: Iterable[Dict[str, Any]]):
+    """
+    Serializes, hashes, and uploads a stream of DGIP waypoints without holding them in memory.
+
+    The canonical package is written incrementally: each waypoint is encoded on its own and
+    fed to the Keccak state and to a spooled temporary file, which is then uploaded to IPFS.
+    For the same waypoints the hash equals process_dgip_data's (without simplification, which
+    needs the whole path). Returns (hash, cid, waypoint count, error).
+    """
+    buffer_limit = CONFIG["ingest"]["write_buffer_bytes"]
+    hasher = keccak.new(b"")
+    count = 0
+    spool = tempfile.NamedTemporaryFile("wb", suffix=".json", delete=False)
+    try:
+        with spool:
+            # Same bytes as canonical_dumps({"generated_path": {"waypoints": [...]}})
+            pending = [b'{"generated_path":{"waypoints":[']
+            pending_size = len(pending[0])
+            try:
+                for waypoint in waypoints:
+                    encoded = (b"," if count else b"") + canonical_dumps(waypoint).encode('utf-8')
+                    pending.append(encoded)
+                    pending_size += len(encoded)
+                    count += 1
+                    if pending_size >= buffer_limit:
+                        chunk = b"".join(pending)
+                        hasher.update(chunk)
+                        spool.write(chunk)
+                        pending, pending_size = [], 0
+            except (KeyError, TypeError, ValueError, OSError) as e:
+                return None, None, count, f"Error reading DGIP data: {e}"
+            if not count:
+                return None, None, 0, "No DGIP log data received."
+            pending.append(b"]}}")
+            chunk = b"".join(pending)
+            hasher.update(chunk)
+            spool.write(chunk)
+        dgip_data_hash_hex = "0x" + hasher.digest().hex()
+
+        ipfs_cid = None
+        try:
+            ipfs_client = shared_ipfs_client()
+
+            async def add_spooled_file():
+                added = None
+                # The file is streamed to the IPFS API in chunks
+                async for entry in ipfs_client.core.add(spool.name):
+                    added = entry
+                return added
+
+            ipfs_add_result = await limiter("ipfs").call(add_spooled_file)
+            ipfs_cid = ipfs_add_result['Hash']
+        except Exception as e:
+            sys.stderr.write(f"Warning: Failed to upload DGIP data to IPFS: {e}\n")
+            ipfs_cid = None
+        return dgip_data_hash_hex, ipfs_cid, count, None
+    finally:
+        os.remove(spool.name)
+
+def collect_columns(waypoints: Iterable[Dict[str, Any]], chunks: List[Dict[str, np.ndarray]],
+                    chunk_size: int = None) -> Iterator[Dict[str, Any]]:
+    """
+    Pass a stream of waypoints through unchanged while converting them to telemetry arrays,
+    chunk_size at a time, into chunks. Only one chunk of waypoint dicts is held at once;
+    the analysis then runs over concat_columns(chunks).
+    """
+    chunk_size = max(1, chunk_size or CONFIG["ingest"]["analysis_chunk_waypoints"])
+    pending = []
+    for waypoint in waypoints:
+        pending.append(waypoint)
+        yield waypoint
+        if len(pending) >= chunk_size:
+            chunks.append(waypoints_to_arrays(pending))
+            pending = []
+    if pending:
+        chunks.append(waypoints_to_arrays(pending))
+
+def concat_columns(chunks: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    """Join telemetry array chunks from collect_columns into one set of columns."""
+    if not chunks:
+        return waypoints_to_arrays([])
+    return {name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0]}
+
+def analyze_dgip_data(dgip_log_data: list, flight_area: dict = None) -> dict:
+    """
+    Runs the telemetry compliance and, when the registered flight area is known,
+    geofence conformance checks over the DGIP log. Waypoints are converted to arrays once.
+    """
+    if not dgip_log_data:
+        return {"telemetryCompliance": None, "geofence": None}
+
+    try:
+        columns = waypoints_to_arrays(dgip_log_data)
+    except (KeyError, TypeError, ValueError) as e:
+        sys.stderr.write(f"Warning: Could not analyze DGIP telemetry: {e}\n")
+        return {"telemetryCompliance": {"compliant": False, "error": f"Invalid telemetry data: {e}"}, "geofence": None}
+
+    return analyze_dgip_columns(columns, flight_area)
+
+def analyze_dgip_columns(columns: Dict[str, np.ndarray], flight_area: dict = None) -> dict:
+    """analyze_dgip_data for a log already converted to arrays (such as a streamed log)."""
+    analysis = {"telemetryCompliance": None, "geofence": None}
+    if len(columns["timestamp"]) == 0:
+        return analysis
+
+    analysis["telemetryCompliance"] = evaluate_telemetry(columns)
+
+    if flight_area and flight_area.get("flightAreaCenter") and flight_area.get("flightAreaRadius") is not None:
+        try:
+            center = flight_area["flightAreaCenter"]
+            analysis["geofence"] = check_geofence(columns, float(center["latitude"]), float(center["longitude"]),
+                                                  float(flight_area["flightAreaRadius"]))
+        except (KeyError, TypeError, ValueError) as e:
+            sys.stderr.write(f"Warning: Could not check geofence conformance: {e}\n")
+            analysis["geofence"] = {"inside": False, "error": f"Invalid flight area: {e}"}
+
+    return analysis
+
 async def main():
     """Main entry point for the script."""
     try:
@@ -55,14 +202,43 @@ async def main():
 
         dgip_log_data = json.loads(input_json)
 
+        # Input is either a bare array of waypoints or an object that also carries
+        # the registered flightAreaCenter/flightAreaRadius for the geofence check
+        flight_area = None
+        if isinstance(dgip_log_data, dict):
+            flight_area = dgip_log_data
+            dgip_log_data = dgip_log_data.get("waypoints")
+
         if not isinstance(dgip_log_data, list):
-            raise ValueError("Input must be a JSON array of DGIP logs.")
+            raise ValueError("Input must be a JSON array of DGIP logs or an object with a 'waypoints' array.")
+
+        # Profiling is controlled by PROFILE_ENABLED / PROFILE_SAMPLE_RATE for DGIP uploads
+        try:
+            with deadline_scope(CONFIG["limits"]["request_deadline_seconds"]):
+                async with profile_request("process_dgip_data", should_profile()):
+                    dgip_data_hash, ipfs_cid, error = await process_dgip_data(dgip_log_data)
+        finally:
+            await close_http_clients()
+
+        # Keep the full (unsimplified) log locally, keyed by its hash, for claim investigation
+        if dgip_data_hash and CONFIG["archive"]["enabled"]:
+            try:
+                TelemetryArchive().append(dgip_data_hash, dgip_log_data)
+            except Exception as e:
+                sys.stderr.write(f"Warning: Failed to archive DGIP data: {e}\n")
 
-        dgip_data_hash, ipfs_cid, error = await process_dgip_data(dgip_log_data)
+        # Check the flown telemetry against the same limits the validator applies to the plan
+        analysis = analyze_dgip_data(dgip_log_data, flight_area)
+        try:
+            record_dgip(dgip_log_data, analysis, flight_area)
+        except Exception as e:
+            sys.stderr.write(f"Warning: Failed to update the risk grid: {e}\n")
 
         result = {
             "dgipDataHash": dgip_data_hash,
             "ipfsCid": ipfs_cid,
+            "telemetryCompliance": analysis["telemetryCompliance"],
+            "geofence": analysis["geofence"],
             "error": error
         }
 
@@ -0,0 +1,148 @@
+import asyncio
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import sys
+import time
+import tracemalloc
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from config import CONFIG
+
+
+def should_profile(requested: Optional[bool] = None) -> bool:
+    """
+    Decide whether the current request should run under the profiler.
+
+    Nothing is profiled unless PROFILE_ENABLED is set, whatever the client asks for:
+    profiles are written to the server's disk. When enabled, an explicit request flag
+    wins; otherwise a PROFILE_SAMPLE_RATE fraction of calls is profiled, so it can
+    stay enabled on live traffic.
+    """
+    settings = CONFIG["profiling"]
+    if not settings["enabled"]:
+        return False
+    if requested is not None:
+        return bool(requested)
+    return random.random() < settings["sample_rate"]
+
+
+class _LoopLagSampler:
+    """Measures how late the event loop wakes a task that sleeps for a fixed interval."""
+
+    def __init__(self, interval_seconds: float):
+        self.interval_seconds = interval_seconds
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval_seconds
+            await asyncio.sleep(self.interval_seconds)
+            # Any delay beyond the requested sleep is time the loop spent blocked
+            self.samples.append(max(0.0, loop.time() - expected))
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def summary(self) -> Dict[str, Any]:
+        if not self.samples:
+            return {"samples": 0, "interval_ms": self.interval_seconds * 1000}
+        ordered = sorted(self.samples)
+        p95_index = min(len(ordered) - 1, int(len(ordered) * 0.95))
+        return {
+            "samples": len(ordered),
+            "interval_ms": self.interval_seconds * 1000,
+            "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+            "p95_ms": round(ordered[p95_index] * 1000, 3),
+            "max_ms": round(ordered[-1] * 1000, 3),
+        }
+
+
+def _write_bundle(name: str, profiler: cProfile.Profile, snapshot: Optional[tracemalloc.Snapshot],
+                  peak_bytes: int, wall_seconds: float, loop_lag: Dict[str, Any]) -> str:
+    """Write the collected profiles into a timestamped directory and return its path."""
+    settings = CONFIG["profiling"]
+    timestamp = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+    bundle_dir = os.path.join(settings["output_dir"], f"{name}-{timestamp}")
+    os.makedirs(bundle_dir, exist_ok=True)
+
+    # Raw stats can be loaded later with pstats or snakeviz
+    profiler.dump_stats(os.path.join(bundle_dir, "cpu.pstats"))
+    cpu_report = io.StringIO()
+    pstats.Stats(profiler, stream=cpu_report).sort_stats("cumulative").print_stats(settings["top_n"])
+    with open(os.path.join(bundle_dir, "cpu.txt"), "w") as f:
+        f.write(cpu_report.getvalue())
+
+    if snapshot is not None:
+        with open(os.path.join(bundle_dir, "memory.txt"), "w") as f:
+            for stat in snapshot.statistics("lineno")[:settings["top_n"]]:
+                f.write(f"{stat}\n")
+
+    summary = {
+        "name": name,
+        "timestamp": timestamp,
+        "wall_time_ms": round(wall_seconds * 1000, 3),
+        "peak_traced_memory_bytes": peak_bytes,
+        "event_loop_lag": loop_lag,
+    }
+    with open(os.path.join(bundle_dir, "summary.json"), "w") as f:
+        json.dump(summary, f, indent=2)
+    return bundle_dir
+
+
+@asynccontextmanager
+async def profile_request(name: str, enabled: bool = True):
+    """
+    Run the wrapped block under cProfile and tracemalloc while sampling event-loop lag.
+
+    When enabled is False this is a no-op, so callers can wrap unconditionally.
+    Failures while writing the bundle are reported on stderr and never affect the request.
+    """
+    if not enabled:
+        yield
+        return
+
+    settings = CONFIG["profiling"]
+    # Only stop tracemalloc afterwards if this block was the one that started it
+    started_tracemalloc = not tracemalloc.is_tracing()
+    if started_tracemalloc:
+        tracemalloc.start(settings["tracemalloc_frames"])
+    tracemalloc.reset_peak()
+
+    sampler = _LoopLagSampler(settings["loop_lag_interval_ms"] / 1000.0)
+    sampler.start()
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        wall_seconds = time.perf_counter() - start
+        await sampler.stop()
+        snapshot = tracemalloc.take_snapshot()
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        if started_tracemalloc:
+            tracemalloc.stop()
+        try:
+            bundle_dir = _write_bundle(name, profiler, snapshot, peak_bytes, wall_seconds, sampler.summary())
+            print(f"Profile bundle written to: {bundle_dir}", file=sys.stderr)
+        except Exception as e:
+            print(f"Warning: Failed to write profile bundle: {e}", file=sys.stderr)
@@ -0,0 +1,165 @@
+import json
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import CONFIG
+
+try:
+    import tiktoken
+except ImportError:  # Installed with llama_index; fall back to a character estimate otherwise
+    tiktoken = None
+
+_encoding = None
+
+INSTRUCTIONS_HEADER = """Given the following flight details, deterministic check results, airspace conflicts with other registered flights, and No-Fly Zone validation findings,
+synthesize a comprehensive report detailing all potential compliance issues.
+Present the findings as a single list of bullet points.
+If no critical issues are found based on the deterministic and NFZ validation information, state that the flight appears compliant.
+"""
+
+INSTRUCTIONS_FOOTER = """Please analyze all the above information and provide a comprehensive compliance report that:
+1. Incorporates findings from all validation sources
+2. Prioritizes critical safety and regulatory issues
+3. Provides clear, actionable recommendations (if any issues)
+4. Notes any conflicting or ambiguous findings
+5. Highlights any validation errors or missing information encountered by the *validators*.
+
+Structure your response with 'Answer:' followed by the comprehensive report.
+"""
+
+# Keys that identify the distance of a zone from the flight, nearest zones are kept first
+_DISTANCE_KEYS = ("distance", "distanceKm", "distance_km", "distanceMeters", "distance_m")
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens with the model's tokenizer, or estimate ~4 characters per token."""
+    global _encoding
+    if tiktoken is None:
+        return (len(text) + 3) // 4
+    if _encoding is None:
+        try:
+            _encoding = tiktoken.encoding_for_model(CONFIG["llm"]["model"])
+        except KeyError:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+    return len(_encoding.encode(text))
+
+
+def _compact(obj: Any) -> str:
+    """Compact JSON: no indentation or spaces, non-ASCII kept as-is (fewer tokens than escapes)."""
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def _compact_flight_data(flight_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop empty fields; they carry no information for the model."""
+    return {key: value for key, value in flight_data.items() if value not in (None, "", [], {})}
+
+
+def _compact_deterministic(deterministic_results: Dict[str, List[str]]) -> Dict[str, List[str]]:
+    """Only categories with findings; an empty dict tells the model every check passed."""
+    return {category: messages for category, messages in deterministic_results.items() if messages}
+
+
+def _find_zone_list(payload: Any) -> Optional[Tuple[Any, Optional[str]]]:
+    """Locate the largest list of zone objects in a parsed NFZ payload: (container, key)."""
+    if isinstance(payload, list) and payload and all(isinstance(item, dict) for item in payload):
+        return payload, None
+    if isinstance(payload, dict):
+        candidates = [(key, value) for key, value in payload.items()
+                      if isinstance(value, list) and value and all(isinstance(item, dict) for item in value)]
+        if candidates:
+            key, _ = max(candidates, key=lambda candidate: len(candidate[1]))
+            return payload, key
+    return None
+
+
+def _zone_distance(zone: Dict[str, Any]) -> float:
+    for key in _DISTANCE_KEYS:
+        try:
+            return float(zone[key])
+        except (KeyError, TypeError, ValueError):
+            continue
+    return float("inf")
+
+
+def summarize_nfz_result(mcp_result: Dict[str, Any], max_zones: int) -> Dict[str, Any]:
+    """
+    Reduce an MCP validate-nfz result to the zones relevant to the flight.
+
+    The tool returns its findings as text; when that text is JSON containing a list of zones,
+    only the nearest max_zones are kept and the number omitted is recorded.
+    """
+    summary = dict(mcp_result)
+    raw = summary.get("validationResult")
+    if not isinstance(raw, str):
+        return summary
+    try:
+        parsed = json.loads(raw)
+    except ValueError:
+        return summary
+
+    located = _find_zone_list(parsed)
+    if located is not None:
+        container, key = located
+        zones = container if key is None else container[key]
+        if len(zones) > max_zones:
+            kept = sorted(zones, key=_zone_distance)[:max_zones]
+            if key is None:
+                parsed = {"zones": kept}
+            else:
+                parsed = {**container, key: kept}
+            parsed["omittedZones"] = len(zones) - max_zones
+    summary["validationResult"] = parsed
+    return summary
+
+
+def _truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text down to roughly max_tokens, marking the truncation."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    marker = "...[truncated]"
+    # Characters-per-token ratio of this text, used to jump close to the limit in one step
+    ratio = len(text) / max(1, count_tokens(text))
+    cut = max(0, int(max_tokens * ratio) - len(marker))
+    while cut > 0 and count_tokens(text[:cut] + marker) > max_tokens:
+        cut = int(cut * 0.9)
+    return text[:cut] + marker
+
+
+def build_compliance_prompt(flight_data: Dict[str, Any], deterministic_results: Dict[str, List[str]],
+                            mcp_result: Dict[str, Any], max_tokens: Optional[int] = None,
+                            airspace_conflicts: Optional[List[Dict[str, Any]]] = None) -> Tuple[str, int]:
+    """
+    Build the compliance agent prompt within a token budget.
+
+    Flight details, check results and airspace conflicts (already capped and nearest first) use
+    compact JSON and are always kept in full; the NFZ payload is reduced to the nearest zones,
+    and if the prompt is still over budget the zone count is halved and finally the NFZ
+    section is truncated. Returns the prompt and its token count.
+    """
+    settings = CONFIG["prompt"]
+    max_tokens = max_tokens or settings["max_tokens"]
+    flight_section = _compact(_compact_flight_data(flight_data))
+    deterministic_section = _compact(_compact_deterministic(deterministic_results))
+    airspace_section = _compact(airspace_conflicts or [])
+    fixed_tokens = count_tokens(INSTRUCTIONS_HEADER + INSTRUCTIONS_FOOTER + flight_section + deterministic_section
+                                + airspace_section)
+    # Headings and blank lines between sections
+    fixed_tokens += 48
+
+    max_zones = settings["max_nfz_zones"]
+    nfz_section = _compact(summarize_nfz_result(mcp_result, max_zones))
+    while fixed_tokens + count_tokens(nfz_section) > max_tokens and max_zones > 1:
+        max_zones //= 2
+        nfz_section = _compact(summarize_nfz_result(mcp_result, max_zones))
+    nfz_section = _truncate_to_tokens(nfz_section, max(64, max_tokens - fixed_tokens))
+
+    prompt = (f"\n{INSTRUCTIONS_HEADER}\n"
+              f"Flight Details:\n{flight_section}\n\n"
+              f"Deterministic Check Results (only categories with issues; empty means all passed):\n{deterministic_section}\n\n"
+              f"Airspace Conflicts (other registered or pending flights in the same airspace at the same time; empty means none):\n{airspace_section}\n\n"
+              f"MCP No-Fly Zone Validation Results:\n{nfz_section}\n\n"
+              f"{INSTRUCTIONS_FOOTER}")
+    prompt_tokens = count_tokens(prompt)
+    if prompt_tokens > max_tokens:
+        print(f"Warning: Compliance prompt uses {prompt_tokens} tokens, above the budget of {max_tokens}.", file=sys.stderr)
+    return prompt, prompt_tokens
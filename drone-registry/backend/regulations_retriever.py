@@ -0,0 +1,109 @@
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Tuple
+
+from llama_index.core import QueryBundle
+from llama_index.core.query_engine import RetrieverQueryEngine
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import NodeWithScore, TextNode
+
+_SECTION_HEADER = re.compile(r"^===\s*(.+?)\s*===\s*$", re.MULTILINE)
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from in is it must not of on or the to with without".split())
+
+
+@dataclass(frozen=True)
+class RegulationChunk:
+    """One section of regulations.txt, split on the === headers."""
+    section: str
+    text: str
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric tokens without stopwords; a trailing plural 's' is dropped."""
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def split_sections(text: str) -> List[RegulationChunk]:
+    """Split the regulations into one chunk per === SECTION === block (text before the first header is kept too)."""
+    chunks = []
+    headers = list(_SECTION_HEADER.finditer(text))
+    preamble = text[:headers[0].start()].strip() if headers else text.strip()
+    if preamble:
+        chunks.append(RegulationChunk(section="", text=preamble))
+    for i, header in enumerate(headers):
+        end = headers[i + 1].start() if i + 1 < len(headers) else len(text)
+        body = text[header.end():end].strip()
+        if body:
+            # Keep the header in the chunk so its words are searchable and visible to the model
+            chunks.append(RegulationChunk(section=header.group(1), text=f"{header.group(0).strip()}\n{body}"))
+    return chunks
+
+
+class BM25Index:
+    """Okapi BM25 over a small, fixed set of chunks, built in memory."""
+
+    def __init__(self, chunks: List[RegulationChunk], k1: float = 1.5, b: float = 0.75):
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+        self._term_counts = [Counter(tokenize(chunk.text)) for chunk in chunks]
+        self._lengths = [sum(counts.values()) for counts in self._term_counts]
+        self._average_length = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0.0
+        document_frequency = Counter(term for counts in self._term_counts for term in counts)
+        count = len(chunks)
+        self._idf = {term: math.log(1 + (count - df + 0.5) / (df + 0.5)) for term, df in document_frequency.items()}
+
+    def search(self, query: str, top_k: int) -> List[Tuple[RegulationChunk, float]]:
+        """Return up to top_k chunks with a positive score, best first (ties keep document order)."""
+        terms = [term for term in tokenize(query) if term in self._idf]
+        scored = []
+        for index, (counts, length) in enumerate(zip(self._term_counts, self._lengths)):
+            norm = self.k1 * (1 - self.b + self.b * length / self._average_length) if self._average_length else self.k1
+            score = 0.0
+            for term in terms:
+                frequency = counts.get(term, 0)
+                if frequency:
+                    score += self._idf[term] * frequency * (self.k1 + 1) / (frequency + norm)
+            if score > 0:
+                scored.append((score, index))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [(self.chunks[index], score) for score, index in scored[:top_k]]
+
+
+@lru_cache(maxsize=4)
+def load_regulations_index(path: str) -> BM25Index:
+    """Build (once per process) the BM25 index for a regulations file."""
+    with open(path, encoding="utf-8") as f:
+        return BM25Index(split_sections(f.read()))
+
+
+class RegulationsBM25Retriever(BaseRetriever):
+    """LlamaIndex retriever over the local BM25 index; no embedding calls, deterministic results."""
+
+    def __init__(self, index: BM25Index, top_k: int):
+        super().__init__()
+        self._index = index
+        self._top_k = top_k
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        return [
+            NodeWithScore(node=TextNode(text=chunk.text, metadata={"section": chunk.section}), score=score)
+            for chunk, score in self._index.search(query_bundle.query_str, self._top_k)
+        ]
+
+
+def build_bm25_query_engine(path: str, top_k: int) -> RetrieverQueryEngine:
+    """Query engine for the RegulationValidator tool backed by the local lexical retriever."""
+    return RetrieverQueryEngine.from_args(RegulationsBM25Retriever(load_regulations_index(path), top_k))
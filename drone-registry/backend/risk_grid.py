@@ -0,0 +1,179 @@
+import json
+import sqlite3
+import sys
+from typing import Any, Dict, List, Optional
+
+from config import CONFIG
+from rules_engine import critical_findings, parse_center, parse_time_minutes
+from telemetry_compliance import parse_timestamp
+
+# Aggregate risk counters per geohash cell and hour of day, kept in the flight database.
+# Every validation and every processed DGIP log adds to one row with an upsert, so a premium
+# quote reads a handful of rows by primary key instead of scanning flight history.
+
+_GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+COUNTERS = ("validations", "non_compliant", "nfz_hits", "deterministic_violations",
+            "flights_flown", "geofence_breaches", "telemetry_violations")
+
+
+def geohash(latitude: float, longitude: float, precision: int) -> str:
+    """Standard base-32 geohash of a point."""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits, value, even = 0, 0, True
+    while len(chars) < precision:
+        interval, coordinate = (lng_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_GEOHASH_ALPHABET[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+
+class RiskGrid:
+    """Per (geohash, hour of day) counters of operations and compliance findings."""
+
+    def __init__(self, db_path: Optional[str] = None, precision: Optional[int] = None):
+        settings = CONFIG["risk_grid"]
+        self.db_path = db_path or CONFIG["database"]["path"]
+        self.precision = precision or settings["geohash_precision"]
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=5.0)
+        conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS risk_cells (
+                geohash TEXT,
+                hour INTEGER,
+                {", ".join(f"{counter} INTEGER DEFAULT 0" for counter in COUNTERS)},
+                PRIMARY KEY (geohash, hour)
+            ) WITHOUT ROWID
+        ''')
+        return conn
+
+    def add(self, latitude: float, longitude: float, hour: int, counts: Dict[str, int]) -> None:
+        """Add counts (keys from COUNTERS) to the cell containing the point at the given hour."""
+        counters = [counter for counter in COUNTERS if counts.get(counter)]
+        if not counters:
+            return
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    f'INSERT INTO risk_cells (geohash, hour, {", ".join(counters)}) '
+                    f'VALUES (?, ?, {", ".join("?" for _ in counters)}) '
+                    f'ON CONFLICT (geohash, hour) DO UPDATE SET '
+                    f'{", ".join(f"{counter} = {counter} + excluded.{counter}" for counter in counters)}',
+                    (geohash(latitude, longitude, self.precision), hour % 24, *(int(counts[c]) for c in counters)))
+        finally:
+            conn.close()
+
+    def cell(self, latitude: float, longitude: float, hours: Optional[List[int]] = None) -> Dict[str, Any]:
+        """
+        Counters for the cell containing the point, summed over the given hours of day (all when omitted),
+        with non-compliance and breach rates.
+        """
+        cell_hash = geohash(latitude, longitude, self.precision)
+        hours = list(range(24)) if hours is None else sorted({hour % 24 for hour in hours})
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                f'SELECT {", ".join(f"COALESCE(SUM({counter}), 0)" for counter in COUNTERS)} FROM risk_cells '
+                f'WHERE geohash = ? AND hour IN ({", ".join("?" for _ in hours)})',
+                (cell_hash, *hours)).fetchone()
+        finally:
+            conn.close()
+        totals = dict(zip(COUNTERS, row))
+        validations, flown = totals["validations"], totals["flights_flown"]
+        return {
+            "geohash": cell_hash,
+            "hours": hours,
+            **totals,
+            "non_compliance_rate": totals["non_compliant"] / validations if validations else None,
+            "nfz_hit_rate": totals["nfz_hits"] / validations if validations else None,
+            "geofence_breach_rate": totals["geofence_breaches"] / flown if flown else None,
+        }
+
+
+def _plan_hour(flight_data: Dict[str, Any]) -> Optional[int]:
+    minutes = parse_time_minutes(str(flight_data.get("startTime") or "").strip())
+    return None if minutes is None else minutes // 60
+
+
+def window_hours(start: Optional[int], end: Optional[int]) -> Optional[List[int]]:
+    """Hours of day touched by a start-end window in minutes; None (every hour) without a start."""
+    if start is None:
+        return None
+    start_hour = start // 60
+    end_hour = end // 60 if end is not None else start_hour
+    # An overnight window (end before start) wraps past midnight
+    span = (end_hour - start_hour) % 24
+    if end is not None and end < start and span == 0:
+        span = 23  # e.g. 10:30-10:10 runs through every hour
+    return [(start_hour + offset) % 24 for offset in range(span + 1)]
+
+
+def record_validation(flight_data: Dict[str, Any], result: Dict[str, Any]) -> None:
+    """Add a validate_and_process_flight_data result to the grid (skipped without a location and start time)."""
+    if not CONFIG["risk_grid"]["enabled"]:
+        return
+    center = parse_center(flight_data.get("flightAreaCenter"))
+    hour = _plan_hour(flight_data)
+    raw = result.get("raw_validation_data") or {}
+    if center is None or hour is None or not raw:
+        return
+    mcp_status = (raw.get("mcp_validation") or {}).get("status")
+    RiskGrid().add(center[0], center[1], hour, {
+        "validations": 1,
+        "non_compliant": 0 if result.get("is_critically_compliant") else 1,
+        # tool_error is the NFZ tool reporting a problem with the area; communication errors are not hits
+        "nfz_hits": 1 if mcp_status == "tool_error" else 0,
+        "deterministic_violations": sum(len(messages) for messages in
+                                        critical_findings(raw.get("deterministic_checks") or {}).values()),
+    })
+
+
+def record_dgip(waypoints: List[Dict[str, Any]], analysis: Dict[str, Any], flight_area: Optional[Dict[str, Any]] = None) -> None:
+    """Add a processed DGIP log and its telemetry/geofence analysis to the grid."""
+    if not CONFIG["risk_grid"]["enabled"] or not waypoints:
+        return
+    center = parse_center(flight_area.get("flightAreaCenter")) if flight_area else None
+    first = waypoints[0]
+    latitude, longitude = center if center is not None else (float(first["latitude"]), float(first["longitude"]))
+    # The local hour of day: offset timestamps keep their wall-clock time, naive ones are local
+    hour = parse_timestamp(first["timestamp"]).hour
+    telemetry = analysis.get("telemetryCompliance") or {}
+    geofence = analysis.get("geofence") or {}
+    RiskGrid().add(latitude, longitude, hour, {
+        "flights_flown": 1,
+        "telemetry_violations": len(telemetry.get("violations") or []),
+        "geofence_breaches": 1 if geofence.get("inside") is False and "error" not in geofence else 0,
+    })
+
+
+def main():
+    """Read {"flightAreaCenter", "startTime"?, "endTime"?} from stdin and print the cell's risk counters."""
+    try:
+        request = json.loads(sys.stdin.read() or "{}")
+        center = parse_center(request.get("flightAreaCenter"))
+        if center is None:
+            raise ValueError("Input must contain a flightAreaCenter.")
+        hours = window_hours(parse_time_minutes(str(request.get("startTime") or "").strip()),
+                             parse_time_minutes(str(request.get("endTime") or "").strip()))
+        print(json.dumps({"risk": RiskGrid().cell(center[0], center[1], hours), "error": None}))
+    except (ValueError, sqlite3.Error) as e:
+        sys.stderr.write(f"Error: {e}\n")
+        print(json.dumps({"risk": None, "error": str(e)}))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,380 @@
+import re
+from datetime import date
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from config import CONFIG
+from solar import civil_daylight, format_minutes
+
+# A predicate receives the values of the rule's fields (plus today's date) and
+# returns a violation message, or None when the rule is satisfied or not applicable.
+Predicate = Callable[..., Optional[str]]
+
+# Findings in this category are reported to the user but do not fail the critical gate, for
+# requirements the registration form cannot satisfy yet (it has no licence or insurance fields)
+ADVISORY_CATEGORY = "advisories"
+
+_DATE_PATTERN = re.compile(r"^(\d{4})-(\d{1,2})-(\d{1,2})$")
+_TIME_PATTERN = re.compile(r"^(\d{1,2}):(\d{1,2})$")
+
+
+@lru_cache(maxsize=4096)
+def parse_date(value: str) -> Optional[date]:
+    """Parse YYYY-MM-DD into a date, or None if malformed. Cached across calls."""
+    match = _DATE_PATTERN.match(value)
+    if not match:
+        return None
+    try:
+        return date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=4096)
+def parse_time_minutes(value: str) -> Optional[int]:
+    """Parse HH:MM into minutes after midnight, or None if malformed. Cached across calls."""
+    match = _TIME_PATTERN.match(value)
+    if not match:
+        return None
+    hours, minutes = int(match.group(1)), int(match.group(2))
+    if hours > 23 or minutes > 59:
+        return None
+    return hours * 60 + minutes
+
+
+def parse_center(value: Any) -> Optional[Tuple[float, float]]:
+    """flightAreaCenter as sent by the form ({"latitude", "longitude"} or "lat,lng"), or None if malformed."""
+    try:
+        if isinstance(value, dict):
+            return float(value["latitude"]), float(value["longitude"])
+        latitude, longitude = str(value).split(",")
+        return float(latitude), float(longitude)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _is_missing(value: Any) -> bool:
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _as_number(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _times(start: Any, end: Any):
+    """Parse both times; None for either means the format rule reports the problem."""
+    if _is_missing(start) or _is_missing(end):
+        return None, None
+    return parse_time_minutes(str(start).strip()), parse_time_minutes(str(end).strip())
+
+
+# --- Rule compilers: each turns a rule definition into a predicate ---
+
+def _compile_required(rule: Dict[str, Any]) -> Predicate:
+    message = rule["message"]
+    return lambda today, value: message if _is_missing(value) else None
+
+
+def _compile_regex(rule: Dict[str, Any]) -> Predicate:
+    pattern = re.compile(rule["pattern"], re.DOTALL)
+    message = rule["message"]
+
+    def predicate(today, value):
+        if _is_missing(value):
+            return None
+        text = str(value).strip()
+        return None if pattern.fullmatch(text) else message.format(value=text)
+    return predicate
+
+
+def _compile_one_of(rule: Dict[str, Any]) -> Predicate:
+    case_insensitive = rule.get("case_insensitive", False)
+    allowed = frozenset(v.casefold() if case_insensitive else v for v in rule["allowed"])
+    message = rule["message"]
+
+    def predicate(today, value):
+        if _is_missing(value):
+            return None
+        text = str(value).strip()
+        key = text.casefold() if case_insensitive else text
+        return None if key in allowed else message.format(value=text, allowed=", ".join(rule["allowed"]))
+    return predicate
+
+
+def _compile_range(rule: Dict[str, Any]) -> Predicate:
+    minimum, maximum = rule.get("min"), rule.get("max")
+
+    def predicate(today, value):
+        # A missing value is reported by the field's required rule
+        if _is_missing(value):
+            return None
+        number = _as_number(value)
+        if number is None:
+            return rule["invalid_message"].format(value=value)
+        if maximum is not None and number > maximum:
+            return rule["above_message"].format(number=number, max=maximum)
+        if minimum is not None and number < minimum:
+            return rule["below_message"].format(number=number, min=minimum)
+        return None
+    return predicate
+
+
+def _compile_required_above(rule: Dict[str, Any]) -> Predicate:
+    """Fields that become mandatory once a numeric value exceeds a threshold (e.g. Class C weight)."""
+    threshold = rule["above"]
+    message = rule["message"]
+
+    def predicate(today, value, *required_values):
+        number = _as_number(value)
+        if number is None or number <= threshold:
+            return None
+        if any(_is_missing(v) for v in required_values):
+            return message.format(number=number, above=threshold)
+        return None
+    return predicate
+
+
+def _compile_date_not_past(rule: Dict[str, Any]) -> Predicate:
+    def predicate(today, value):
+        if _is_missing(value):
+            return None
+        parsed = parse_date(str(value).strip())
+        if parsed is None:
+            return rule["invalid_message"].format(value=value)
+        return rule["message"].format(value=value) if parsed < today else None
+    return predicate
+
+
+def _compile_time_format(rule: Dict[str, Any]) -> Predicate:
+    message = rule["message"]
+
+    def predicate(today, start, end):
+        if _is_missing(start) or _is_missing(end):
+            return None
+        start_minutes, end_minutes = _times(start, end)
+        return message if start_minutes is None or end_minutes is None else None
+    return predicate
+
+
+def _compile_time_order(rule: Dict[str, Any]) -> Predicate:
+    message = rule["message"]
+
+    def predicate(today, start, end):
+        start_minutes, end_minutes = _times(start, end)
+        if start_minutes is None or end_minutes is None:
+            return None
+        return message.format(start=start, end=end) if end_minutes <= start_minutes else None
+    return predicate
+
+
+def _compile_time_window(rule: Dict[str, Any]) -> Predicate:
+    window_start, window_end = rule["window"]
+    earliest, latest = parse_time_minutes(window_start), parse_time_minutes(window_end)
+    message = rule["message"]
+
+    def predicate(today, start, end):
+        start_minutes, end_minutes = _times(start, end)
+        if start_minutes is None or end_minutes is None:
+            return None
+        # The flight must be entirely within the window
+        if earliest <= start_minutes <= latest and earliest <= end_minutes <= latest:
+            return None
+        return message.format(start=start, end=end, window_start=window_start, window_end=window_end)
+    return predicate
+
+
+def _compile_max_duration(rule: Dict[str, Any]) -> Predicate:
+    max_minutes = rule["max_minutes"]
+    message = rule["message"]
+
+    def predicate(today, start, end):
+        start_minutes, end_minutes = _times(start, end)
+        if start_minutes is None or end_minutes is None or end_minutes <= start_minutes:
+            return None
+        duration = end_minutes - start_minutes
+        return message.format(minutes=duration, max_minutes=max_minutes) if duration > max_minutes else None
+    return predicate
+
+
+def _compile_daylight(rule: Dict[str, Any]) -> Predicate:
+    message = rule["message"]
+
+    def predicate(today, flight_date, start, end, center, declared):
+        # A declared night operation is reported by the night_operation rule
+        if not _is_missing(declared) and str(declared).strip().lower() != "day":
+            return None
+        if _is_missing(flight_date):
+            return None
+        day = parse_date(str(flight_date).strip())
+        start_minutes, end_minutes = _times(start, end)
+        location = parse_center(center)
+        if day is None or start_minutes is None or end_minutes is None or end_minutes <= start_minutes or location is None:
+            return None
+        daylight = civil_daylight(day, *location)
+        if daylight.contains(start_minutes, end_minutes):
+            return None
+        if daylight.dawn is None:
+            window = "none (polar night)"
+        else:
+            window = f"{format_minutes(daylight.dawn)} - {format_minutes(daylight.dusk)}"
+        return message.format(start=start, end=end, daylight=window)
+    return predicate
+
+
+RULE_COMPILERS: Dict[str, Callable[[Dict[str, Any]], Predicate]] = {
+    "required": _compile_required,
+    "regex": _compile_regex,
+    "one_of": _compile_one_of,
+    "range": _compile_range,
+    "required_above": _compile_required_above,
+    "date_not_past": _compile_date_not_past,
+    "time_format": _compile_time_format,
+    "time_order": _compile_time_order,
+    "time_window": _compile_time_window,
+    "max_duration": _compile_max_duration,
+    "daylight": _compile_daylight,
+}
+
+
+class CompiledRule:
+    """A rule definition bound to its precompiled predicate and the fields it reads."""
+
+    __slots__ = ("id", "category", "fields", "predicate")
+
+    def __init__(self, definition: Dict[str, Any]):
+        rule_type = definition["type"]
+        if rule_type not in RULE_COMPILERS:
+            raise ValueError(f"Unknown rule type '{rule_type}' in rule '{definition.get('id')}'")
+        self.id: str = definition["id"]
+        self.category: str = definition["category"]
+        self.fields = tuple(definition["fields"]) if "fields" in definition else (definition["field"],)
+        self.predicate: Predicate = RULE_COMPILERS[rule_type](definition)
+
+
+class RuleSet:
+    """
+    Compiled deterministic rules.
+
+    evaluate() checks one flight; evaluate_batch() extracts each field once as a column
+    and applies every rule across the columns. Both return messages grouped by category,
+    in the same shape as FlightDataValidator.perform_deterministic_checks.
+    """
+
+    def __init__(self, definitions: Sequence[Dict[str, Any]]):
+        self.rules = [CompiledRule(definition) for definition in definitions]
+        # Preserve definition order so every category is always present in results
+        self.categories = list(dict.fromkeys(rule.category for rule in self.rules))
+        self.fields = list(dict.fromkeys(field for rule in self.rules for field in rule.fields))
+
+    def evaluate(self, flight: Dict[str, Any], today: Optional[date] = None) -> Dict[str, List[str]]:
+        today = today or date.today()
+        results: Dict[str, List[str]] = {category: [] for category in self.categories}
+        for rule in self.rules:
+            message = rule.predicate(today, *(flight.get(field) for field in rule.fields))
+            if message:
+                results[rule.category].append(message)
+        return results
+
+    def evaluate_batch(self, flights: Sequence[Dict[str, Any]],
+                       today: Optional[date] = None) -> List[Dict[str, List[str]]]:
+        today = today or date.today()
+        columns = {field: [flight.get(field) for flight in flights] for field in self.fields}
+        results = [{category: [] for category in self.categories} for _ in flights]
+        for rule in self.rules:
+            messages = map(rule.predicate, [today] * len(flights), *(columns[field] for field in rule.fields))
+            for result, message in zip(results, messages):
+                if message:
+                    result[rule.category].append(message)
+        return results
+
+
+def critical_findings(results: Dict[str, List[str]]) -> Dict[str, List[str]]:
+    """The categories of evaluate() results that count against the critical gate (all but advisories)."""
+    return {category: messages for category, messages in results.items() if category != ADVISORY_CATEGORY}
+
+
+def default_rules() -> List[Dict[str, Any]]:
+    """Rule definitions derived from regulations.txt and CONFIG."""
+    hours_start = CONFIG["telemetry"]["operating_hours_start"]
+    hours_end = CONFIG["telemetry"]["operating_hours_end"]
+    max_altitude_m = CONFIG["telemetry"]["max_altitude_m"]
+    return [
+        # Flight date
+        {"id": "flight_date_required", "category": "flight_date", "type": "required", "field": "flightDate",
+         "message": "Flight date is missing."},
+        {"id": "flight_date_not_past", "category": "flight_date", "type": "date_not_past", "field": "flightDate",
+         "message": "Flight date {value} is in the past.",
+         "invalid_message": "Invalid date format: {value}. Expected YYYY-MM-DD."},
+        # Flight times
+        {"id": "start_time_required", "category": "flight_times", "type": "required", "field": "startTime",
+         "message": "Start time is missing."},
+        {"id": "end_time_required", "category": "flight_times", "type": "required", "field": "endTime",
+         "message": "End time is missing."},
+        {"id": "flight_times_format", "category": "flight_times", "type": "time_format",
+         "fields": ["startTime", "endTime"],
+         "message": "Invalid time format. Expected HH:MM for both start and end times."},
+        {"id": "flight_times_order", "category": "flight_times", "type": "time_order",
+         "fields": ["startTime", "endTime"],
+         "message": "End time {end} must be after start time {start}."},
+        {"id": "flight_times_window", "category": "flight_times", "type": "time_window",
+         "fields": ["startTime", "endTime"], "window": [hours_start, hours_end],
+         "message": "Flight times ({start} - {end}) must be between {window_start} and {window_end}."},
+        {"id": "flight_duration", "category": "flight_times", "type": "max_duration",
+         "fields": ["startTime", "endTime"], "max_minutes": CONFIG["validation"]["max_flight_duration"],
+         "message": "Flight duration ({minutes} min) exceeds the maximum of {max_minutes} min."},
+        # Drone weight and class
+        {"id": "drone_weight_required", "category": "drone_weight", "type": "required", "field": "weight",
+         "message": "Drone weight is missing."},
+        {"id": "drone_weight_range", "category": "drone_weight", "type": "range", "field": "weight",
+         "min": 50, "max": 25000,
+         "invalid_message": "Invalid weight format: {value}. Expected a number.",
+         "above_message": "Drone weight ({number}g) exceeds 25000g (25kg). Additional regulations may apply.",
+         "below_message": "Drone weight ({number}g) is below minimum allowed (50g)."},
+        {"id": "class_c_license_insurance", "category": ADVISORY_CATEGORY, "type": "required_above",
+         "fields": ["weight", "licenseId", "insuranceId"], "above": 2000,
+         "message": "Class C drone ({number}g > {above}g) requires a commercial drone license ID and insurance ID."},
+        # Drone specifications
+        {"id": "drone_name_pattern", "category": "drone_specs", "type": "regex", "field": "droneName",
+         "pattern": r"[A-Za-z0-9]{3,20}",
+         "message": "Drone name '{value}' must be 3-20 alphanumeric characters."},
+        {"id": "drone_model_pattern", "category": "drone_specs", "type": "regex", "field": "droneModel",
+         "pattern": r"[A-Za-z0-9]+(?:-[A-Za-z0-9]+)*",
+         "message": "Drone model '{value}' must be an alphanumeric model code (e.g. DJI-M300)."},
+        {"id": "drone_type_allowed", "category": "drone_specs", "type": "one_of", "field": "droneType",
+         "allowed": ["Quadcopter", "Hexacopter", "Octocopter", "Fixed Wing", "VTOL", "Hybrid VTOL"],
+         "message": "Drone type '{value}' must be one of: {allowed}."},
+        {"id": "serial_number_pattern", "category": "drone_specs", "type": "regex", "field": "serialNumber",
+         "pattern": r"[A-Za-z0-9]{5,15}",
+         "message": "Serial number '{value}' must be 5-15 alphanumeric characters."},
+        # Flight plan
+        {"id": "flight_purpose_allowed", "category": "flight_plan", "type": "one_of", "field": "flightPurpose",
+         "allowed": ["Photography", "Survey/Mapping", "Delivery", "Inspection", "Recreational", "Emergency Response"],
+         "message": "Flight purpose '{value}' must be one of: {allowed}."},
+        {"id": "flight_description_length", "category": "flight_plan", "type": "regex",
+         "field": "flightDescription", "pattern": r".{10,}",
+         "message": "Flight description must be at least 10 characters long."},
+        {"id": "max_altitude", "category": "flight_plan", "type": "range", "field": "flightAreaMaxHeight",
+         "max": max_altitude_m,
+         "invalid_message": "Invalid maximum altitude: {value}. Expected a number.",
+         "above_message": "Maximum altitude ({number}m) exceeds {max}m without special authorization."},
+        # Night operations
+        {"id": "night_operation", "category": "day_night", "type": "one_of", "field": "dayNightOperation",
+         "allowed": ["day"], "case_insensitive": True,
+         "message": "Night flights are prohibited unless special authorization is granted."},
+        {"id": "civil_daylight", "category": "day_night", "type": "daylight",
+         "fields": ["flightDate", "startTime", "endTime", "flightAreaCenter", "dayNightOperation"],
+         "message": "Flight ({start} - {end}) extends beyond civil daylight at the flight location ({daylight} local time). "
+                    "Night flights are prohibited unless special authorization is granted."},
+    ]
+
+
+def compile_rules(definitions: Optional[Sequence[Dict[str, Any]]] = None) -> RuleSet:
+    """Compile rule definitions (the defaults when none are given) into a RuleSet."""
+    return RuleSet(default_rules() if definitions is None else definitions)
+
+
+# Compiled once at import and shared by every validation
+DEFAULT_RULE_SET = compile_rules()
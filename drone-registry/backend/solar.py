@@ -0,0 +1,72 @@
+import math
+from dataclasses import dataclass
+from datetime import date
+from functools import lru_cache
+from typing import Optional
+
+from config import CONFIG
+
+
+@dataclass(frozen=True)
+class DaylightWindow:
+    """
+    Civil dawn and dusk in minutes after local midnight. For polar day both are None and
+    always_light is True; for polar night both are None and always_light is False.
+    """
+    dawn: Optional[float]
+    dusk: Optional[float]
+    always_light: bool = False
+
+    def contains(self, start_minutes: int, end_minutes: int) -> bool:
+        """True if the whole interval lies between dawn and dusk."""
+        if self.dawn is None or self.dusk is None:
+            return self.always_light
+        return self.dawn <= start_minutes and end_minutes <= self.dusk
+
+
+def format_minutes(minutes: float) -> str:
+    """Minutes after midnight as HH:MM."""
+    whole = int(round(minutes)) % (24 * 60)
+    return f"{whole // 60:02d}:{whole % 60:02d}"
+
+
+def _solar_daylight(day: date, latitude: float, longitude: float, utc_offset_hours: float,
+                    zenith: float) -> DaylightWindow:
+    """NOAA general solar position approximation (accurate to a minute or two at low latitudes)."""
+    gamma = 2.0 * math.pi / 365.0 * (day.timetuple().tm_yday - 1)
+    equation_of_time = 229.18 * (0.000075 + 0.001868 * math.cos(gamma) - 0.032077 * math.sin(gamma)
+                                 - 0.014615 * math.cos(2 * gamma) - 0.040849 * math.sin(2 * gamma))
+    declination = (0.006918 - 0.399912 * math.cos(gamma) + 0.070257 * math.sin(gamma)
+                   - 0.006758 * math.cos(2 * gamma) + 0.000907 * math.sin(2 * gamma)
+                   - 0.002697 * math.cos(3 * gamma) + 0.00148 * math.sin(3 * gamma))
+    lat = math.radians(latitude)
+    cos_hour_angle = (math.cos(math.radians(zenith)) / (math.cos(lat) * math.cos(declination))
+                      - math.tan(lat) * math.tan(declination))
+    if cos_hour_angle > 1.0:
+        return DaylightWindow(None, None, always_light=False)
+    if cos_hour_angle < -1.0:
+        return DaylightWindow(None, None, always_light=True)
+    hour_angle = math.degrees(math.acos(cos_hour_angle))
+    solar_noon = 720.0 - 4.0 * longitude - equation_of_time + utc_offset_hours * 60.0
+    return DaylightWindow(solar_noon - 4.0 * hour_angle, solar_noon + 4.0 * hour_angle)
+
+
+@lru_cache(maxsize=4096)
+def _cell_daylight(day: date, lat_cell: int, lng_cell: int, cell_degrees: float,
+                   utc_offset_hours: float, zenith: float) -> DaylightWindow:
+    # Computed at the cell centre; a 0.1 degree cell moves dawn and dusk by well under a minute
+    return _solar_daylight(day, (lat_cell + 0.5) * cell_degrees, (lng_cell + 0.5) * cell_degrees,
+                           utc_offset_hours, zenith)
+
+
+def civil_daylight(day: date, latitude: float, longitude: float,
+                   utc_offset_hours: Optional[float] = None) -> DaylightWindow:
+    """
+    Civil dawn and dusk in local time for a date and location, memoized per date and
+    CONFIG["solar"]["cell_degrees"] latitude/longitude cell.
+    """
+    settings = CONFIG["solar"]
+    cell_degrees = settings["cell_degrees"]
+    offset = settings["utc_offset_hours"] if utc_offset_hours is None else utc_offset_hours
+    return _cell_daylight(day, math.floor(latitude / cell_degrees), math.floor(longitude / cell_degrees),
+                          cell_degrees, float(offset), settings["zenith"])
@@ -0,0 +1,199 @@
+import json
+import math
+import mmap
+import os
+import sqlite3
+import sys
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from config import CONFIG
+from telemetry_compliance import TELEMETRY_FIELDS, waypoints_to_arrays
+
+# Local archive of every DGIP log, keyed by its dgipDataHash so claim investigation can read the
+# flown waypoints without fetching the package from IPFS again.
+#
+#   telemetry.dat   fixed-width records, appended one flight at a time, sorted by time within a flight
+#                   (timestamps are the flight's local wall-clock time in ms, without an offset)
+#   telemetry.idx   sparse time index: (timestamp, record number) for every index_stride-th record
+#   catalog (SQLite) one row per flight with its record range and index range
+#
+# Both files are read through mmap and viewed as NumPy record arrays without copying. Appends are
+# serialized by a BEGIN IMMEDIATE transaction on the catalog; bytes past the last committed flight
+# (left by a crashed writer) are truncated before the next append.
+
+RECORD_DTYPE = np.dtype([("timestamp", "<i8")] + [(field, "<f8") for field in TELEMETRY_FIELDS])
+INDEX_DTYPE = np.dtype([("timestamp", "<i8"), ("record", "<i8")])
+
+
+class TelemetryArchive:
+    """Append-only, memory-mapped DGIP telemetry archive with a sparse time index."""
+
+    def __init__(self, directory: Optional[str] = None, index_stride: Optional[int] = None):
+        settings = CONFIG["archive"]
+        self.directory = directory or settings["directory"]
+        self.index_stride = max(1, index_stride or settings["index_stride"])
+        self.data_path = os.path.join(self.directory, "telemetry.dat")
+        self.index_path = os.path.join(self.directory, "telemetry.idx")
+        self.catalog_path = os.path.join(self.directory, "catalog.db")
+        self._maps: Dict[str, Any] = {}
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(self.directory, exist_ok=True)
+        conn = sqlite3.connect(self.catalog_path, timeout=5.0, isolation_level=None)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS flights (
+                flight_key TEXT PRIMARY KEY,
+                record_start INTEGER,
+                record_count INTEGER,
+                index_start INTEGER,
+                index_count INTEGER,
+                first_timestamp INTEGER,
+                last_timestamp INTEGER
+            )
+        ''')
+        return conn
+
+    @staticmethod
+    def _append_file(path: str, offset: int, payload: bytes) -> None:
+        """Write payload at offset, dropping anything after it, and flush it to disk."""
+        with open(path, "ab") as f:
+            f.truncate(offset)
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def append(self, flight_key: str, waypoints: List[Dict[str, Any]]) -> int:
+        """
+        Archive the waypoints of one flight. Appending a flight that is already archived is a no-op.
+
+        Returns:
+            int: The number of records stored for the flight.
+        """
+        return self.append_columns(flight_key, waypoints_to_arrays(waypoints))
+
+    def append_columns(self, flight_key: str, columns: Dict[str, np.ndarray]) -> int:
+        """Archive one flight given as arrays from waypoints_to_arrays (see append)."""
+        order = np.argsort(columns["timestamp"], kind="stable")
+        records = np.empty(len(order), dtype=RECORD_DTYPE)
+        for name in RECORD_DTYPE.names:
+            records[name] = columns[name][order]
+        if "utc_offset_ms" in columns:
+            # Records keep the local wall-clock time, like naive waypoint timestamps
+            records["timestamp"] += columns["utc_offset_ms"][order]
+        sample = np.arange(0, len(records), self.index_stride)
+        index = np.empty(len(sample), dtype=INDEX_DTYPE)
+        index["timestamp"] = records["timestamp"][sample]
+
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                existing = conn.execute('SELECT record_count FROM flights WHERE flight_key = ?', (flight_key,)).fetchone()
+                if existing is not None:
+                    conn.execute("COMMIT")
+                    return existing[0]
+                record_start, index_start = conn.execute(
+                    'SELECT COALESCE(MAX(record_start + record_count), 0), COALESCE(MAX(index_start + index_count), 0) FROM flights'
+                ).fetchone()
+                index["record"] = record_start + sample
+                self._append_file(self.data_path, record_start * RECORD_DTYPE.itemsize, records.tobytes())
+                self._append_file(self.index_path, index_start * INDEX_DTYPE.itemsize, index.tobytes())
+                first, last = (int(records["timestamp"][0]), int(records["timestamp"][-1])) if len(records) else (None, None)
+                conn.execute('INSERT INTO flights VALUES (?, ?, ?, ?, ?, ?, ?)',
+                             (flight_key, record_start, len(records), index_start, len(index), first, last))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+        return len(records)
+
+    def _view(self, path: str, dtype: np.dtype, end: int) -> np.ndarray:
+        """Zero-copy view of the first `end` entries of a file, remapped when the file has grown."""
+        mapped = self._maps.get(path)
+        if mapped is None or mapped[1].shape[0] < end:
+            with open(path, "rb") as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            mapped = (buffer, np.frombuffer(buffer, dtype=dtype, count=len(buffer) // dtype.itemsize))
+            self._maps[path] = mapped
+        return mapped[1][:end]
+
+    def _flight(self, flight_key: str):
+        conn = self._connect()
+        try:
+            return conn.execute('SELECT record_start, record_count, index_start, index_count FROM flights WHERE flight_key = ?',
+                                (flight_key,)).fetchone()
+        finally:
+            conn.close()
+
+    def query(self, flight_key: str, start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> Optional[np.ndarray]:
+        """
+        Records of a flight with start_ms <= timestamp <= end_ms (either bound may be omitted).
+
+        The sparse index narrows the search to one index_stride block at each end, and the exact
+        bounds are then found inside those blocks. The result is a read-only view into the mapped
+        file, or None when the flight is not archived.
+        """
+        row = self._flight(flight_key)
+        if row is None:
+            return None
+        record_start, record_count, index_start, index_count = row
+        if record_count == 0:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        records = self._view(self.data_path, RECORD_DTYPE, record_start + record_count)
+        index = self._view(self.index_path, INDEX_DTYPE, index_start + index_count)[index_start:]
+        record_end = record_start + record_count
+
+        def locate(timestamp_ms: int, side: str) -> int:
+            # Last sampled record at or before the bound, then an exact search within its block
+            block = max(0, int(np.searchsorted(index["timestamp"], timestamp_ms, side=side)) - 1)
+            low = int(index["record"][block])
+            # Up to and including the next sampled record (the stride may differ between flights)
+            high = int(index["record"][block + 1]) + 1 if block + 1 < len(index) else record_end
+            return low + int(np.searchsorted(records["timestamp"][low:high], timestamp_ms, side=side))
+
+        low = record_start if start_ms is None else locate(start_ms, "left")
+        high = record_end if end_ms is None else locate(end_ms, "right")
+        return records[low:max(low, high)]
+
+
+def records_to_waypoints(records: np.ndarray) -> List[Dict[str, Any]]:
+    """Convert archived records back into DGIP waypoint dicts (NaN becomes None)."""
+    timestamps = np.datetime_as_string(records["timestamp"].astype("datetime64[ms]"))
+    columns = {field: records[field].tolist() for field in TELEMETRY_FIELDS}
+    return [
+        {"timestamp": str(timestamp),
+         **{field: (None if math.isnan(value) else value) for field, value in zip(TELEMETRY_FIELDS, values)}}
+        for timestamp, *values in zip(timestamps, *(columns[field] for field in TELEMETRY_FIELDS))
+    ]
+
+
+def _parse_bound(value: Optional[str]) -> Optional[int]:
+    if value is None:
+        return None
+    return int(np.datetime64(value, "ms").astype(np.int64))
+
+
+def main():
+    """Read {"dgipDataHash", "start"?, "end"?} from stdin and print the archived waypoints as JSON."""
+    try:
+        request = json.loads(sys.stdin.read() or "{}")
+        flight_key = request.get("dgipDataHash")
+        if not flight_key:
+            raise ValueError("Input must contain the flight's dgipDataHash.")
+        records = TelemetryArchive().query(flight_key, _parse_bound(request.get("start")), _parse_bound(request.get("end")))
+        if records is None:
+            print(json.dumps({"waypoints": None, "error": f"Flight {flight_key} is not archived."}))
+            return
+        print(json.dumps({"waypoints": records_to_waypoints(records), "error": None}))
+    except (ValueError, sqlite3.Error, OSError) as e:
+        sys.stderr.write(f"Error: {e}\n")
+        print(json.dumps({"waypoints": None, "error": str(e)}))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+import datetime
+import sys
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from config import CONFIG
+
+# Numeric telemetry fields of a DGIP waypoint, as produced by dgip_simulation.generate_dgip_data
+TELEMETRY_FIELDS = ("latitude", "longitude", "altitude", "speed", "heading", "battery")
+
+MS_PER_DAY = 86_400_000
+ONE_MS = datetime.timedelta(milliseconds=1)
+
+
+def parse_timestamp(value: Any) -> datetime.datetime:
+    """
+    Parse a waypoint timestamp (ISO 8601). Timestamps with a UTC offset are in the flight's
+    local time at that offset; naive timestamps are taken as local flight time.
+    """
+    if isinstance(value, datetime.datetime):
+        return value
+    return datetime.datetime.fromisoformat(str(value))
+
+
+def waypoints_to_arrays(waypoints: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """
+    Convert a list of DGIP waypoint dicts into one NumPy column per field.
+
+    Timestamps become int64 milliseconds since the epoch of the instant they name, and
+    utc_offset_ms holds each one's offset (0 for naive timestamps, which are local flight
+    time), so timestamp + utc_offset_ms is the local wall-clock time. Missing numeric values
+    become NaN so every check skips them.
+    """
+    count = len(waypoints)
+    stamps = [parse_timestamp(wp["timestamp"]) for wp in waypoints]
+    offsets_ms = np.fromiter(
+        (0 if stamp.tzinfo is None else stamp.utcoffset() // ONE_MS for stamp in stamps),
+        dtype=np.int64, count=count)
+    wall_clock_ms = np.array([stamp.replace(tzinfo=None) for stamp in stamps], dtype="datetime64[ms]").astype(np.int64)
+    columns: Dict[str, np.ndarray] = {"timestamp": wall_clock_ms - offsets_ms, "utc_offset_ms": offsets_ms}
+    for field in TELEMETRY_FIELDS:
+        columns[field] = np.fromiter(
+            (np.nan if wp.get(field) is None else wp[field] for wp in waypoints),
+            dtype=np.float64, count=count)
+    return columns
+
+
+def _parse_hhmm(value: str) -> int:
+    """Convert an HH:MM string into milliseconds after midnight."""
+    hours, minutes = value.split(":")
+    return (int(hours) * 60 + int(minutes)) * 60_000
+
+
+def _mask_to_intervals(mask: np.ndarray):
+    """Return inclusive (starts, ends) index arrays for every run of True values in mask."""
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.view(np.int8), [0]))))
+    return edges[0::2], edges[1::2] - 1
+
+
+def _trailing_mean(values: np.ndarray, timestamps_ms: np.ndarray, window_ms: float) -> np.ndarray:
+    """
+    Mean of the samples in the `window_ms` before each one (excluding it), ignoring NaNs.
+    NaN until the log covers a full window. Timestamps must be in order.
+    """
+    valid = ~np.isnan(values)
+    sums = np.concatenate(([0.0], np.cumsum(np.where(valid, values, 0.0))))
+    counts = np.concatenate(([0], np.cumsum(valid)))
+    indices = np.arange(len(values))
+    first = np.searchsorted(timestamps_ms, timestamps_ms - window_ms, side="left")
+    window_counts = counts[indices] - counts[first]
+    covered = (timestamps_ms - timestamps_ms[0] >= window_ms) & (window_counts > 0)
+    means = np.full(values.shape, np.nan)
+    np.divide(sums[indices] - sums[first], window_counts, out=means, where=covered)
+    return means
+
+
+def _windowed_rate(values: np.ndarray, timestamps_ms: np.ndarray, window_ms: float) -> np.ndarray:
+    """
+    Rate of change per second from the latest sample at least `window_ms` earlier to each sample,
+    so the rate is never taken over less than the window. Timestamps must be in order.
+    """
+    rates = np.full(values.shape, np.nan)
+    previous = np.searchsorted(timestamps_ms, timestamps_ms - window_ms, side="right") - 1
+    has_previous = previous >= 0
+    previous = np.maximum(previous, 0)
+    elapsed = (timestamps_ms - timestamps_ms[previous]) / 1000.0
+    np.divide(values - values[previous], elapsed, out=rates, where=has_previous & (elapsed > 0))
+    return rates
+
+
+def _intervals(rule: str, mask: np.ndarray, values: np.ndarray, limit: float,
+               timestamps_ms: np.ndarray, local_ms: np.ndarray, upper: bool = True) -> List[Dict[str, Any]]:
+    """
+    Describe each contiguous run of violating points as one interval with its peak value.
+    Durations come from timestamps_ms; start and end times are shown in local time (local_ms).
+    """
+    if not mask.any():
+        return []
+    starts, ends = _mask_to_intervals(mask)
+    # Non-violating points are replaced by -inf so reduceat only sees the violating run
+    signed = values if upper else -values
+    peaks = np.maximum.reduceat(np.where(mask, signed, -np.inf), starts)
+    if not upper:
+        peaks = -peaks
+    start_times = np.datetime_as_string(local_ms[starts].astype("datetime64[ms]"))
+    end_times = np.datetime_as_string(local_ms[ends].astype("datetime64[ms]"))
+    durations = (timestamps_ms[ends] - timestamps_ms[starts]) / 1000.0
+    return [
+        {
+            "rule": rule,
+            "start_index": int(start),
+            "end_index": int(end),
+            "start_time": str(start_time),
+            "end_time": str(end_time),
+            "duration_seconds": float(duration),
+            "peak": round(float(peak), 3),
+            "limit": limit,
+        }
+        for start, end, start_time, end_time, duration, peak
+        in zip(starts, ends, start_times, end_times, durations, peaks)
+    ]
+
+
+def evaluate_telemetry(columns: Dict[str, np.ndarray], limits: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Evaluate every waypoint against the telemetry limits in a single vectorized pass.
+
+    Args:
+        columns (dict): Arrays as returned by waypoints_to_arrays, all of equal length.
+        limits (dict): Overrides for CONFIG["telemetry"] (and the flight duration limit).
+
+    Returns:
+        dict: "compliant", "points_evaluated" and a list of violation intervals, each with
+        the rule name, first/last index and timestamp, duration, peak value and limit.
+        For operating_hours the peak is the furthest distance outside the window, in minutes.
+    """
+    settings = {**CONFIG["telemetry"], "max_flight_duration_minutes": CONFIG["validation"]["max_flight_duration"]}
+    if limits:
+        settings.update(limits)
+
+    timestamps_ms = columns["timestamp"]
+    count = len(timestamps_ms)
+    if count == 0:
+        return {"compliant": True, "points_evaluated": 0, "violations": []}
+
+    # Columns without offsets (such as archived records) hold local time already
+    local_ms = timestamps_ms + columns.get("utc_offset_ms", 0)
+    altitude = columns["altitude"]
+    speed = columns["speed"]
+    battery = columns["battery"]
+    violations: List[Dict[str, Any]] = []
+
+    max_altitude = float(settings["max_altitude_m"])
+    violations += _intervals("max_altitude", altitude > max_altitude, altitude, max_altitude, timestamps_ms, local_ms)
+
+    max_speed = float(settings["max_speed_mps"])
+    violations += _intervals("max_speed", speed > max_speed, speed, max_speed, timestamps_ms, local_ms)
+
+    # A spike is a jump above the mean of the preceding samples, independent of the absolute limit
+    spike_delta = float(settings["speed_spike_delta_mps"])
+    speed_jump = speed - _trailing_mean(speed, timestamps_ms, float(settings["speed_spike_window_seconds"]) * 1000.0)
+    violations += _intervals("speed_spike", speed_jump > spike_delta, speed_jump, spike_delta, timestamps_ms, local_ms)
+
+    max_climb = float(settings["max_climb_rate_mps"])
+    climb_rate = np.abs(_windowed_rate(altitude, timestamps_ms, float(settings["climb_rate_window_seconds"]) * 1000.0))
+    violations += _intervals("climb_rate", climb_rate > max_climb, climb_rate, max_climb, timestamps_ms, local_ms)
+
+    min_battery = float(settings["min_battery_reserve"])
+    violations += _intervals("battery_reserve", battery < min_battery, battery, min_battery, timestamps_ms, local_ms, upper=False)
+
+    # Operating hours are evaluated on the local time of day of each waypoint
+    time_of_day = np.mod(local_ms, MS_PER_DAY)
+    hours_start = _parse_hhmm(settings["operating_hours_start"])
+    hours_end = _parse_hhmm(settings["operating_hours_end"])
+    outside_hours = (time_of_day < hours_start) | (time_of_day > hours_end)
+    # Minutes to the nearer edge of the window (across midnight), so the peak is the furthest excursion
+    minutes_outside = np.minimum(np.mod(time_of_day - hours_end, MS_PER_DAY),
+                                 np.mod(hours_start - time_of_day, MS_PER_DAY)) / 60_000.0
+    violations += _intervals("operating_hours", outside_hours, minutes_outside,
+                             f"{settings['operating_hours_start']}-{settings['operating_hours_end']}", timestamps_ms, local_ms)
+
+    max_duration_seconds = float(settings["max_flight_duration_minutes"]) * 60.0
+    elapsed_seconds = (timestamps_ms - timestamps_ms[0]) / 1000.0
+    violations += _intervals("flight_duration", elapsed_seconds > max_duration_seconds, elapsed_seconds,
+                             max_duration_seconds, timestamps_ms, local_ms)
+
+    violations.sort(key=lambda v: (v["start_index"], v["rule"]))
+    return {"compliant": not violations, "points_evaluated": count, "violations": violations}
+
+
+def evaluate_waypoints(waypoints: List[Dict[str, Any]], limits: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Convenience wrapper: convert DGIP waypoint dicts and evaluate them."""
+    try:
+        return evaluate_telemetry(waypoints_to_arrays(waypoints), limits)
+    except (KeyError, TypeError, ValueError) as e:
+        print(f"Error evaluating telemetry compliance: {e}", file=sys.stderr)
+        return {"compliant": False, "points_evaluated": 0, "violations": [], "error": f"Invalid telemetry data: {e}"}
@@ -0,0 +1,43 @@
+import asyncio
+import sqlite3
+import time
+
+from admission import DestinationLimiter, _connect
+from config import CONFIG
+
+
+def test_waiting_on_a_locked_state_file_does_not_block_the_event_loop(tmp_path, monkeypatch):
+    monkeypatch.setitem(CONFIG["limits"], "enabled", True)
+    monkeypatch.setitem(CONFIG["limits"], "state_path", str(tmp_path / "admission.db"))
+    _connect().close()
+    # Another process holding the write lock
+    holder = sqlite3.connect(CONFIG["limits"]["state_path"], isolation_level=None, check_same_thread=False)
+    holder.execute("BEGIN IMMEDIATE")
+    limiter = DestinationLimiter("test", max_concurrency=1, rpm=0, tpm=0, max_queue=0)
+
+    async def scenario():
+        gaps = []
+
+        async def ticker():
+            last = time.monotonic()
+            while True:
+                await asyncio.sleep(0.01)
+                now = time.monotonic()
+                gaps.append(now - last)
+                last = now
+
+        ticking = asyncio.create_task(ticker())
+        asyncio.get_running_loop().call_later(0.3, holder.execute, "COMMIT")
+        async with limiter.slot():
+            pass
+        ticking.cancel()
+        return gaps
+
+    gaps = asyncio.run(scenario())
+    holder.close()
+    assert gaps and max(gaps) < 0.2
+    conn = _connect()
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM admission_leases").fetchone()[0] == 0
+    finally:
+        conn.close()
@@ -0,0 +1,74 @@
+"""
+canonical_dumps must be byte-for-byte identical to the stdlib encoding: the keccak256 of that
+encoding is what is recorded on-chain, so any difference would invalidate existing hashes.
+"""
+import math
+import sys
+
+from hypothesis import HealthCheck, given, settings, strategies as st
+
+import canonical_json
+from canonical_json import canonical_dumps, stdlib_dumps
+
+# Floats around the points where repr() switches format (1e-4, 1e16) and where orjson is known
+# to differ (exponent width, [1e-5, 1e-4)), plus their immediate neighbours
+_BOUNDARIES = [1e-7, 1e-5, 1e-4, 1e15, 1e16, 1e17, sys.float_info.max, sys.float_info.min, 5e-324]
+_boundary_floats = st.sampled_from(_BOUNDARIES).flatmap(
+    lambda value: st.sampled_from([value, math.nextafter(value, 0), math.nextafter(value, math.inf)])
+).flatmap(lambda value: st.sampled_from([value, -value]))
+
+_floats = st.one_of(st.floats(allow_nan=True, allow_infinity=True), _boundary_floats)
+# Past 64 bits orjson refuses the integer and the stdlib path is taken
+_integers = st.one_of(st.integers(), st.integers(min_value=-(2 ** 70), max_value=2 ** 70))
+# Text from every code point, and text biased towards number-like fragments the scans look for
+_text = st.one_of(st.text(), st.text(alphabet="0.eE-+1null\x7f"))
+
+_scalars = st.one_of(st.none(), st.booleans(), _integers, _floats, _text)
+json_values = st.recursive(
+    _scalars,
+    lambda children: st.one_of(st.lists(children), st.dictionaries(_text, children)),
+    max_leaves=30,
+)
+
+_settings = settings(max_examples=2000, deadline=None, suppress_health_check=[HealthCheck.too_slow])
+
+
+@_settings
+@given(json_values)
+def test_matches_stdlib(value):
+    assert canonical_dumps(value) == stdlib_dumps(value)
+
+
+@_settings
+@given(_floats)
+def test_matches_stdlib_for_floats(value):
+    assert canonical_dumps({"value": value, "values": [value, value * 10]}) == stdlib_dumps(
+        {"value": value, "values": [value, value * 10]})
+
+
+@_settings
+@given(st.lists(st.fixed_dictionaries({
+    "timestamp": st.text(alphabet="0123456789-:.T", max_size=26),
+    "latitude": _floats,
+    "longitude": _floats,
+    "altitude": _floats,
+    "speed": _floats,
+    "battery": _integers,
+})))
+def test_matches_stdlib_for_waypoints(waypoints):
+    package = {"generated_path": {"waypoints": waypoints}}
+    assert canonical_dumps(package) == stdlib_dumps(package)
+
+
+def test_matches_stdlib_for_types_orjson_passes_through():
+    class Name(str):
+        pass
+
+    value = {"name": Name("drone"), "ids": {3: "c", 1: "a", 10: "b"}, "nested": [(1, 2.5)]}
+    assert canonical_dumps(value) == stdlib_dumps(value)
+
+
+def test_stdlib_only(monkeypatch):
+    monkeypatch.setattr(canonical_json, "orjson", None)
+    value = {"b": [1, 2.5, "é"], "a": None}
+    assert canonical_dumps(value) == stdlib_dumps(value) == '{"a":null,"b":[1,2.5,"\\u00e9"]}'
@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+
+from admission import DeadlineExceededError, deadline_scope
+from coalescing import SingleFlight
+
+
+def test_duplicate_gives_up_at_its_deadline(tmp_path):
+    single_flight = SingleFlight(str(tmp_path / "state.db"))
+    calls = []
+
+    async def slow_validation():
+        calls.append(1)
+        await asyncio.sleep(2.0)
+        return {"ok": True}
+
+    async def duplicate():
+        await asyncio.sleep(0.05)
+        with deadline_scope(0.3):
+            return await single_flight.run("0xkey", slow_validation)
+
+    async def scenario():
+        leader = asyncio.create_task(single_flight.run("0xkey", slow_validation))
+        with pytest.raises(DeadlineExceededError):
+            await duplicate()
+        assert await leader == {"ok": True}
+
+    asyncio.run(scenario())
+    assert calls == [1]
+
+
+def test_duplicate_reuses_leader_result(tmp_path):
+    single_flight = SingleFlight(str(tmp_path / "state.db"))
+    calls = []
+
+    async def validation():
+        calls.append(1)
+        await asyncio.sleep(0.2)
+        return {"dataHash": "0xabc"}
+
+    async def scenario():
+        return await asyncio.gather(*(single_flight.run("0xkey", validation) for _ in range(3)))
+
+    assert asyncio.run(scenario()) == [{"dataHash": "0xabc"}] * 3
+    assert calls == [1]
@@ -0,0 +1,33 @@
+import struct
+
+from dgip_ingest import _GLOBAL_POSITION_INT, _MSG_GLOBAL_POSITION_INT, _CRC_EXTRA, _x25_crc, iter_log_waypoints
+
+
+def _write_csv(path, header, rows):
+    path.write_text("\n".join([",".join(header)] + [",".join(row) for row in rows]) + "\n")
+    return str(path)
+
+
+def test_airdata_utc_times_are_converted_to_the_flight_offset(tmp_path):
+    path = _write_csv(tmp_path / "airdata.csv", ["time(millisecond)", "datetime(utc)", "latitude", "longitude"],
+                      [["0", "2024-06-01 22:30:00", "47.1", "8.5"], ["1500", "2024-06-01 22:30:01", "47.1", "8.5"]])
+    waypoints = list(iter_log_waypoints(path, utc_offset_minutes=120))
+    assert [wp["timestamp"] for wp in waypoints] == ["2024-06-02T00:30:00+02:00", "2024-06-02T00:30:01.500+02:00"]
+
+
+def test_dji_local_times_are_tagged_with_the_flight_offset(tmp_path):
+    path = _write_csv(tmp_path / "dji.csv", ["CUSTOM.date [local]", "CUSTOM.updateTime [local]", "OSD.latitude", "OSD.longitude"],
+                      [["06/02/2024", "12:30:00.000 AM", "47.1", "8.5"]])
+    waypoints = list(iter_log_waypoints(path, utc_offset_minutes=120))
+    assert [wp["timestamp"] for wp in waypoints] == ["2024-06-02T00:30:00+02:00"]
+
+
+def test_tlog_times_are_converted_from_utc(tmp_path):
+    payload = _GLOBAL_POSITION_INT.pack(0, 471000000, 85000000, 0, 50000, 0, 0, 0, 0xFFFF)
+    header = bytes([len(payload), 0, 1, 1, _MSG_GLOBAL_POSITION_INT])
+    crc = _x25_crc(bytes([_CRC_EXTRA[_MSG_GLOBAL_POSITION_INT]]), _x25_crc(header + payload))
+    timestamp_us = 1717281000 * 1_000_000  # 2024-06-01T22:30:00Z
+    path = tmp_path / "flight.tlog"
+    path.write_bytes(struct.pack(">Q", timestamp_us) + b"\xfe" + header + payload + struct.pack("<H", crc))
+    waypoints = list(iter_log_waypoints(str(path), utc_offset_minutes=120))
+    assert [wp["timestamp"] for wp in waypoints] == ["2024-06-02T00:30:00+02:00"]
@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("aioipfs")
+pytest.importorskip("httpx")
+
+import http_clients  # noqa: E402
+from config import CONFIG  # noqa: E402
+
+
+def test_upload_and_verification_clients_use_the_configured_node(monkeypatch):
+    monkeypatch.setitem(CONFIG["ipfs"], "host", "ipfs.internal")
+    monkeypatch.setitem(CONFIG["ipfs"], "port", 5101)
+    created = {}
+
+    class RecordingIPFS:
+        def __init__(self, **kwargs):
+            created.update(kwargs)
+
+        async def close(self):
+            pass
+
+    monkeypatch.setattr(http_clients.aioipfs, "AsyncIPFS", RecordingIPFS)
+
+    async def scenario():
+        try:
+            http_clients.shared_ipfs_client()
+            return str(http_clients.ipfs_http_client().base_url)
+        finally:
+            await http_clients.close_http_clients()
+
+    verification_url = asyncio.run(scenario())
+    assert (created["host"], created["port"], created["scheme"]) == ("ipfs.internal", 5101, CONFIG["ipfs"]["protocol"])
+    assert created["read_timeout"] == CONFIG["ipfs"]["timeout"]
+    assert verification_url.rstrip("/") == f"{CONFIG['ipfs']['protocol']}://ipfs.internal:5101/api/v0"
@@ -0,0 +1,19 @@
+import pytest
+
+pytest.importorskip("llama_index")
+
+from llama_validator import FlightDataValidator  # noqa: E402
+
+
+@pytest.mark.parametrize("center", [None, "6.5244,3.3792", "not a point", 42])
+def test_coalescing_key_accepts_non_dict_centers(center):
+    validator = FlightDataValidator()
+    key = validator.coalescing_key({"droneName": "Falcon01", "flightAreaCenter": center})
+    assert key.startswith("0x") and len(key) == 66
+
+
+def test_string_center_normalizes_like_object():
+    validator = FlightDataValidator()
+    as_string = validator._normalize_flight_data({"flightAreaCenter": "6.5244,3.3792"})
+    as_object = validator._normalize_flight_data({"flightAreaCenter": {"latitude": 6.5244, "longitude": 3.3792}})
+    assert as_string == as_object
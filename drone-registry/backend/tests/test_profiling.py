@@ -0,0 +1,14 @@
+from config import CONFIG
+from profiling import should_profile
+
+
+def test_request_flag_is_ignored_while_profiling_is_disabled(monkeypatch):
+    monkeypatch.setitem(CONFIG["profiling"], "enabled", False)
+    assert should_profile(True) is False
+
+
+def test_request_flag_overrides_sampling_when_enabled(monkeypatch):
+    monkeypatch.setitem(CONFIG["profiling"], "enabled", True)
+    monkeypatch.setitem(CONFIG["profiling"], "sample_rate", 0.0)
+    assert should_profile(True) is True
+    assert should_profile(None) is False
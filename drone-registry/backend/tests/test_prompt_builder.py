@@ -0,0 +1,20 @@
+import json
+
+from prompt_builder import build_compliance_prompt, count_tokens
+
+
+def test_airspace_conflicts_are_kept_when_the_nfz_section_is_cut():
+    zones = [{"name": f"Zone {i}", "distanceKm": i, "description": "restricted " * 40} for i in range(200)]
+    mcp_result = {"status": "success", "validationResult": json.dumps({"zones": zones})}
+    conflicts = [{"dataHash": "0x" + "ab" * 32, "startTime": "2024-06-02T10:00", "endTime": "2024-06-02T11:00",
+                  "distanceMeters": 120.5, "flightAreaRadius": 200.0, "status": "registered"}]
+    prompt, tokens = build_compliance_prompt({"droneName": "Test"}, {"altitude": []}, mcp_result,
+                                             max_tokens=1000, airspace_conflicts=conflicts)
+    assert '"distanceMeters":120.5' in prompt
+    assert tokens == count_tokens(prompt) and tokens <= 1000
+
+
+def test_no_conflicts_are_reported_as_an_empty_list():
+    prompt, _ = build_compliance_prompt({"droneName": "Test"}, {}, {"status": "success", "validationResult": "ok"})
+    assert "Airspace Conflicts" in prompt.split("MCP No-Fly Zone")[0]
+    assert "empty means none):\n[]" in prompt
@@ -0,0 +1,20 @@
+from config import CONFIG
+from risk_grid import RiskGrid, record_dgip, window_hours
+
+
+def test_window_hours_wrap_past_midnight():
+    assert window_hours(22 * 60 + 30, 1 * 60 + 15) == [22, 23, 0, 1]
+    assert window_hours(10 * 60, 11 * 60 + 59) == [10, 11]
+    assert window_hours(10 * 60 + 30, 10 * 60 + 10) == [10, 11, 12, 13, 14, 15, 16, 17, 18, 19, 20, 21, 22, 23,
+                                                        0, 1, 2, 3, 4, 5, 6, 7, 8, 9]
+    assert window_hours(None, 60) is None
+
+
+def test_record_dgip_uses_the_local_hour_of_an_offset_timestamp(tmp_path, monkeypatch):
+    monkeypatch.setitem(CONFIG["database"], "path", str(tmp_path / "flights.db"))
+    monkeypatch.setitem(CONFIG["risk_grid"], "enabled", True)
+    waypoints = [{"timestamp": "2024-06-02T23:15:00.5-05:00", "latitude": 40.7, "longitude": -74.0}]
+    record_dgip(waypoints, {"telemetryCompliance": {"violations": []}, "geofence": None})
+    grid = RiskGrid(str(tmp_path / "flights.db"))
+    assert grid.cell(40.7, -74.0, [23])["flights_flown"] == 1
+    assert grid.cell(40.7, -74.0, [4])["flights_flown"] == 0
@@ -0,0 +1,23 @@
+import warnings
+
+from telemetry_compliance import evaluate_waypoints, waypoints_to_arrays
+
+
+def _waypoints(timestamps):
+    return [{"timestamp": timestamp, "latitude": 47.1, "longitude": 8.5, "altitude": 10.0, "speed": 1.0,
+             "heading": 0.0, "battery": 80.0} for timestamp in timestamps]
+
+
+def test_operating_hours_use_local_wall_clock_time_of_offset_timestamps():
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        result = evaluate_waypoints(_waypoints(["2024-06-02T08:30:00+02:00", "2024-06-02T08:40:00+02:00"]))
+    hours = [v for v in result["violations"] if v["rule"] == "operating_hours"]
+    # 08:30 local is 30 minutes before the default 09:00 start (06:30 UTC would be 150)
+    assert [(v["start_time"], v["peak"]) for v in hours] == [("2024-06-02T08:30:00.000", 30.0)]
+
+
+def test_offset_timestamps_name_the_same_instant():
+    columns = waypoints_to_arrays(_waypoints(["2024-06-02T10:00:00+02:00", "2024-06-02T08:00:00Z"]))
+    assert columns["timestamp"][0] == columns["timestamp"][1]
+    assert columns["utc_offset_ms"].tolist() == [7_200_000, 0]
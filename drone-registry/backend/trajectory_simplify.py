@@ -0,0 +1,109 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import CONFIG
+from geofence import EARTH_RADIUS_M
+from telemetry_compliance import waypoints_to_arrays
+
+SIMPLIFICATION_METHOD = "douglas-peucker-sed"
+
+
+def _project_to_metres(latitudes: np.ndarray, longitudes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Local equirectangular projection around the first point, accurate enough for flight-area scales."""
+    lat0 = np.radians(latitudes[0])
+    x = EARTH_RADIUS_M * np.radians(longitudes - longitudes[0]) * np.cos(lat0)
+    y = EARTH_RADIUS_M * np.radians(latitudes - latitudes[0])
+    return x, y
+
+
+def simplify_indices(columns: Dict[str, np.ndarray], tolerances: Dict[str, float]) -> np.ndarray:
+    """
+    Select the waypoints to keep using Douglas-Peucker with a synchronized Euclidean distance.
+
+    Each dropped point is compared with the position and telemetry linearly interpolated at its
+    own timestamp between the kept neighbours, so the error bound holds in both space and time.
+    A point is kept when any error exceeds its tolerance, or when the kept neighbours would be
+    further apart in time than max_interval_seconds.
+
+    Returns:
+        np.ndarray: Sorted indices of the waypoints to keep (always including first and last).
+    """
+    timestamps_s = (columns["timestamp"] - columns["timestamp"][0]) / 1000.0
+    count = len(timestamps_s)
+    if count <= 2:
+        return np.arange(count)
+
+    x, y = _project_to_metres(columns["latitude"], columns["longitude"])
+    # Each telemetry channel is scaled by its tolerance so that "error > 1" means "keep"
+    channels = [(columns["altitude"], tolerances["altitude_m"]),
+                (columns["speed"], tolerances["speed_mps"]),
+                (columns["battery"], tolerances["battery"])]
+    position_tolerance = tolerances["position_m"]
+    max_interval = tolerances["max_interval_seconds"]
+
+    keep = np.zeros(count, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, count - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        inner = slice(first + 1, last)
+        span = timestamps_s[last] - timestamps_s[first]
+        ratio = (timestamps_s[inner] - timestamps_s[first]) / span if span > 0 else np.zeros(last - first - 1)
+
+        interp_x = x[first] + ratio * (x[last] - x[first])
+        interp_y = y[first] + ratio * (y[last] - y[first])
+        error = np.hypot(x[inner] - interp_x, y[inner] - interp_y) / position_tolerance
+        for values, tolerance in channels:
+            interp = values[first] + ratio * (values[last] - values[first])
+            error = np.fmax(error, np.abs(values[inner] - interp) / tolerance)
+
+        split = int(np.nanargmax(error)) if not np.isnan(error).all() else 0
+        if error[split] > 1.0:
+            split += first + 1
+        elif span > max_interval:
+            # Within tolerance but the gap is too long: split at the point closest to the middle in time
+            split = first + 1 + int(np.argmin(np.abs(ratio - 0.5)))
+        else:
+            continue
+        keep[split] = True
+        stack.append((first, split))
+        stack.append((split, last))
+
+    return np.flatnonzero(keep)
+
+
+def simplification_tolerances(position_m: Optional[float] = None) -> Optional[Dict[str, float]]:
+    """Resolve the tolerances from CONFIG["dgip"]; returns None when simplification is disabled."""
+    settings = CONFIG["dgip"]
+    if position_m is None:
+        position_m = settings["simplify_tolerance_m"]
+    if position_m is None or position_m <= 0:
+        return None
+    return {
+        "position_m": float(position_m),
+        "altitude_m": settings["simplify_altitude_tolerance_m"],
+        "speed_mps": settings["simplify_speed_tolerance_mps"],
+        "battery": settings["simplify_battery_tolerance"],
+        "max_interval_seconds": settings["simplify_max_interval_seconds"],
+    }
+
+
+def simplify_waypoints(waypoints: List[Dict[str, Any]],
+                       tolerances: Dict[str, float]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Simplify a DGIP waypoint list and describe the simplification for the package metadata.
+
+    The retained waypoints are the original dicts, unchanged, so their serialization is identical
+    to what an unsimplified upload would contain for those points.
+    """
+    indices = simplify_indices(waypoints_to_arrays(waypoints), tolerances)
+    metadata = {
+        "method": SIMPLIFICATION_METHOD,
+        "tolerances": tolerances,
+        "original_points": len(waypoints),
+        "retained_points": int(len(indices)),
+    }
+    return [waypoints[i] for i in indices], metadata